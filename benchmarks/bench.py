@@ -0,0 +1,301 @@
+"""
+Benchmark suite for the PlayHQ and cba2csv transformations.
+
+Every benchmark runs over a synthetic competition (see synthetic.py), so no
+network access or API key is needed. For each benchmark the best wall time over
+a number of repeats, the throughput (items per second) and the peak memory
+(via tracemalloc, in a separate run) are recorded.
+
+Results are saved as JSON under benchmarks/results/ and can be compared against
+a saved baseline to spot performance regressions:
+
+    $ python benchmarks/bench.py --scale club --save-baseline
+    $ python benchmarks/bench.py --scale club --baseline benchmarks/results/baseline.json
+"""
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import os
+import sys
+import argparse
+import contextlib
+import datetime
+import json
+import logging
+import platform
+import tempfile
+import time
+import tracemalloc
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_PATH, "cba2csv"))
+sys.path.insert(0, ROOT_PATH)
+
+import openpyxl
+import pandas as pd
+
+import playhq as phq
+import records
+import roster
+import standings
+import cba2csv
+from synthetic import SyntheticCompetition, cba_workbook
+
+RESULTS_PATH = os.path.join(ROOT_PATH, "benchmarks", "results")
+BASELINE_FILE = os.path.join(RESULTS_PATH, "baseline.json")
+
+# competition sizes: number of clubs and teams per club
+SCALES = {
+    "club": dict(clubs=8, teams_per_club=12),  # ~100 teams: one club and its opponents
+    "association": dict(clubs=40, teams_per_club=20),  # ~800 teams
+    "state": dict(clubs=150, teams_per_club=20),  # ~3000 teams
+}
+
+
+@contextlib.contextmanager
+def offline_shortener():
+    """Replace the TinyURL shortener by the identity so benchmarks never hit the network"""
+    shorten_url = phq.utils.shorten_url
+    phq.utils.shorten_url = lambda url: url
+    try:
+        yield
+    finally:
+        phq.utils.shorten_url = shorten_url
+
+
+def measure(fn, repeat):
+    """Run fn() repeat times and once more under tracemalloc
+
+    fn() must return the number of items it processed.
+
+    Returns:
+        dict: best time in seconds, items, throughput (items/sec) and peak memory (MB)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    return {
+        "seconds": best,
+        "items": items,
+        "throughput": items / best if best > 0 else None,
+        "peak_mb": peak / 2**20,
+    }
+
+
+def build_benchmarks(competition, tmp_path):
+    """Build the dictionary of benchmarks: name -> function returning no. of items processed"""
+    phq_club = competition.playhq()
+    teams_df = phq_club.get_season_teams(competition.season_id)
+    team_ids = teams_df["id"].tolist()
+
+    # all teams in the season (not only the club ones) for competition-wide runs
+    all_teams_df = pd.DataFrame(
+        [{"id": t["id"], "name": t["name"], "grade.id": t["grade"]["id"]} for t in competition.teams]
+    )
+    from_date = pd.Timestamp(competition.start_date).tz_localize(competition.timezone)
+    to_date = from_date + pd.Timedelta(weeks=competition.rounds)
+
+    logging.info(f"Building reference frames for {len(all_teams_df)} teams...")
+    games_df, _ = phq_club.get_games(all_teams_df, from_date, to_date)
+    with offline_shortener():
+        games_tapps_df = phq_club.to_teamsapp_schedule(games_df)
+    bye_teams = games_tapps_df["team_name"].drop_duplicates().tolist()
+
+    sheet_file = cba_workbook(os.path.join(tmp_path, "cba_games.xlsx"))
+    game_date = competition.start_date
+
+    def season_teams():
+        return len(phq_club.get_season_teams(competition.season_id))
+
+    def team_fixture():
+        return sum(len(phq_club.get_team_fixture(team_id)) for team_id in team_ids)
+
+    def get_games():
+        df, _ = phq_club.get_games(all_teams_df, from_date, to_date)
+        return len(df)
+
+    def get_games_by_grade():
+        df, _ = phq_club.get_games(all_teams_df, from_date, to_date, by_grade=True)
+        return len(df)
+
+    def teamsapp_schedule():
+        with offline_shortener():
+            return len(phq_club.to_teamsapp_schedule(games_df))
+
+    def stream_schedule_csv():
+        with offline_shortener():
+            frames = phq_club.iter_teamsapp_schedule(
+                phq_club.iter_games(all_teams_df, from_date, to_date)
+            )
+            return phq.utils.write_frames_csv(frames, os.path.join(tmp_path, "schedule.csv"))
+
+    def teamsapp_bye_schedule():
+        rows = 0
+        for week in range(competition.rounds):
+            date = game_date + datetime.timedelta(weeks=week)
+            rows += len(phq_club.build_teamsapp_bye_schedule(bye_teams, date))
+        return rows
+
+    def standings_build():
+        return len(standings.Standings().build(games_df).table())
+
+    def compact_games():
+        return len(records.expand_games(records.compact_games(games_df)))
+
+    # the first round, with the PlayHQ team names (unique across clubs)
+    round_tapps_df = games_tapps_df.assign(team_name=games_df["team_name"].to_numpy())
+    round_tapps_df = round_tapps_df.loc[round_tapps_df["start_date"] == round_tapps_df["start_date"].min()]
+
+    def duty_roster():
+        # every team scores another game of the round, at the venue where it plays
+        pool_df = roster.team_pool(round_tapps_df)
+        return len(roster.DutyRoster(round_tapps_df, pool_df, own_teams=False, same_venue=True).assign())
+
+    def cba_extract_games():
+        wb = openpyxl.load_workbook(sheet_file, read_only=True)
+        no_games = sum(
+            len(cba2csv.extract_cba_games(sheet, game_date=game_date)) for sheet in wb
+        )
+        wb.close()
+        return no_games
+
+    return {
+        "season_teams": season_teams,
+        "team_fixture": team_fixture,
+        "get_games": get_games,
+        "get_games_by_grade": get_games_by_grade,
+        "to_teamsapp_schedule": teamsapp_schedule,
+        "stream_schedule_csv": stream_schedule_csv,
+        "build_teamsapp_bye_schedule": teamsapp_bye_schedule,
+        "standings_build": standings_build,
+        "compact_games": compact_games,
+        "duty_roster": duty_roster,
+        "cba_extract_games": cba_extract_games,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print a comparison table and return the names of benchmarks that regressed"""
+    regressions = []
+    print(f"{'benchmark':30} {'time (s)':>10} {'baseline':>10} {'ratio':>7} {'peak MB':>9}")
+    for name, r in results["benchmarks"].items():
+        base = baseline["benchmarks"].get(name) if baseline else None
+        ratio = r["seconds"] / base["seconds"] if base else None
+        flag = ""
+        if ratio is not None and ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  <-- REGRESSION"
+        print(
+            f"{name:30} {r['seconds']:10.4f} "
+            f"{base['seconds'] if base else float('nan'):10.4f} "
+            f"{ratio if ratio else float('nan'):7.2f} {r['peak_mb']:9.1f}{flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark playhq.py and cba2csv transformations on synthetic PlayHQ data."
+    )
+    parser.add_argument(
+        "--scale",
+        choices=SCALES.keys(),
+        default="club",
+        help="Size of the synthetic competition (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--clubs", type=int, help="Number of clubs (overrides --scale)."
+    )
+    parser.add_argument(
+        "--teams-per-club", type=int, help="Teams per club (overrides --scale)."
+    )
+    parser.add_argument(
+        "--rounds", type=int, default=18, help="Rounds in the season (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Timed repeats per benchmark (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--only", nargs="+", help="Run only these benchmarks."
+    )
+    parser.add_argument(
+        "--baseline",
+        help="JSON results file to compare against.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Also save the results as the baseline ({BASELINE_FILE}).",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Slowdown ratio over the baseline reported as regression (default: %(default)s).",
+    )
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)  # playhq logs every team at INFO
+
+    size = dict(SCALES[args.scale])
+    if args.clubs is not None:
+        size["clubs"] = args.clubs
+    if args.teams_per_club is not None:
+        size["teams_per_club"] = args.teams_per_club
+    competition = SyntheticCompetition(rounds=args.rounds, **size)
+    print(
+        f"Synthetic competition: {len(competition.clubs)} clubs, {len(competition.teams)} teams, "
+        f"{len(competition.grades)} grades, {args.rounds} rounds"
+    )
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "scale": dict(size, rounds=args.rounds),
+        "benchmarks": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_path:
+        benchmarks = build_benchmarks(competition, tmp_path)
+        for name, fn in benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            print(f"Running {name}...")
+            results["benchmarks"][name] = measure(fn, args.repeat)
+
+    os.makedirs(RESULTS_PATH, exist_ok=True)
+    results_file = os.path.join(
+        RESULTS_PATH, f"bench-{datetime.datetime.now().strftime('%Y_%m_%d-%H%M%S')}.json"
+    )
+    with open(results_file, "w") as f:
+        json.dump(results, f, indent=4)
+    print("Results saved to:", results_file)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(results, f, indent=4)
+        print("Baseline saved to:", BASELINE_FILE)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["scale"] != results["scale"]:
+            logging.warning(f"Baseline was run at a different scale: {baseline['scale']}")
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Regressions found:", regressions)
+        sys.exit(1)
@@ -0,0 +1,313 @@
+"""
+Synthetic PlayHQ data generator used by the benchmark suite.
+
+It builds a fake season competition (clubs, grades, teams, round-robin
+fixtures and venues) and serves it page by page with the same JSON shape the
+PlayHQ public API returns, so the transformations in playhq.py can be timed
+without touching the network.
+"""
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import datetime
+import itertools
+import random
+import uuid
+
+import openpyxl
+
+import playhq as phq
+
+AGES = [8, 10, 12, 14, 16, 18]
+GENDERS = ["Boys", "Girls", "Mixed"]
+COLOURS = ["Gold", "Purple", "Black", "White", "Blue", "Red", "Green", "Silver"]
+SUBURBS = ["Coburg", "Brunswick", "Preston", "Northcote", "Pascoe Vale", "Oak Park"]
+GAME_TIMES = ["08:30:00", "09:15:00", "10:00:00", "10:45:00", "11:30:00", "12:15:00"]
+
+
+class SyntheticCompetition:
+    """A fake season competition served with the PlayHQ JSON layout.
+
+    Teams are split into grades of `grade_size` teams (by age and gender), and each
+    grade plays a round-robin with one round per week starting on `start_date`.
+
+    Args:
+        clubs (int): number of clubs in the association
+        teams_per_club (int): number of teams each club fields
+        rounds (int): number of rounds (weeks) in the season
+        page_size (int): records per page, as in the paginated API
+        venues (int): number of venues, each with `courts` playing surfaces
+        start_date (date): date of round 1
+        seed (int): random seed so runs are repeatable
+    """
+
+    def __init__(
+        self,
+        clubs=8,
+        teams_per_club=12,
+        rounds=18,
+        page_size=50,
+        grade_size=8,
+        venues=6,
+        courts=4,
+        start_date=datetime.date(2023, 4, 22),
+        seed=2023,
+    ):
+        self.rnd = random.Random(seed)
+        self.page_size = page_size
+        self.rounds = rounds
+        self.start_date = start_date
+        self.timezone = "Australia/Melbourne"
+
+        self.season_id = self._id()
+        self.clubs = [
+            {"id": self._id(), "name": f"Club{c:04d}"} for c in range(clubs)
+        ]
+        self.org_id = self.clubs[0]["id"]
+
+        self.venues = []
+        for v in range(venues):
+            suburb = SUBURBS[v % len(SUBURBS)]
+            self.venues.append(
+                {
+                    "id": self._id(),
+                    "name": f"{suburb} Stadium {v}",
+                    "courts": [f"Court {k + 1}" for k in range(courts)],
+                    "address": {
+                        "line1": f"{v + 1} Outlook Road",
+                        "postcode": f"30{v % 100:02d}",
+                        "suburb": suburb,
+                        "state": "VIC",
+                        "country": "Australia",
+                        "latitude": round(-37.7 - self.rnd.random() / 10, 5),
+                        "longitude": round(144.9 + self.rnd.random() / 10, 5),
+                    },
+                }
+            )
+
+        self.teams = self._build_teams(teams_per_club)
+        self.grades = self._build_grades(grade_size)
+        self.fixtures = self._build_fixtures()
+        self.games = {g["id"]: g for fixture in self.fixtures.values() for g in fixture}
+
+    def _id(self):
+        return str(uuid.UUID(int=self.rnd.getrandbits(128)))
+
+    def _build_teams(self, teams_per_club):
+        categories = list(itertools.product(AGES, GENDERS))
+        teams = []
+        for club in self.clubs:
+            for k in range(teams_per_club):
+                age, gender = categories[k % len(categories)]
+                colour = COLOURS[(k // len(categories)) % len(COLOURS)]
+                teams.append(
+                    {
+                        "id": self._id(),
+                        "name": f"{club['name']} U{age} {gender} {colour}",
+                        "club": club,
+                        "category": f"U{age} {gender}",
+                        "grade": None,
+                    }
+                )
+        return teams
+
+    def _build_grades(self, grade_size):
+        grades = []
+        by_category = {}
+        for team in self.teams:
+            by_category.setdefault(team["category"], []).append(team)
+
+        for category, teams in by_category.items():
+            self.rnd.shuffle(teams)
+            for div, k in enumerate(range(0, len(teams), grade_size)):
+                name = f"Saturday {category} Division {div + 1}"
+                grade_id = self._id()
+                grade = {
+                    "id": grade_id,
+                    "name": name,
+                    "url": f"https://www.playhq.com/synthetic/{name.lower().replace(' ', '-')}/{grade_id[:8]}",
+                    "teams": teams[k : k + grade_size],
+                    "rounds": [
+                        {
+                            "id": self._id(),
+                            "name": f"Round {r + 1}",
+                            "abbreviatedName": f"R{r + 1}",
+                            "isFinalRound": False,
+                        }
+                        for r in range(self.rounds)
+                    ],
+                }
+                for team in grade["teams"]:
+                    team["grade"] = grade
+                grades.append(grade)
+        return grades
+
+    def _build_fixtures(self):
+        """Circle-method round-robin per grade; odd grades get a BYE each round"""
+        fixtures = {team["id"]: [] for team in self.teams}
+        created = "2023-03-01T01:00:35.000Z"
+        for grade in self.grades:
+            teams = list(grade["teams"])
+            if len(teams) % 2 == 1:
+                teams.append(None)  # BYE slot
+            n = len(teams)
+            for r, round_info in enumerate(grade["rounds"]):
+                date = self.start_date + datetime.timedelta(weeks=r)
+                for k in range(n // 2):
+                    home, away = teams[k], teams[n - 1 - k]
+                    if home is None or away is None:
+                        continue
+                    venue = self.rnd.choice(self.venues)
+                    game_id = self._id()
+                    game = {
+                        "id": game_id,
+                        "status": "COMPLETED" if r < self.rounds // 2 else "UPCOMING",
+                        "url": f"{grade['url']}/game-centre/{game_id[:8]}",
+                        "createdAt": created,
+                        "updatedAt": created,
+                        "grade": {k: grade[k] for k in ["id", "name", "url"]},
+                        "round": round_info,
+                        "pool": None,
+                        "schedule": {
+                            "date": date.isoformat(),
+                            "time": self.rnd.choice(GAME_TIMES),
+                            "timezone": self.timezone,
+                        },
+                        "competitors": [
+                            {"id": home["id"], "name": home["name"], "isHomeTeam": True},
+                            {"id": away["id"], "name": away["name"], "isHomeTeam": False},
+                        ],
+                        "venue": {
+                            "id": venue["id"],
+                            "name": venue["name"],
+                            "surfaceName": self.rnd.choice(venue["courts"]),
+                            "surfaceAbbreviation": "Crt",
+                            "address": venue["address"],
+                        },
+                    }
+                    if game["status"] == "COMPLETED":
+                        scores = [self.rnd.randint(10, 60), self.rnd.randint(10, 60)]
+                        for competitor, score, other in zip(
+                            game["competitors"], scores, scores[::-1]
+                        ):
+                            competitor["scoreTotal"] = score
+                            competitor["outcome"] = (
+                                "WIN" if score > other else "LOSS" if score < other else "DRAW"
+                            )
+                    fixtures[home["id"]].append(game)
+                    fixtures[away["id"]].append(game)
+                teams.insert(1, teams.pop())  # rotate all but the first team
+        return fixtures
+
+    def _records(self, key):
+        parts = key.split("/")
+        if parts[0] == "organisations" and parts[2] == "seasons":
+            return [
+                {
+                    "id": self.season_id,
+                    "name": "Synthetic 2023",
+                    "status": "ACTIVE",
+                    "association": {"id": self._id(), "name": "Synthetic Association"},
+                    "competition": {"id": self._id(), "name": "Junior Domestic"},
+                    "createdAt": None,
+                    "updatedAt": None,
+                }
+            ]
+        if parts[0] == "seasons" and parts[2] == "teams":
+            return [
+                {
+                    "id": t["id"],
+                    "name": t["name"],
+                    "club": t["club"],
+                    "grade": {k: t["grade"][k] for k in ["id", "name", "url"]},
+                }
+                for t in self.teams
+            ]
+        if parts[0] == "teams" and parts[2] == "fixture":
+            return self.fixtures[parts[1]]
+        if parts[0] == "grades" and parts[2] == "games":
+            return [g for g in self.games.values() if g["grade"]["id"] == parts[1]]
+        raise KeyError(f"Synthetic endpoint not available: {key}")
+
+    def pages(self, key, cursor=None):
+        """Yield the JSON pages PlayHQ would return for endpoint `key` (from `cursor` on)"""
+        parts = key.split("/")
+        if parts[0] == "games" and parts[2] == "summary":  # a single object, no metadata
+            yield {"data": self.games[parts[1]]}
+            return
+        records = self._records(key)
+        chunks = [
+            records[k : k + self.page_size]
+            for k in range(0, len(records), self.page_size)
+        ] or [[]]
+        first = int(cursor[1:]) if cursor is not None else 0
+        for no, chunk in enumerate(chunks):
+            if no < first:
+                continue
+            has_more = no < len(chunks) - 1
+            yield {
+                "data": chunk,
+                "metadata": {
+                    "hasMore": has_more,
+                    "nextCursor": f"c{no + 1}" if has_more else None,
+                },
+            }
+
+    def playhq(self, tapp_team_name=None, tapp_game_name=None):
+        """A PlayHQ client for the first club that is served from this competition"""
+        return SyntheticPlayHQ(
+            self,
+            tapp_team_name or (lambda name: name.split(" ", 1)[1]),
+            tapp_game_name or (lambda team, opponent=None, round=None: f"Game {team} - {round}"),
+        )
+
+
+class SyntheticPlayHQ(phq.PlayHQ):
+    def __init__(self, competition, tapp_team_name, tapp_game_name) -> None:
+        super().__init__(
+            competition.clubs[0]["name"],
+            competition.org_id,
+            "synthetic-key",
+            "bv",
+            competition.timezone,
+            tapp_team_name,
+            tapp_game_name,
+        )
+        self.competition = competition
+
+    def fetch_json(self, key, cursor=None):
+        return self.competition.pages(key, cursor)
+
+
+def cba_workbook(file_name, sheets=2, time_slots=12, courts=6, seed=2021):
+    """Write a CBA-style game grid workbook (three rows per time-slot) to file_name
+
+    Row 1 holds the date and season, row 2 the venues/courts and then each time-slot
+    uses three rows: teams ("A vs B"), time (e.g., 8.3) and league (e.g., "u/12 boys Div2").
+    """
+    rnd = random.Random(seed)
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for s in range(sheets):
+        ws = wb.create_sheet(f"Sheet {s + 1}")
+        ws.append(["", "", "6th November", "", "Winter 2021"])
+        ws.append(["TIME"] + [f"Coburg Court {k + 1}" for k in range(courts)])
+        for slot in range(time_slots):
+            hour, minute = divmod(8 * 60 + 30 + 50 * slot, 60)
+            time = (hour - 12 if hour > 12 else hour) + minute / 100
+            teams, leagues = [None], [None]
+            for _ in range(courts):
+                age = rnd.choice(AGES)
+                gender = rnd.choice(["boys", "girls", "mixed"])
+                teams.append(
+                    f"{rnd.choice(COLOURS)} Club{rnd.randrange(100):02d} vs Magic {rnd.choice(COLOURS)}"
+                )
+                leagues.append(f"u/{age} {gender} Div{rnd.randint(1, 4)}")
+            ws.append(teams)
+            ws.append([time] + [None] * courts)
+            ws.append(leagues)
+    wb.save(file_name)
+    return file_name
@@ -0,0 +1,346 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import contextlib
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl  # file locks for cross-process coalescing (not available on Windows)
+except ImportError:
+    fcntl = None
+
+import utils
+
+# seconds after which a half-written flight result is taken as left by a process that died
+FLIGHT_TMP_AGE = 3600
+
+###########################################################
+# LOCAL STORE OF PLAYHQ RESPONSES & SHORT URLS
+###########################################################
+
+
+class ResponseStore:
+    """Local store of PlayHQ response pages and short URLs, warmed ahead by prefetch.py
+
+    The pages of each endpoint (e.g., "teams/<id>/fixture") are saved in one JSON file with
+    the time they were fetched, and are served from the store while younger than max_age.
+    Short URLs never change, so they are kept forever in a single JSON file.
+
+    Args:
+        path (str): folder of the store (created if needed)
+        max_age (timedelta, optional): how long stored pages are served before fetching them again
+    """
+
+    def __init__(self, path, max_age=datetime.timedelta(days=1)) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(path, "pages"), exist_ok=True)
+
+        self.short_urls_file = os.path.join(path, "short_urls.json")
+        self.short_urls = {}
+        if os.path.exists(self.short_urls_file):
+            with open(self.short_urls_file, "r") as f:
+                self.short_urls = json.load(f)
+
+    def page_file(self, key):
+        return os.path.join(self.path, "pages", f"{key.replace('/', '_')}.json")
+
+    def get_pages(self, key, max_age=None):
+        """The stored pages of endpoint key, or None if not stored or older than max_age
+
+        Args:
+            key (str): the endpoint, e.g., "seasons/<id>/teams"
+            max_age (timedelta, optional): overrides the max_age of the store for this endpoint
+        """
+        file_name = self.page_file(key)
+        if not os.path.exists(file_name):
+            return None
+        with open(file_name, "r") as f:
+            stored = json.load(f)
+
+        age = datetime.datetime.now(datetime.timezone.utc) - datetime.datetime.fromisoformat(
+            stored["fetched"]
+        )
+        if age > (self.max_age if max_age is None else max_age):
+            logging.debug(f"Stored pages of {key} are too old ({age}); fetching them again")
+            return None
+        return stored["pages"]
+
+    def put_pages(self, key, pages):
+        utils.write_json_atomic(
+            self.page_file(key),
+            {
+                "key": key,
+                "fetched": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "pages": pages,
+            },
+        )
+
+    def iter_pages(self, key, fetch, max_age=None):
+        """Iterate the pages of endpoint key from the store, fetching (and storing) them if needed
+
+        If the consumer stopped early when the pages were stored (or the fetch failed half-way),
+        the iteration continues live from the cursor of the last stored page.
+
+        Args:
+            key (str): the endpoint, e.g., "seasons/<id>/teams"
+            fetch (function): fetch(cursor) returns a live iterator of pages from cursor (None for the first page)
+            max_age (timedelta, optional): overrides the max_age of the store for this endpoint
+        """
+        pages = self.get_pages(key, max_age)
+        cursor = None
+        if pages is not None:
+            yield from pages
+            metadata = (pages[-1].get("metadata") if pages else None) or {"hasMore": False}
+            if not metadata.get("hasMore", False):
+                return
+            cursor = metadata["nextCursor"]  # resume live where the stored pages stop
+        else:
+            pages = []
+
+        try:
+            for data_json in fetch(cursor):
+                pages.append(data_json)
+                yield data_json
+        finally:
+            if pages:
+                self.put_pages(key, pages)
+
+    def shorten_url(self, url):
+        """Short URL of url, from the store or shortened (and stored) now"""
+        with self.lock:
+            if url in self.short_urls:
+                return self.short_urls[url]
+
+        short_url = utils.shorten_url(url)
+        if short_url == url:  # TinyURL failed: try again next time
+            return short_url
+        with self.lock:
+            self.short_urls[url] = short_url
+            utils.write_json_atomic(self.short_urls_file, self.short_urls)
+        return short_url
+
+
+###########################################################
+# SHORT-LIVED IN-MEMORY CACHE
+###########################################################
+
+
+class TTLCache:
+    """Thread-safe in-memory cache whose entries expire ttl after being stored
+
+    Used for responses that change often (e.g., game summaries while an association is
+    filling in finals), so repeated lookups within a run do not hit PlayHQ again but a
+    later run sees the updates.
+
+    Args:
+        ttl (timedelta, optional): how long an entry is served after being stored
+    """
+
+    def __init__(self, ttl=datetime.timedelta(minutes=5)) -> None:
+        self.ttl = ttl.total_seconds()
+        self.lock = threading.Lock()
+        self.entries = {}  # key -> (expiry time, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """The value of key, or default if not stored or expired"""
+        with self.lock:
+            expiry, value = self.entries.get(key, (0, default))
+            if expiry < time.monotonic():
+                self.entries.pop(key, None)
+                return default
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+
+
+###########################################################
+# SINGLE-FLIGHT REQUEST COALESCING
+###########################################################
+
+
+class Flight:
+    """A call in progress and, once done, its result or error"""
+
+    __slots__ = ["done", "result", "error"]
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls: the first one runs, the others wait and share its result
+
+    Within a process, callers with the same key while a call is in flight just wait for it.
+    With a path, the call also takes a lock file for its key, so other processes sharing the
+    path (e.g., the notebook, a watch process and batch jobs) that ask while it is in flight
+    wait for it and read the result it leaves. Results must be JSON data to be shared this way.
+
+    Results are only shared with the calls that were waiting: a call made once the result
+    is written runs again. The last process taking part in a call (the one that made it
+    or one that waited for it) deletes its result and lock files, and files left by
+    processes that died half-way are removed when a SingleFlight is created on the path,
+    so the folder only holds the calls in flight.
+
+    Args:
+        path (str, optional): folder for the lock and result files (None: only within the process)
+    """
+
+    def __init__(self, path=None) -> None:
+        if path is not None and fcntl is None:
+            logging.warning("No file locks in this platform: requests only coalesced within the process")
+            path = None
+        self.path = path
+        self.lock = threading.Lock()
+        self.flights = {}  # key -> Flight
+        self.calls = 0  # calls that ran
+        self.shared = 0  # calls served with the result of another call
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.clean()
+
+    def do(self, key, fn):
+        """Result of fn(), or of the identical call (same key) already in flight"""
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Flight()
+
+        if not leader:
+            flight.done.wait()
+            with self.lock:
+                self.shared += 1
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = self.run(key, fn)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    def call(self, fn):
+        with self.lock:
+            self.calls += 1
+        return fn()
+
+    def run(self, key, fn):
+        if self.path is None:
+            return self.call(fn)
+
+        name = hashlib.sha1(json.dumps(key).encode("utf-8")).hexdigest()
+        base = os.path.join(self.path, name)
+        arrived = time.time()
+        with self.join_flight(base) as lock_file:
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:  # another process has the call in flight: wait for it
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+                    try:
+                        result = self.read_result(f"{base}.json", arrived)
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    if result is not None:
+                        with self.lock:
+                            self.shared += 1
+                        return result["result"]
+                    # the call failed, or ended before we asked and is still being read: once
+                    # its readers are done, make the call ourselves
+                    time.sleep(0.01)
+                    continue
+
+                try:
+                    result = self.call(fn)
+                    utils.write_json_atomic(f"{base}.json", {"done": time.time(), "result": result})
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                return result
+
+    @contextlib.contextmanager
+    def join_flight(self, base):
+        """Within the block, this process takes part in the flight of base (the lock file is given)
+
+        Each process taking part holds a shared lock on the .wait file, so the files of the
+        flight (.wait, .lock and .json) are deleted by the last one to leave.
+        """
+        while True:
+            wait_file = open(f"{base}.wait", "a")
+            fcntl.flock(wait_file, fcntl.LOCK_SH)
+            try:
+                if os.fstat(wait_file.fileno()).st_ino == os.stat(f"{base}.wait").st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            wait_file.close()  # deleted by the last process of a flight that just ended: join anew
+
+        try:
+            with open(f"{base}.lock", "a") as lock_file:
+                yield lock_file
+        finally:
+            fcntl.flock(wait_file, fcntl.LOCK_UN)
+            self.end_flight(wait_file, base)
+            wait_file.close()
+
+    @staticmethod
+    def end_flight(wait_file, base):
+        """Delete the files of the flight if no other process takes part in it anymore"""
+        try:
+            fcntl.flock(wait_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:  # the last process to leave deletes them
+            return
+        try:
+            for ext in [".json", ".lock", ".wait"]:
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(f"{base}{ext}")
+        finally:
+            fcntl.flock(wait_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def read_result(result_file, arrived):
+        """The result left in result_file by a call that ended after arrived, or None"""
+        try:
+            with open(result_file, "r") as f:
+                result = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return result if result["done"] >= arrived else None
+
+    def clean(self):
+        """Remove the files of calls no process has in flight (e.g., left by a process that died)"""
+        for file_name in os.listdir(self.path):
+            base, ext = os.path.splitext(os.path.join(self.path, file_name))
+            if file_name.startswith(".tmp-"):  # result being written, unless left long ago
+                with contextlib.suppress(FileNotFoundError):
+                    if time.time() - os.path.getmtime(f"{base}{ext}") > FLIGHT_TMP_AGE:
+                        os.remove(f"{base}{ext}")
+            elif ext == ".wait":
+                with open(f"{base}.wait", "a") as wait_file:
+                    self.end_flight(wait_file, base)
+            elif not os.path.exists(f"{base}.wait"):  # files of a flight are deleted .wait last
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(f"{base}{ext}")
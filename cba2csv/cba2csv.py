@@ -3,13 +3,17 @@ import sys
 import argparse
 
 import csv
+import collections
+import itertools
 import openpyxl  # https://openpyxl.readthedocs.io/en/stable/
+from openpyxl.utils import get_column_letter
 import pandas
 
 import re
 
 import datetime
 import calendar
+from concurrent.futures import ProcessPoolExecutor
 
 import logging
 import coloredlogs
@@ -51,6 +55,9 @@ def month_str_to_number(string):
 def write_games_csv(games, csv_header, filename):
     print(filename)
     with open(filename, 'w') as f:
+        if isinstance(games, pandas.DataFrame):   # write the whole table at once
+            games.to_csv(f, columns=csv_header, index=False, lineterminator='\r\n')
+            return
         writer = csv.DictWriter(
             f, fieldnames=csv_header, extrasaction='ignore')
         writer.writeheader()
@@ -61,7 +68,7 @@ def extract_cba_games(coburg_sheet, game_date=None, year=None, game_length_min=4
     """Builds a list of dictionaries, each dictionary representing a game from a  Coburg Excel sheet
 
     Args:
-        coburg_sheet (str): filename of the Excel sheet sent by Coburg
+        coburg_sheet (Worksheet): a sheet of the Excel file sent by Coburg (read-only sheets are streamed row by row)
         game_date (date): the day of the game, if any (otherwise extract from sheet)
         game_length_min (int, optional): how long is each game. Defaults to 40.
 
@@ -69,7 +76,7 @@ def extract_cba_games(coburg_sheet, game_date=None, year=None, game_length_min=4
         [list(dict)]: a list of dictionaries, each dictionary representing a game with all its info.
                     The dictionary is closed to what TeamAPP needs but not quite there
             e.g.,
-            {'start_date': datetime.date(2021, 8, 7), 'end_date': datetime.date(2021, 8, 7), 'start_time': datetime.time(8, 30), 'end_time': datetime.time(9, 10), 'location': 'Coburg Court 2', 'team1': 'Magic Gold', 'team2': 'Piranhas Neon', 'league': 'U9 Mixed'}
+            {'cell': "'Sheet1'.C6", 'start_date': datetime.date(2021, 8, 7), 'end_date': datetime.date(2021, 8, 7), 'start_time': datetime.time(8, 30), 'end_time': datetime.time(9, 10), 'location': 'Coburg Court 2', 'team1': 'Magic Gold', 'team2': 'Piranhas Neon', 'league': 'U9 Mixed'}
     """
     def get_team_id(league):
         """Build the league name
@@ -100,70 +107,68 @@ def extract_cba_games(coburg_sheet, game_date=None, year=None, game_length_min=4
 
         return f"U{age} {gender}"
 
-    if game_date is None:
-        # First line of sheet contains the day of the game as two strings ("7th August" and "Winter 2021"
-        # Store into date which will then be added the actual time
-        day_str = coburg_sheet["C1"].value.strip()   # cell C1: "7th August"
-        day_no_str = re.search("\d+", day_str).group(0)
-        day_no = int(day_no_str)
-        month_name = day_str.split(" ")[1]
-        month_no = month_str_to_number((month_name))
-        # game_date = datetime.datetime.strptime(f"{year}-{month_no}-{day_no}", "%Y-%m-%d")
-        game_date = datetime.date(year, month_no, day_no)
+    def row_value(row, k):
+        # rows in read-only mode may be shorter than others when trailing cells are empty
+        return row[k] if k < len(row) else None
+
+    # iterate the sheet row by row; works with read-only (streaming) worksheets
+    rows = coburg_sheet.iter_rows(values_only=True)
+    row1 = next(rows, ())   # row 1: day, season and year of the games
+    row2 = next(rows, ())   # row 2: list of courts
 
     if year is None:
         # Parse first row to get year if possible
-        row1 = list(coburg_sheet.iter_rows(min_row=1, max_row=1, max_col=10))[0]
-        for cell in row1:
-            if cell.value is not None:
-                match = re.search("\d\d\d\d", cell.value.strip())
+        for value in row1[:10]:
+            if value is not None:
+                match = re.search("\d\d\d\d", str(value).strip())
                 if match:
                     year = int(match.group(0))
                     break
         if year is None:
-            logging.error(f"Problem, could not extract year in first row of sheet {coburg_sheet}")
+            logging.error(f"Problem, could not extract year in first row of sheet {coburg_sheet.title}")
             exit(1)
-
-        # Alternative by enumerating cells in row 1 - ugly
-        # header_cells = ["E1", "F1", "G1", "H1", "I1", "J1"]
-        # for c in header_cells:
-        #     if coburg_sheet[c].value is not None:
-        #         match = re.search("\d\d\d\d", coburg_sheet[c].value.strip())
-        #         if match:
-        #             year = int(match.group(0))
-        #             break
         logging.warning(f"Extracted year (this is very fragile!): {year}")
 
+    if game_date is None:
+        # First line of sheet contains the day of the game as two strings ("7th August" and "Winter 2021"
+        # Store into date which will then be added the actual time
+        day_str = row_value(row1, 2).strip()   # cell C1: "7th August"
+        day_no_str = re.search("\d+", day_str).group(0)
+        day_no = int(day_no_str)
+        month_name = day_str.split(" ")[1]
+        month_no = month_str_to_number((month_name))
+        # game_date = datetime.datetime.strptime(f"{year}-{month_no}-{day_no}", "%Y-%m-%d")
+        game_date = datetime.date(year, month_no, day_no)
+
     # line 2 has the list of courts available, starting from second colum (first is "TIME")
     #  ['Coburg Court 1', 'Coburg Court 2', 'Coburg Court 3', 'Coburg Court 4'] for Coburg sheet
     # ['Northcote High', 'Oak Park', 'PVG', 'St.Johns'] for external sheet
-    courts = [cell.value for cell in coburg_sheet[2]
-              [1:] if cell.value != "TIME"]
+    courts = [value for value in row2[1:] if value != "TIME"]
 
     # OK so next we collect all games in a list, each game will be a dictionary
     # games start in row three, they are listed by time-slot, each using 3 consecutive lines
     #       columns from B represent different courts.
     #          So lines 3-5 will have the 8:30 slot games, and each colum B-E is a court game
+    # We slide a window of three rows over the sheet, so only three rows are held at any time
     games_db = []
-    games_range = list(coburg_sheet[3:coburg_sheet.max_row])
-    no_time_slots = len(games_range) // 3    # no of time-slot in the sheet
+    window = collections.deque([(), ()], maxlen=3)
 
     logging.debug(
-        f"Processing sheet {coburg_sheet.title} with {no_time_slots} time slot games on courts {courts}")
-    for n in range(len(games_range)):
+        f"Processing sheet {coburg_sheet.title} on courts {courts}")
+    # an empty row at the end lets the last row be the middle of the window
+    for row_no, row in enumerate(itertools.chain(rows, [()]), start=3):
+        window.append(row)
+        # each time slot is built from three consecutives rows (tuples of cell values)
+        # row_1 contains the teams playing, e.g., "Flames2 vs Jets Blue"
+        # row_2 contains the time in the first column, then all blank!
+        # row_3 contains the league division, e.g., "u/19 boys Div1"
+        row_1, row_2, row_3 = window
+
         # the value in the sheet is read as a float because it is 4.5
-        time = games_range[n][0].value
+        time = row_value(row_2, 0)
         if time is None:
             continue
 
-        # each time slot is built from three consecutives rows
-        # contains the teams playing, e.g., "Flames2 vs Jets Blue"
-        # each row_x is a tuple of 'openpyxl.cell.cell.Cell'
-        row_1 = games_range[n-1]
-        # contains the time in the first column, then all blank!
-        row_2 = games_range[n]
-        # contains the league division, e.g., "u/19 boys Div1"
-        row_3 = games_range[n+1]
         # extract hour of games
         hr = int(time)
         if hr < 7:  # shift hr to 234hrs format
@@ -173,12 +178,14 @@ def extract_cba_games(coburg_sheet, game_date=None, year=None, game_length_min=4
         logging.debug(f"=======> Processing games at time {time}")
         for k in range(len(row_1)-1):
             game_dict = dict()
-            cell_teams = row_1[k+1]  # class <class 'openpyxl.cell.cell.Cell'>
-            cell_league = row_3[k+1] # class <class 'openpyxl.cell.cell.Cell'>
-            if cell_teams.value is not None:
-                logging.debug(f"Processing game {cell_teams.value} in cell {cell_teams}.")
+            teams = row_1[k+1]
+            league = row_value(row_3, k+1)
+            if teams is not None:
+                # coordinate of the teams cell, e.g., 'Sheet1'.C6 (to locate glitches in the sheet)
+                cell = f"'{coburg_sheet.title}'.{get_column_letter(k+2)}{row_no-2}"
+                logging.debug(f"Processing game {teams} in cell {cell}.")
                 # date = datetime.datetime.strptime(f"{year}-{month_no}-{day_no}", "%Y-%m-%d")
-                game_dict["cell"] = cell_teams
+                game_dict["cell"] = cell
                 game_dict["start_date"] = game_date
                 game_dict["end_date"] = game_date
                 game_dict["start_time"] = datetime.time(hour=hr, minute=min)
@@ -187,15 +194,15 @@ def extract_cba_games(coburg_sheet, game_date=None, year=None, game_length_min=4
                 game_dict["end_time"] = (datetime.datetime.combine(datetime.date(
                     1, 1, 1), game_dict["start_time"]) + datetime.timedelta(minutes=game_length_min)).time()
 
-                game_dict["location"] = coburg_sheet[2][k+1].value.strip()
+                game_dict["location"] = row_value(row2, k+1).strip()
                 game_dict["court"] = ""
                 if "Coburg Court" in game_dict["location"]:
                     game_dict["court"] = "Court " + re.search("\d", game_dict["location"]).group(0) # extract the court number ("Coburg Court 3")
                     game_dict["location"] = "Coburg Basketball Stadium"
-                game_dict["team1"] = cell_teams.value.upper().split("VS")[0].strip().title()     # handles any vs, VS, Vs, vS combinations
-                game_dict["team2"] = cell_teams.value.upper().split("VS")[1].strip().title()
-                game_dict["league"] = get_team_id(cell_league.value)
-                logging.debug(f"\tGame {cell_teams.value} in cell {cell_teams} processed successfully.")
+                game_dict["team1"] = teams.upper().split("VS")[0].strip().title()     # handles any vs, VS, Vs, vS combinations
+                game_dict["team2"] = teams.upper().split("VS")[1].strip().title()
+                game_dict["league"] = get_team_id(league)
+                logging.debug(f"\tGame {teams} in cell {cell} processed successfully.")
                 games_db.append(game_dict)
 
     return games_db
@@ -208,6 +215,352 @@ def get_venue_info(venue_key):
         return VENUES_INFO[venue_key]
 
 
+class VenueIndex:
+    """Resolves the location of a game to its venue data in a VENUES_INFO-like dictionary
+
+    Built once: aliases (keys pointing to another key) are flattened to their venue data,
+    and all keys are compiled into a single regular expression, so each location is
+    matched in one pass over the string, whatever the number of venues. Results are
+    cached per location string, as the same few locations repeat across games.
+
+    When several keys occur in a location, the one starting first wins and, among those,
+    the longest (most specific) one. Ties are resolved by the order in the dictionary.
+    """
+
+    def __init__(self, venues_info) -> None:
+        self.venues = {key: self.resolve(venues_info, key) for key in venues_info}
+
+        keys = sorted(venues_info, key=len, reverse=True)   # stable: keeps dictionary order on ties
+        self.pattern = re.compile("|".join(re.escape(key) for key in keys))
+        self.cache = {}
+
+        for key in keys:
+            for other in keys:
+                if other != key and other in key and self.venues[other] != self.venues[key]:
+                    logging.warning(
+                        f"Venue key \"{other}\" is part of key \"{key}\" but they are different venues; \"{key}\" will be used when both match")
+
+    @staticmethod
+    def resolve(venues_info, key):
+        seen = set()
+        while isinstance(venues_info[key], str):  # re-naming pointing to another key
+            if key in seen:
+                raise ValueError(f"Cycle of venue aliases at key {key}")
+            seen.add(key)
+            key = venues_info[key]
+        return venues_info[key]
+
+    def lookup(self, location):
+        """Venue data tuple (name, address, address tip) for a location, or None if no key matches"""
+        if location not in self.cache:
+            match = self.pattern.search(location)
+            self.cache[location] = None if match is None else self.venues[match.group(0)]
+        return self.cache[location]
+
+
+class ScheduleError(Exception):
+    """A problem in the games (e.g., unknown venue or team) that stops a schedule from being produced"""
+
+
+# columns of a PlayHQ advanced fixture CSV report used to extract the games
+PLAYHQ_CSV_COLUMNS = ['game date', 'grade', 'team a', 'team b', 'venue', 'playing surface', 'time']
+
+
+def detect_file_format(file_name):
+    """Detect the format of a games file from its content, not its extension
+
+    Args:
+        file_name (str): the file to inspect
+
+    Returns:
+        str: "xlsx" for an Office 2007+ spreadsheet, "playhq" for a PlayHQ advanced fixture CSV report, or None if unknown
+    """
+    with open(file_name, 'rb') as f:
+        head = f.read(4096)
+
+    if head.startswith(b'PK\x03\x04'):   # .xlsx files are zip containers
+        return "xlsx"
+
+    lines = head.decode('utf-8-sig', errors='replace').splitlines()
+    header = next(csv.reader(lines[:1]), [])
+    if set(PLAYHQ_CSV_COLUMNS).issubset(x.strip().lower() for x in header):
+        return "playhq"
+    return None
+
+
+def read_playhq_games(file_name, club, from_date, to_date, game_length_min=40):
+    """Extract the club games between two dates (inclusive) from a PlayHQ advanced fixture CSV report
+
+    The report is loaded column-wise: dates and times are parsed in bulk and the date window
+    and club are filtered in one pass, so whole-season reports load quickly.
+
+    Args:
+        file_name (str): the CSV file exported from PlayHQ
+        club (str): name of the club to extract games
+        from_date (date): first day of games to extract
+        to_date (date): last day of games to extract
+        game_length_min (int, optional): how long is each game. Defaults to 40.
+
+    Returns:
+        [list(dict)]: a list of dictionaries, each dictionary representing a club game (as in extract_cba_games)
+    """
+    playhq_df = pandas.read_csv(file_name, dtype=str, keep_default_na=False, encoding='utf-8-sig',
+                                usecols=lambda x: x.strip().lower() in PLAYHQ_CSV_COLUMNS)
+    playhq_df.columns = playhq_df.columns.str.strip().str.lower()
+
+    # filter just the club games within the dates
+    dates = pandas.to_datetime(playhq_df['game date'], format="%d/%m/%Y")
+    mask = (dates >= pandas.Timestamp(from_date)) & (dates <= pandas.Timestamp(to_date)) & \
+        (playhq_df['team a'].str.contains(club, regex=False) | playhq_df['team b'].str.contains(club, regex=False))
+    playhq_df = playhq_df.loc[mask].assign(date=dates[mask].dt.date)
+
+    no_time = playhq_df['time'].str.strip() == ""
+    for team_a, team_b, date in playhq_df.loc[no_time, ['team a', 'team b', 'date']].itertuples(index=False):
+        logging.warning(f"Game {team_a} vs {team_b} on {date} has no time yet - Skipping")
+    playhq_df = playhq_df.loc[~no_time]
+
+    # there are only a few different times in a season, so parse each one once
+    times = playhq_df['time'].unique()
+    start_times = pandas.to_datetime(pandas.Series(times), format="%H:%M:%S")
+    end_times = start_times + pandas.Timedelta(minutes=game_length_min)
+    games_df = pandas.DataFrame({
+        'team1': playhq_df['team a'],   # e.g., "Magic U16 Girls Gold"
+        'team2': playhq_df['team b'],
+        'start_date': playhq_df['date'],
+        'end_date': playhq_df['date'],
+        'start_time': playhq_df['time'].map(dict(zip(times, start_times.dt.time))),
+        'end_time': playhq_df['time'].map(dict(zip(times, end_times.dt.time))),
+        'location': playhq_df['venue'],
+        'court': playhq_df['playing surface'],
+        'league': playhq_df['grade'].str.extract(r"^\S+\s+(\S+\s+\S+)", expand=False),  # 'Saturday U16 Girls Division 1/2' --> 'U16 Girls'
+    })
+    games_club = [dict(zip(games_df.columns, game)) for game in zip(*(games_df[x].tolist() for x in games_df.columns))]
+
+    logging.info(f"Finished extracting {len(games_club)} club games from PLAYHQ CSV {file_name}")
+    return games_club
+
+
+def read_cba_games(file_name, sheet_name, club, game_date=None, game_length_min=40):
+    """Extract the club games in one sheet of a CBA spreadsheet
+
+    Args:
+        file_name (str): the Excel file sent by Coburg
+        sheet_name (str): the sheet in the file to extract games from
+        club (str): name of the club to extract games
+        game_date (date, optional): the day of the games (otherwise extracted from the sheet)
+        game_length_min (int, optional): how long is each game. Defaults to 40.
+
+    Returns:
+        [list(dict)]: a list of dictionaries, each dictionary representing a club game (as in extract_cba_games)
+    """
+    wb = openpyxl.load_workbook(file_name, read_only=True)
+    logging.info(f"Processing sheet: {sheet_name}")
+    games_cba = extract_cba_games(wb[sheet_name], game_date=game_date, game_length_min=game_length_min)
+    wb.close()
+    logging.info(f"Extracted {len(games_cba)} total games in sheet {sheet_name}.")
+
+    # Project on the team of the club only - in our case Magics
+    games_club = []
+    for game in games_cba:
+        if club.upper() in game['team1'].upper() or club.upper() in game['team2'].upper():
+            games_club.append(game)
+            logging.debug(f"This is a club ({club}) game: {game['team1']} vs {game['team2']} from {game['cell']}")
+        else:
+            logging.debug(f"This is NOT a club ({club}) game: {game['team1']} vs {game['team2']} from {game['cell']}")
+    return games_club
+
+
+def read_games_job(job):
+    """Extract the club games of one job: (file name, sheet name or None for a PlayHQ CSV, dict of options)
+
+    This is run in the worker processes in batch mode, so it only takes and returns picklable data.
+    """
+    file_name, sheet_name, options = job
+    if sheet_name is None:
+        return read_playhq_games(file_name, options['club'], options['from_date'], options['to_date'],
+                                 options['game_length_min'])
+    return read_cba_games(file_name, sheet_name, options['club'], options['game_date'],
+                          options['game_length_min'])
+
+
+def build_club_schedule(games_club, club, schedule_id=None, description=DESCRIPTION, description_bye=DESCRIPTION_BYE,
+                        options=None, club_teams=CLUB_TEAMS, venue_index=None):
+    """Build the TeamAPP records of the club games of one game day, including the BYE of teams not playing
+
+    All games are processed as one table: a game between two club teams is exploded into one
+    record per club team, team and opponent names are derived column-wise, and venues are
+    joined from a small table with one entry per distinct location.
+
+    Args:
+        games_club (list(dict)): the club games of the day, as per read_playhq_games or read_cba_games
+        club (str): name of the club
+        schedule_id (str, optional): identification of the schedule (e.g., "Grading 1" or "Game 4")
+        description (str, optional): text template for the description of each game
+        description_bye (str, optional): text for the description of each BYE
+        options (dict, optional): TeamAPP options rsvp, comments, attendance_tracking, duty_roster and ticketing
+        club_teams (set, optional): the names of the teams of the club in TeamAPP
+        venue_index (VenueIndex, optional): venue matcher to re-use across schedules (built from VENUES_INFO if None)
+
+    Raises:
+        ScheduleError: if a game has an unknown venue or a team that does not exist in the club
+
+    Returns:
+        pandas.DataFrame: one TeamAPP record per row
+    """
+    if options is None:
+        options = dict(rsvp=1, comments=1, attendance_tracking=0, duty_roster=1, ticketing=0)
+    if venue_index is None:
+        venue_index = VenueIndex(VENUES_INFO)
+
+    # 2. Extract date of first game
+    date_games = games_club[0]['start_date']
+
+    # 3. Extract Club team and opponent team; one record per club team (two if both are Club's teams)
+    games_df = pandas.DataFrame(games_club)
+    club_upper = club.upper()
+    is_club1 = games_df['team1'].str.upper().str.contains(club_upper, regex=False)
+    is_club2 = games_df['team2'].str.upper().str.contains(club_upper, regex=False)
+    games_df['club_side'] = (is_club1.map({True: "team1", False: ""}) + " " +
+                             is_club2.map({True: "team2", False: ""})).str.split()
+    games_df = games_df.explode('club_side', ignore_index=True)
+    games_df = games_df.loc[games_df['club_side'].notna()]
+    # the second record of games between two club teams go last
+    is_copy = games_df.duplicated(subset=games_df.columns.drop('club_side'))
+    games_df = pandas.concat([games_df.loc[~is_copy], games_df.loc[is_copy]])
+
+    is_team1 = games_df['club_side'] == "team1"
+    club_team = games_df['team1'].where(is_team1, games_df['team2'])
+    # build "U12 Boys Gold" from "Magic U12 Boys Gold"
+    games_df['team_name'] = (games_df['league'] + " " + club_team.str.split().str[-1]).str.title()
+    games_df['opponent'] = games_df['team2'].where(is_team1, games_df['team1']) \
+        .str.replace(r" U\d* ", " ", regex=True)  # remove the UXX in opponent
+    games_df = games_df.drop(columns='club_side')
+    unknown_df = games_df.loc[~games_df['team_name'].isin(club_teams)]
+    games_df = games_df.loc[games_df['team_name'].isin(club_teams)]
+
+    # 4. Add teamapp options to each game record
+    for team_name, opponent, start_time, location in \
+            zip(*(games_df[x].tolist() for x in ['team_name', 'opponent', 'start_time', 'location'])):
+        logging.info(f"Found game for club team {team_name}: against {opponent} at {start_time} in {location}")
+
+    # U12 Boys Gold - Grading 1
+    games_df['event_name'] = games_df['team_name'] + (f" - {schedule_id}" if schedule_id is not None else "")
+    games_df['access_groups'] = games_df['team_name']
+
+    # join the venue of each distinct location: (location, venue name, address, address tips)
+    venues = []
+    for location in games_df['location'].unique():
+        venue_data = venue_index.lookup(location)
+        if venue_data is not None:
+            venues.append((location, venue_data[0], venue_data[1],
+                           f" ({venue_data[2]})" if venue_data[2] is not None else ""))
+    venues_df = pandas.DataFrame(venues, columns=['location', 'venue', 'address', 'addr_tips'])
+    games_df = games_df.merge(venues_df, on='location', how='left')
+
+    # could't fill the venue of a game: venue data not found!
+    if games_df['venue'].isna().any():
+        game = games_df.loc[games_df['venue'].isna()].iloc[0]
+        raise ScheduleError(f"Error, no venue matched for {game.dropna().to_dict()}")
+    games_df['location'] = games_df.pop('address')  # address of venue
+
+    # Build the whole description of the game
+    games_df['description'] = [
+        description.format(opponent=opponent, venue=venue, court=court, address=address, address_tips=addr_tips)
+        for opponent, venue, court, address, addr_tips in
+        zip(*(games_df[x].tolist() for x in ['opponent', 'venue', 'court', 'location', 'addr_tips']))]
+    for option in ["rsvp", "comments", "attendance_tracking", "duty_roster", "ticketing"]:
+        games_df[option] = options[option]
+    games_df['reference_id'] = ""
+
+    # 5. Add BYE games
+    teams_bye = sorted(club_teams.difference(games_df['team_name']).difference(unknown_df['team_name']))
+
+    if not teams_bye:
+        logging.info("No teams have a BYE game; all are playing!")
+    else:
+        logging.info("Teams having BYE (i.e., have not found any game for club team):")
+        for team in teams_bye:
+            print(f"\t {team}")
+
+        byes_df = pandas.DataFrame({
+            'team_name': teams_bye,
+            'access_groups': teams_bye,
+            'start_date': date_games,
+            'end_date': date_games,
+            'start_time': datetime.time(hour=11, minute=00),
+            'end_time': datetime.time(hour=12, minute=00),
+            'event_name': [f"{team} - BYE" for team in teams_bye],
+            'opponent': "",
+            'location': "",
+            'venue': "",
+            'description': description_bye,
+            'rsvp': 0,
+            'comments': 0,
+            'attendance_tracking': 0,
+            'duty_roster': 0,
+            'ticketing': 0,
+            'reference_id': "",
+        })
+        games_df = pandas.concat([games_df, byes_df], ignore_index=True)
+
+    #  6. Check for games on teams that do no exist in the club; something is wrong!
+    if not unknown_df.empty:
+        game = unknown_df.iloc[0]
+        logging.error(f"Found game for NON-EXISTENT CLUB team {game['team_name']}: against {game['opponent']} at {game['start_time']} in {game['location']}")
+        raise ScheduleError(f"Check if this would correspond to some BYE team above. Fix the sheet and re-run script")
+
+    return games_df
+
+
+def report_games(games_df):
+    #  8. Report Games
+    print("=========================================")
+    print("GAMES EXTRACTED")
+    print("=========================================")
+    for g in games_df.sort_values('team_name', kind='stable').to_dict('records'):
+        if g['venue'] != "": # not a bye
+            print(f"{g['team_name']} vs {g['opponent']} @ {g['venue']} - {g['start_time']}"  )
+        else:
+            print(f"{g['team_name']} has a BYE")
+    print("=========================================")
+
+
+def write_schedule_csvs(games_club, club, schedule_id, source_file, output_path=None):
+    """Write the SCHEDULE and EVENT CSV files for TeamAPP of the games of one day
+
+    Files are named after the date of the games, the club, the schedule id and the source file,
+    e.g., "2022-05-14.Magic_Grading-2_SCHEDULE-playhq-advanced_fixture_2022050412207.csv"
+
+    Returns:
+        (str, str): the file names of the schedule and event CSV files
+    """
+    #  9. Produce CSV for TeamAPP
+    schedule_file_path = os.path.split(source_file)[0] if output_path is None else output_path
+    schedule_file_name = os.path.splitext(os.path.split(source_file)[1])[0]   # without extension
+    date_games = games_club['start_date'].iloc[0]
+
+    csv_header_schedule = ["event_name",  "team_name", "start_date", "end_date", "start_time", "end_time", "description",
+                           "location", "access_groups", "rsvp", "comments", "attendance_tracking", "duty_roster", "ticketing", "reference_id"]
+
+    # prefix e.g., "2022-05-14.Magic_Grading-2"
+    prefix = f"{date_games}.{club}" + (f"_{schedule_id.replace(' ', '-')}" if schedule_id is not None else "")
+
+    # write the CSV to import as a SCHEDULE
+    schedule_csv = os.path.join(schedule_file_path, f"{prefix}_SCHEDULE-{schedule_file_name}.csv")
+    write_games_csv(games_club, csv_header_schedule, schedule_csv)
+    logging.info(
+        f"CSV schedule file for TeamAPP produced for team {club} ({len(games_club)} games: {schedule_csv}.")
+
+    # write the CSV to import as an EVENT
+    csv_header_events = [x for x in csv_header_schedule if x != "team_name"]
+    events_csv = os.path.join(schedule_file_path, f"{prefix}_EVENT-{schedule_file_name}.csv")
+    write_games_csv(games_club, csv_header_events, events_csv)
+    logging.info(
+        f"CSV event file for TeamAPP produced for team {club} ({len(games_club)} games: {events_csv}.")
+
+    return schedule_csv, events_csv
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="""
@@ -218,12 +571,17 @@ if __name__ == "__main__":
         E.g.,:
 
         $ python cob2csv.py Saturday\ 6th\ November\ 2021\ -Grading\ 1\ updated.xlsx --id "Grading 1"
+
+        Many files can be given at once, and a date range to produce the CSV files of every game day in it:
+
+        $ python cba2csv.py R*.xlsx playhq-advanced_fixture.csv Magic --from-date 2022-04-30 --to-date 2022-09-03
         """
     )
     parser.add_argument(
         dest='COBURG_SHEET',
         type=str,
-        help='The Excel sheet Coburg sends with games.'
+        nargs='+',
+        help='The Excel sheet Coburg sends with games, or a PlayHQ advanced fixture CSV (many can be given).'
     )
     parser.add_argument(
         dest='CLUB',
@@ -232,12 +590,37 @@ if __name__ == "__main__":
     )
     parser.add_argument(
         '--id',
-        help='Identification of the schedule (e.g., "Grading 1" or "Game 4").'
+        help='Identification of the schedule (e.g., "Grading 1" or "Game 4"); only for a single game day.'
     )
     parser.add_argument(
         '--description',
         help='Filename with alternative description text to use.'
     )
+    parser.add_argument(
+        '--date',
+        type=datetime.date.fromisoformat,
+        help='Day of the games as YYYY-MM-DD (default: the upcoming Saturday).'
+    )
+    parser.add_argument(
+        '--from-date',
+        type=datetime.date.fromisoformat,
+        help='Produce CSV files for every game day from this date (YYYY-MM-DD); CBA sheets dates are read from the sheet.'
+    )
+    parser.add_argument(
+        '--to-date',
+        type=datetime.date.fromisoformat,
+        help='Last game day to produce CSV files for (YYYY-MM-DD, default: same as --from-date).'
+    )
+    parser.add_argument(
+        '--output',
+        help='Folder to write the CSV files (default: the folder of each input file).'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=os.cpu_count(),
+        help='Number of worker processes to parse files and sheets (default: %(default)s).',
+    )
     parser.add_argument(
         '--no-rsvp',
         action="store_true",
@@ -279,13 +662,16 @@ if __name__ == "__main__":
     option_attendance = 1 if not args.no_attendance else 0
     option_duty = 1 if not args.no_duty else 0
     option_ticketing = 1 if args.ticketing else 0
+    options = dict(rsvp=option_rsvp, comments=option_comments, attendance_tracking=option_ticketing,
+                   duty_roster=option_duty, ticketing=option_ticketing)
 
     # Set format and level of debug
     coloredlogs.install(level="DEBUG" if args.debug else LOGGING_LEVEL, fmt=LOGGING_FMT)
 
-    if not os.path.exists(args.COBURG_SHEET):
-        logging.error(f"File {args.COBURG_SHEET} does not exists!")
-        exit(1)
+    for file_name in args.COBURG_SHEET:
+        if not os.path.exists(file_name):
+            logging.error(f"File {file_name} does not exists!")
+            exit(1)
 
     if args.description is not None:
         try:
@@ -294,237 +680,87 @@ if __name__ == "__main__":
         except Exception as e:
             logging.error(f"Unable to read description content from file {args.description}: {e}")
 
-    today = datetime.date.today() #reference point. 
-    saturday = today + datetime.timedelta((calendar.SATURDAY-today.weekday()) % 7 )
-    logging.info(f"The upcoming Saturday is: {saturday}")
-
-
-    games_club = []  # these is where all teh CBA games will be collected, each as a dict
-    try:    # try to read as a PLAYHQ csv if possible
-        with open(args.COBURG_SHEET, newline='') as f: 
-            playhq_dict = csv.DictReader(f)
-
-            # filter just the upcoming saturday
-            for g in playhq_dict:
-                date_game = datetime.datetime.strptime(g['game date'], "%d/%m/%Y").date()
-                if date_game == saturday and (args.CLUB in g['team a'] or args.CLUB in g['team b']):
-                    game = {}
-                    game['team1'] = g['team a'].removeprefix(f"{args.CLUB} ")   # "Magic U16 Girls Gold" -- "U16 Girls Gold"
-                    game['team2'] = g['team b'].removeprefix(f"{args.CLUB} ")
-                    game['team1'] = g['team a']
-                    game['team2'] = g['team b']
-
-                    game['start_date'] = datetime.datetime.strptime(g['game date'], "%d/%m/%Y").date()
-                    game['end_date'] = game['start_date']
-                    game['start_time'] = datetime.datetime.strptime(g['time'], "%H:%M:%S").time()
-                    game["end_time"] = (datetime.datetime.combine(datetime.date(
-                    1, 1, 1), game['start_time']) + datetime.timedelta(minutes=GAME_LENGTH_MIN)).time()
-
-                    game['location'] = g['venue']
-                    game['court'] = g['playing surface']
-                    game['league'] = f"{g['grade'].split()[1]} {g['grade'].split()[2]}" # 'Saturday U16 Girls Division 1/2' --> 'U16 Girls'
-
-                    games_club.append(game)
-
-            logging.info("Finished extracting club games from PLAYHQ CSV")
-    except:     # ok, failed to read playhq csv, maybe it is a CBA spreadsheet, let's try that...
-        logging.warning(f"File {args.COBURG_SHEET} not a PlayHQ CSV file, trying CBA spreadsheet next...")
-        #  0.Load the whole XLSX file
-        wb = openpyxl.load_workbook(args.COBURG_SHEET)
-        logging.info(
-            f"Worksheet {args.COBURG_SHEET} has the following sheets: {wb.sheetnames}")
-
-        coburg_sheet = wb[wb.sheetnames[0]]
-        # external_sheet = wb[wb.sheetnames[1]]
-
-        # Collect ALL the games in the worksheet, ALL of them regardless of teams
-        games_cba = []
-        for sheet in wb:
-            logging.info(f"Processing sheet: {sheet.title}")
-            games_cba += extract_cba_games(sheet, game_date=saturday, game_length_min=GAME_LENGTH_MIN)
-        logging.info(f"Extracted {len(games_cba)} total games.")
-
-        # Project on the team of the club only (args.CLUB) - in our case Magics
-        # games_club = [game for game in games_cba if args.CLUB.upper(
-        # ) in game['team1'].upper() or args.CLUB.upper() in game['team2'].upper()]
-
-        games_club= []
-        for game in games_cba:
-            if args.CLUB.upper() in game['team1'].upper() or args.CLUB.upper() in game['team2'].upper():
-                games_club.append(game)
-                logging.debug(f"This is a club ({args.CLUB}) game: {game['team1']} vs {game['team2']} from {game['cell']}")
-            else:
-                logging.debug(f"This is NOT a club ({args.CLUB}) game: {game['team1']} vs {game['team2']} from {game['cell']}")
-
-
+    if args.from_date is not None:  # a range of game days; CBA sheets state their own date
+        from_date = args.from_date
+        to_date = args.to_date if args.to_date is not None else from_date
+        game_date = None
+        logging.info(f"Extracting games between {from_date} and {to_date}")
+    else:   # a single game day, by default the upcoming Saturday
+        game_date = args.date
+        if game_date is None:
+            today = datetime.date.today() #reference point.
+            game_date = today + datetime.timedelta((calendar.SATURDAY-today.weekday()) % 7 )
+            logging.info(f"The upcoming Saturday is: {game_date}")
+        from_date = to_date = game_date
+
+    # 0. Build the parsing jobs: one per PlayHQ CSV file and one per sheet of each CBA spreadsheet
+    job_options = dict(club=args.CLUB, from_date=from_date, to_date=to_date, game_date=game_date,
+                       game_length_min=GAME_LENGTH_MIN)
+    jobs = []
+    for file_name in args.COBURG_SHEET:
+        file_format = detect_file_format(file_name)
+        if file_format == "playhq":
+            jobs.append((file_name, None, job_options))
+        elif file_format == "xlsx":
+            wb = openpyxl.load_workbook(file_name, read_only=True)
+            logging.info(
+                f"Worksheet {file_name} has the following sheets: {wb.sheetnames}")
+            jobs += [(file_name, sheet_name, job_options) for sheet_name in wb.sheetnames]
+            wb.close()
+        else:
+            logging.error(f"File {file_name} is neither a PlayHQ advanced fixture CSV nor an .xlsx spreadsheet (save .xls as .xlsx)")
+            exit(1)
 
+    # 1. Parse all files and sheets, in parallel worker processes if more than one job
+    errors = []
+    jobs_games = []
+    if args.jobs > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(jobs))) as executor:
+            futures = [executor.submit(read_games_job, job) for job in jobs]
+            for job, future in zip(jobs, futures):
+                try:
+                    jobs_games.append((job, future.result()))
+                except Exception as e:
+                    logging.error(f"Unable to extract games from {job[0]} (sheet {job[1]}): {e}")
+                    errors.append((job[0], job[1]))
+    else:
+        jobs_games = [(job, read_games_job(job)) for job in jobs]
 
-    # OK at this point we have all relevant club games in games_club (either from playhq csv or CBA xls)
-    # Next we do a several processings of the games to build the CSV for TeamAPP
+    # OK at this point we have all relevant club games (either from playhq csv or CBA xls)
+    # Next we group them per input file and game day, and build a TeamAPP CSV for each
+    games_files = {}
+    for (file_name, _, _), games in jobs_games:
+        for game in games:
+            if from_date <= game['start_date'] <= to_date:
+                games_files.setdefault((file_name, game['start_date']), []).append(game)
 
     # 1. Report number of club games
-    logging.info(f"Filtered {len(games_club)} for team: {args.CLUB}.")
-    if len(games_club) == 0:
+    logging.info(f"Filtered {sum(len(x) for x in games_files.values())} for team: {args.CLUB}.")
+    if len(games_files) == 0:
         logging.warning(f"No games extracted for club \"{args.CLUB}\". Correct spelling? Stopping...")
         exit(1)
 
+    # a schedule id names the games of one day (e.g., "Grading 1"), so it cannot go on many days
+    game_days = sorted({date_games for _, date_games in games_files})
+    if args.id is not None and len(game_days) > 1:
+        logging.error(f"Schedule id \"{args.id}\" given for {len(game_days)} game days ({game_days[0]} to {game_days[-1]}); "
+                      "use --id with a single game day or leave it out")
+        exit(1)
 
-    # 2. Extract date of first game
-    date_games = games_club[0]['start_date'] 
-
-    # 3. Extract Club team and opponent team; build new games if both are Club's teams
-    games_swap = []  # collect new games where both teams1 an teams2 are --club games
-    for game in games_club:
-        # game['league'] = "U12 Boys"
-        # game['team1'] = "Magic Gold"
-        if args.CLUB.upper() in game['team1'].upper():
-            # build "U12 Boys Gold" from "Magic U12 Boys Gold"
-            game["team_name"] = f"{game['league']} {game['team1'].split()[-1]}".title()
-            game["opponent"] = game['team2']
-
-            # both team1 and team2 are args.CLUB! Make a duplicate
-            if args.CLUB.upper() in game['team2'].upper():
-                game2 = game.copy()  # make a fresh copy of the game
-                game2["team_name"] = f"{game2['league']} {game2['team2'].split()[-1]}".title()
-                game2["opponent"] = game2['team1']
-                # new entry for team2 as both teams are magic
-                games_swap.append(game2)
-        elif args.CLUB.upper() in game['team2'].upper():    # club only as team2
-            game["team_name"] = f"{game['league']} {game['team2'].split()[-1]}".title()
-            game["opponent"] = game['team1']
-
-        game["opponent"] = re.sub(r" U\d* ", " ", game['opponent']) # remove the UXX in opponent
-    games_club += games_swap
-
-    # 4. Add teamapp options to each game record
-    for game in games_club:
-        if not game['team_name'] in CLUB_TEAMS:
+    venue_index = VenueIndex(VENUES_INFO)   # shared by all schedules
+    for (file_name, date_games), games_club in sorted(games_files.items()):
+        logging.info(f"Building TeamAPP schedule for {date_games} from {file_name} ({len(games_club)} games)")
+        try:
+            games_club = build_club_schedule(games_club, args.CLUB, args.id, DESCRIPTION, DESCRIPTION_BYE,
+                                             options, CLUB_TEAMS, venue_index)
+        except ScheduleError as e:
+            logging.error(e)
+            errors.append((file_name, date_games))
             continue
 
-        logging.info(f"Found game for club team {game['team_name']}: against {game['opponent']} at {game['start_time']} in {game['location']}")
-
-        # U12 Boys Gold - Grading 1
-        game["event_name"] = game["team_name"] + \
-            (f" - {args.id}" if args.id is not None else "")
-        game["access_groups"] = game["team_name"]
-
-        for venue_key in VENUES_INFO.keys():
-            if venue_key in game['location']:
-                venue_data = get_venue_info(venue_key)
-
-                game['location'] = venue_data[1]  # address of venue
-                # e.g., Coburg Stadium
-                game['venue'] = venue_data[0]
-                game['addr_tips'] = ""
-                if venue_data[2] is not None:
-                    game['addr_tips'] = f" ({venue_data[2]})"
-
-        # could't fill the venue key in game: venue data not found!
-        if "venue" not in game:
-            logging.error(f"Error, no venue matched for {game}")
-            sys.exit(1)
-
-        # Build the whole description of the game
-        game["description"] = DESCRIPTION.format(
-            opponent=game["opponent"],
-            venue=game['venue'],
-            court=game['court'],
-            address=game['location'],
-            address_tips=game['addr_tips'])
-        game["rsvp"] = option_rsvp
-        game["comments"] = option_comments
-        game["attendance_tracking"] = option_ticketing
-        game["duty_roster"] = option_duty
-        game["ticketing"] = option_ticketing
-        game["reference_id"] = ""
-
-    # 5. Add BYE games
-    teams_playing = [x['team_name'] for x in games_club]
-    teams_bye = CLUB_TEAMS.difference(teams_playing)
-
-    if not teams_bye:
-        logging.info("No teams have a BYE game; all are playing!")
-    else:
-        logging.info("Teams having BYE (i.e., have not found any game for club team):")
-
-        for team in teams_bye:
-            print(f"\t {team}")
-
-            game = {}
-            game["team_name"] = team
-            game["access_groups"] = game["team_name"]
-            game["start_date"] = date_games
-            game["end_date"] = date_games
-            game["start_time"] = datetime.time(hour=11, minute=00)
-            game["end_time"] =datetime.time(hour=12, minute=00)
-
-            game["event_name"] = f"{game['team_name']} - BYE"
-
-            game["opponent"] = ""
-            game['location'] = ""
-            game['venue'] = ""
-            game["description"] = DESCRIPTION_BYE
-
-            game["rsvp"] = 0
-            game["comments"] = 0
-            game["attendance_tracking"] = 0
-            game["duty_roster"] = 0
-            game["ticketing"] = 0
-            game["reference_id"] = ""
-
-            games_club.append(game)
-
-    #  6. Check for games on teams that do no exist in the club; something is wrong!
-    for game in games_club:
-        if not game['team_name'] in CLUB_TEAMS:
-            logging.error(f"Found game for NON-EXISTENT CLUB team {game['team_name']}: against {game['opponent']} at {game['start_time']} in {game['location']}")
-            logging.error(f"Check if this would correspond to some BYE team above. Fix the sheet and re-run script")
-            sys.exit(1)
-
-
-    #  7. Report all games if in DEBUG level
-    ## This is even too much, uncomment if you really want it
-    # if coloredlogs.get_level() == coloredlogs.level_to_number("DEBUG"):
-    #     print("========== TEAMS EXTRACTED FOR TEAMAPP ===============")
-    #     for game in games_club:
-    #         print(game)
-    #     print("======================================================")
-
-
-    #  8. Report Games
-    print("=========================================")
-    print("GAMES EXTRACTED")
-    print("=========================================")
-    for g in sorted(games_club, key=lambda x: x['team_name']):
-        # print(g)
-        if g['venue'] != "": # not a bye
-            print(f"{g['team_name']} vs {g['opponent']} @ {g['venue']} - {g['start_time']}"  )
-        else:
-            print(f"{g['team_name']} has a BYE")
-    print("=========================================")
-
-    #  9. Produce CSV for TeamAPP
-    schedule_file_path = os.path.split(args.COBURG_SHEET)[0]
-    schedule_file_name = os.path.splitext(os.path.split(args.COBURG_SHEET)[1])[0]   # without extension
-
-    csv_header_schedule = ["event_name",  "team_name", "start_date", "end_date", "start_time", "end_time", "description",
-                           "location", "access_groups", "rsvp", "comments", "attendance_tracking", "duty_roster", "ticketing", "reference_id"]
-
-    # prefix e.g., "2022-05-14.Magic_Grading-2"
-    prefix = f"{date_games}.{args.CLUB}" + (f"_{args.id.replace(' ', '-')}" if args.id is not None else "")
-
-    # write the CSV to import as a SCHEDULE
-    schedule_csv = os.path.join(schedule_file_path, f"{prefix}_SCHEDULE-{schedule_file_name}.csv")
-    write_games_csv(games_club, csv_header_schedule, schedule_csv)
-    logging.info(
-        f"CSV schedule file for TeamAPP produced for team {args.CLUB} ({len(games_club)} games: {schedule_csv}.")
-
-    # write the CSV to import as an EVENT
-    csv_header_events = csv_header_schedule
-    csv_header_events.remove("team_name")
-    events_csv = os.path.join(schedule_file_path, f"{prefix}_EVENT-{schedule_file_name}.csv")
-    write_games_csv(games_club, csv_header_events, events_csv)
-    logging.info(
-        f"CSV event file for TeamAPP produced for team {args.CLUB} ({len(games_club)} games: {events_csv}.")
-
+        report_games(games_club)
+        write_schedule_csvs(games_club, args.CLUB, args.id, file_name, args.output)
 
+    if errors:
+        logging.error(f"No CSV files produced for {len(errors)} files/game days: {errors}")
+        sys.exit(1)
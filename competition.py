@@ -0,0 +1,182 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import os
+import re
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm.auto import tqdm
+
+import logging
+
+import utils
+
+JOURNAL_FILE = "journal.jsonl"
+
+###########################################################
+# COMPETITION-WIDE FIXTURE EXTRACTION
+###########################################################
+
+
+def team_file_name(team_name, team_id):
+    """Name of the JSON file storing the fixture of a team, e.g., Magic_U12_Boys_Gold_3f2a9c1e.json
+
+    The start of the team id keeps apart teams whose names are the same once sanitised
+    (e.g., "U12 Boys-1" and "U12 Boys 1", or the same name in two clubs).
+    """
+    return re.sub(r"[\W_]", "_", team_name) + f"_{team_id[:8]}.json"
+
+
+class CompetitionExtractor:
+    """Extract the fixture of every team in a competition into one JSON file per team.
+
+    Teams are fetched in parallel by a pool of worker threads. Each page received is
+    appended to a `<team>_<id>.json.part` file and then recorded, together with the cursor
+    of the next page, in a checkpoint journal (`journal.jsonl`) in the output folder.
+    Once all the pages of a team are in, the final `<team>_<id>.json` is written atomically
+    and a "done" entry is appended to the journal.
+
+    If the run is interrupted, a new run with the same output folder skips the teams
+    marked as done and continues the other ones from the last cursor journaled, so no
+    page is fetched twice and no partial file ever looks complete.
+
+    Args:
+        phq (PlayHQ): client used to fetch the team fixtures
+        output_path (str): folder where team fixtures and the journal are saved
+        workers (int): number of teams fetched concurrently
+    """
+
+    def __init__(self, phq, output_path, workers=8) -> None:
+        self.phq = phq
+        self.output_path = output_path
+        self.workers = workers
+        self.journal_file = os.path.join(output_path, JOURNAL_FILE)
+        self.lock = threading.Lock()
+
+    def read_journal(self):
+        """Replay the journal and return the teams done and the progress of the rest
+
+        Returns:
+            (set, dict): ids of teams done, and for each unfinished team a dict with the
+                number of pages saved and the cursor of the next page
+        """
+        done = set()
+        progress = {}
+        if not os.path.exists(self.journal_file):
+            return done, progress
+
+        with open(self.journal_file) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:  # last line cut by an interruption
+                    logging.warning(f"Ignoring corrupted journal entry: {line.strip()}")
+                    continue
+                team_id = entry["team_id"]
+                if entry.get("done"):
+                    done.add(team_id)
+                    progress.pop(team_id, None)
+                else:
+                    progress[team_id] = {"pages": entry["pages"], "cursor": entry["cursor"]}
+        return done, progress
+
+    def journal(self, **entry):
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            with open(self.journal_file, "a") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def extract_team(self, team, progress=None):
+        """Fetch (or continue fetching) the fixture of one team and save it atomically
+
+        Args:
+            team (dict): team with at least keys 'id' and 'name'
+            progress (dict, optional): pages already saved and cursor to continue from
+
+        Returns:
+            int: number of games in the fixture of the team
+        """
+        team_id = team["id"]
+        file_name = os.path.join(self.output_path, team_file_name(team["name"], team_id))
+        part_file = file_name + ".part"
+
+        pages = 0
+        cursor = None
+        lines = []
+        if progress is not None and os.path.exists(part_file):
+            pages = progress["pages"]
+            cursor = progress["cursor"]
+            with open(part_file) as f:
+                # the part file may have one extra page not journaled yet; drop it
+                lines = f.readlines()[:pages]
+            logging.debug(f"Resuming team {team['name']} after {pages} pages (cursor {cursor})")
+        if len(lines) < pages:  # part file lost: start the team again
+            pages, cursor, lines = 0, None, []
+
+        games = []
+        for line in lines:
+            games += json.loads(line)
+
+        with open(part_file, "w") as f:
+            f.writelines(lines)
+            for data_json in self.phq.get_json(f"teams/{team_id}/fixture", cursor=cursor):
+                f.write(json.dumps(data_json["data"]) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                games += data_json["data"]
+                pages += 1
+                metadata = data_json.get("metadata") or {}
+                if metadata.get("hasMore", False):
+                    cursor = metadata.get("nextCursor")
+                    self.journal(team_id=team_id, pages=pages, cursor=cursor)
+
+        utils.write_json_atomic(file_name, {"data": games})
+        self.journal(team_id=team_id, done=True, file=os.path.basename(file_name))
+        os.remove(part_file)
+        return len(games)
+
+    def extract(self, teams):
+        """Extract the fixture of all the teams, resuming from the journal if any
+
+        Args:
+            teams (list(dict)): teams to extract, each with at least keys 'id' and 'name'
+
+        Returns:
+            (list, list): names of the teams extracted in this run and of teams with errors
+        """
+        done, progress = self.read_journal()
+        pending = [
+            t
+            for t in teams
+            if t["id"] not in done
+            or not os.path.exists(os.path.join(self.output_path, team_file_name(t["name"], t["id"])))
+        ]
+        logging.info(
+            f"Teams to extract: {len(pending)} ({len(teams) - len(pending)} already done, "
+            f"{len([t for t in pending if t['id'] in progress])} to be resumed)"
+        )
+
+        extracted = []
+        team_errors = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self.extract_team, t, progress.get(t["id"])): t
+                for t in pending
+            }
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                team = futures[future]
+                try:
+                    no_games = future.result()
+                    logging.debug(f"Fixture extracted for team {team['name']}: {no_games} games")
+                    extracted.append(team["name"])
+                except Exception as e:
+                    logging.error(f"Error with team {team['name']}: {e}")
+                    team_errors.append(team["name"])
+
+        return extracted, team_errors
@@ -48,6 +48,18 @@ All clubs in PlayHQ: PLAYHQ_SEASON_URL
 )
 
 
+# Fix venue fields in PlayHQ, e.g., {"<venue id>": {"location": "25 Outlook Road, Coburg North"}}
+# Use as phq.PlayHQ(..., venue_table=venues.VenueTable(VENUE_OVERRIDES))
+VENUE_OVERRIDES = {}
+
+# Teams sharing people (coaches, families), to check back-to-back games with travel.Transitions
+# e.g., {"Coach Smith": ["U12 Boys Gold", "U14 Girls Purple"]} (PlayHQ team names or ids)
+TEAM_GROUPS = {}
+
+# Game-day duties of each game, rostered among volunteers with roster.py (see roster.POOL_COLS)
+DUTIES = ["Scorer"]
+
+
 def tapp_team_name(team_name):
     """
     Map PlayHQ team name to that used in Teams App
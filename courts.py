@@ -0,0 +1,195 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import numpy as np
+import pandas as pd
+
+BOOKING_COLS = [
+    "game_id",
+    "venue_id",
+    "venue_name",
+    "court",
+    "start",
+    "end",
+    "grade_name",
+    "round_name",
+    "teams",
+]
+
+###########################################################
+# COURT TIMELINE: DOUBLE-BOOKINGS & VENUE LOAD
+###########################################################
+
+
+def teams_label(competitors):
+    """Names of the competitors of a game, e.g., "A vs B" ("" if there are none yet)"""
+    if not isinstance(competitors, (list, tuple, np.ndarray)):
+        return ""
+    return " vs ".join(c.get("name") or "PENDING" for c in competitors if isinstance(c, dict))
+
+
+def to_seconds(timestamps: pd.Series) -> np.ndarray:
+    """Seconds since epoch of a series of (timezone aware) timestamps"""
+    return (
+        (timestamps.dt.tz_convert("UTC") - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    ).to_numpy("int64")
+
+
+class CourtTimeline:
+    """Bookings of every court (venue surface) built from a games frame.
+
+    The games frame is as returned by PlayHQ.get_games (or get_team_fixture), with
+    columns venue_id, venue_name, venue_surfaceName and schedule_timestamp. Each game
+    books its court from its start time for game_duration minutes, as in
+    PlayHQ.to_teamsapp_schedule. Games repeated in the frame (e.g., once per team) are
+    booked once, and games with no time or venue yet (e.g., upcoming finals) are not
+    booked.
+
+    Bookings are kept sorted by court and start time, so that all overlapping bookings
+    in a court are found with one sort and one binary search per booking (O(n log n))
+    rather than comparing all pairs of games.
+
+    Args:
+        games_df (pd.DataFrame): games to book
+        game_duration (int, optional): minutes each game holds the court
+    """
+
+    def __init__(self, games_df: pd.DataFrame, game_duration=45) -> None:
+        self.game_duration = game_duration
+
+        games_df = games_df.drop_duplicates("id")
+        games_df = games_df.loc[games_df["schedule_timestamp"].notna() & games_df["venue_id"].notna()]
+        bookings_df = pd.DataFrame(
+            {
+                "game_id": games_df["id"],
+                "venue_id": games_df["venue_id"],
+                "venue_name": games_df["venue_name"],
+                "court": games_df["venue_surfaceName"].fillna(""),
+                "start": games_df["schedule_timestamp"],
+                "end": games_df["schedule_timestamp"] + pd.Timedelta(minutes=game_duration),
+                "grade_name": games_df.get("grade_name"),
+                "round_name": games_df.get("round_name"),
+                "teams": games_df["competitors"].map(teams_label)
+                if "competitors" in games_df
+                else None,
+            }
+        )
+        bookings_df = bookings_df.sort_values(["venue_id", "court", "start"])
+        bookings_df.reset_index(drop=True, inplace=True)
+        self.bookings_df = bookings_df[BOOKING_COLS]
+
+        # one number per court so that (court, time) keys are increasing along the frame
+        court_codes = self.bookings_df.groupby(["venue_id", "court"], sort=False).ngroup()
+        self.court_codes = court_codes.to_numpy("int64")
+        self.starts = to_seconds(self.bookings_df["start"])
+        self.ends = self.starts + game_duration * 60
+        offset = np.int64(2**33)  # larger than any start time in seconds
+        self.start_keys = self.court_codes * offset + self.starts
+        self.end_keys = self.court_codes * offset + self.ends
+
+    def clashes(self) -> pd.DataFrame:
+        """All pairs of bookings that overlap on the same court
+
+        As all games last the same, the ends follow the same order as the starts in
+        each court. So booking i overlaps exactly the earlier bookings j of the same
+        court that end after i starts, found with a binary search on the end keys.
+
+        Returns:
+            pd.DataFrame: one row per clash with the two games, the court and the overlap in minutes
+        """
+        first = np.searchsorted(self.end_keys, self.start_keys, side="right")
+        counts = np.arange(len(self.start_keys)) - first
+        counts = np.maximum(counts, 0)
+
+        second_idx = np.repeat(np.arange(len(counts)), counts)
+        # for each clashing booking, the range first..i-1 of bookings it overlaps
+        starts_of_range = np.repeat(first, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        first_idx = starts_of_range + offsets
+
+        b1 = self.bookings_df.iloc[first_idx].reset_index(drop=True)
+        b2 = self.bookings_df.iloc[second_idx].reset_index(drop=True)
+        clashes_df = pd.DataFrame(
+            {
+                "venue_id": b1["venue_id"],
+                "venue_name": b1["venue_name"],
+                "court": b1["court"],
+                "game_id_1": b1["game_id"],
+                "teams_1": b1["teams"],
+                "start_1": b1["start"],
+                "game_id_2": b2["game_id"],
+                "teams_2": b2["teams"],
+                "start_2": b2["start"],
+            }
+        )
+        clashes_df["overlap_min"] = (
+            self.ends[first_idx] - self.starts[second_idx]
+        ) // 60
+        return clashes_df
+
+    def intervals(self, venue_id, court) -> pd.IntervalIndex:
+        """Interval index of the bookings of one court, to query by time"""
+        mask = (self.bookings_df["venue_id"] == venue_id) & (self.bookings_df["court"] == court)
+        court_df = self.bookings_df.loc[mask]
+        return pd.IntervalIndex.from_arrays(
+            court_df["start"], court_df["end"], closed="left"
+        ).set_names(court)
+
+    def bookings_at(self, venue_id, court, when: pd.Timestamp) -> pd.DataFrame:
+        """Bookings holding a court at a given time"""
+        court_df = self.bookings_df.loc[
+            (self.bookings_df["venue_id"] == venue_id) & (self.bookings_df["court"] == court)
+        ]
+        return court_df.loc[self.intervals(venue_id, court).contains(when)]
+
+    def utilisation(self) -> pd.DataFrame:
+        """Load of each venue per day
+
+        For each venue and day, reports the courts used, the games, the minutes booked,
+        the time span from the first start to the last end, the utilisation (minutes
+        booked over courts x span) and the peak number of games at the same time.
+
+        Returns:
+            pd.DataFrame: one row per venue and day
+        """
+        df = self.bookings_df.assign(
+            date=self.bookings_df["start"].dt.date, start_s=self.starts, end_s=self.ends
+        )
+        usage_df = df.groupby(["venue_id", "venue_name", "date"]).agg(
+            courts=("court", "nunique"),
+            games=("game_id", "size"),
+            first_start=("start", "min"),
+            last_end=("end", "max"),
+        )
+        usage_df["booked_min"] = usage_df["games"] * self.game_duration
+        usage_df["span_min"] = (
+            usage_df["last_end"] - usage_df["first_start"]
+        ).dt.total_seconds() // 60
+        usage_df["utilisation"] = (
+            usage_df["booked_min"] / (usage_df["courts"] * usage_df["span_min"])
+        ).round(3)
+
+        # sweep over start (+1) and end (-1) events to get the peak of games at once
+        events_df = pd.concat(
+            [
+                df[["venue_id", "venue_name", "date"]].assign(t=df["start_s"], load=1),
+                df[["venue_id", "venue_name", "date"]].assign(t=df["end_s"], load=-1),
+            ]
+        ).sort_values(["venue_id", "date", "t", "load"])
+        events_df["concurrent"] = events_df.groupby(["venue_id", "date"])["load"].cumsum()
+        usage_df["peak_games"] = events_df.groupby(["venue_id", "venue_name", "date"])[
+            "concurrent"
+        ].max()
+
+        return usage_df.reset_index()
+
+    def overloaded(self, max_utilisation=0.9) -> pd.DataFrame:
+        """Venue days with utilisation above max_utilisation, or more games at once than courts"""
+        usage_df = self.utilisation()
+        return usage_df.loc[
+            (usage_df["utilisation"] > max_utilisation)
+            | (usage_df["peak_games"] > usage_df["courts"])
+        ]
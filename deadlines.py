@@ -0,0 +1,116 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import collections
+import queue
+import threading
+import time
+
+import numpy as np
+
+# requests are hedged once slower than this percentile of the recent latencies...
+HEDGE_PERCENTILE = 95
+# ... known from at least this many requests
+HEDGE_MIN_SAMPLES = 20
+
+###########################################################
+# DEADLINES & HEDGED REQUESTS
+###########################################################
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """A point in time by which a run (e.g., get_games) should be finished
+
+    Args:
+        seconds (float): seconds from now
+    """
+
+    def __init__(self, seconds) -> None:
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    @classmethod
+    def coerce(cls, deadline):
+        """A Deadline from seconds (or None, or a Deadline already)"""
+        if deadline is None or isinstance(deadline, Deadline):
+            return deadline
+        return cls(deadline)
+
+    def remaining(self):
+        return self.expires - time.monotonic()
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def timeout(self, timeout=None):
+        """Timeout for a request: timeout, cut down to what is left (DeadlineExceeded if nothing is left)"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Run deadline of {self.seconds}s passed")
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+class LatencyTracker:
+    """Latencies of the recent requests, to tell when a request is slow enough to hedge
+
+    Args:
+        percentile (float, optional): requests slower than this percentile get hedged (None: never)
+        window (int, optional): number of recent latencies kept
+    """
+
+    def __init__(self, percentile=HEDGE_PERCENTILE, window=200) -> None:
+        self.percentile = percentile
+        self.latencies = collections.deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.hedged = 0  # requests that got a duplicate
+
+    def add(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def hedge_after(self):
+        """Seconds after which to hedge a request, or None if not known yet (or hedging is off)"""
+        with self.lock:
+            if self.percentile is None or len(self.latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            return float(np.percentile(self.latencies, self.percentile))
+
+
+def hedged(fn, hedge_after, latencies: LatencyTracker = None):
+    """Result of fn(), started again if no answer after hedge_after seconds: the first answer wins
+
+    Only for idempotent calls (e.g., GET requests). If the first call to finish fails, the
+    other one is waited for; the error is raised only if both fail.
+    """
+    answers = queue.Queue()
+
+    def run():
+        try:
+            answers.put((fn(), None))
+        except Exception as e:
+            answers.put((None, e))
+
+    threading.Thread(target=run, daemon=True).start()
+    try:
+        result, error = answers.get(timeout=hedge_after)
+        calls = 1
+    except queue.Empty:
+        if latencies is not None:
+            with latencies.lock:
+                latencies.hedged += 1
+        threading.Thread(target=run, daemon=True).start()
+        result, error = answers.get()
+        calls = 2
+
+    if error is not None and calls == 2:
+        result, error = answers.get()  # the other call may still succeed
+    if error is not None:
+        raise error
+    return result
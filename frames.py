@@ -0,0 +1,110 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import numpy as np
+import pandas as pd
+
+BACKENDS = ["pandas", "polars"]
+
+###########################################################
+# DATAFRAME BACKENDS FOR THE GAME TIMESTAMPS
+###########################################################
+
+
+class PandasBackend:
+    """Parsing of the game timestamps with pandas (the default backend)
+
+    Only the parsing of the date, time and timezone of every game into a timestamp (see
+    PlayHQ.add_schedule_timestamp) runs in the backend, as it is the one column kernel
+    that grows with the size of the fixtures. The other transformations (flattening the
+    fixtures, to_teamsapp_schedule, the BYE builders) are pandas code whatever the backend.
+    PlayHQ always gets pandas objects back, so the notebooks are the same.
+    """
+
+    name = "pandas"
+
+    def timestamps(self, dates, times, timezones, timezone) -> pd.Series:
+        """Timestamps in timezone from columns of dates, times and the timezone of each game
+
+        Args:
+            dates (list-like): dates as "YYYY-MM-DD" ("" or None for games with no date yet)
+            times (list-like): times as "HH:MM:SS" or "HH:MM" (ISO8601)
+            timezones (list-like): timezone of each date and time
+            timezone (str): timezone of the result
+
+        Returns:
+            pd.Series: the timestamps (NaT for games with no date), with a default index
+        """
+        dates = pd.Series(dates, dtype=object).reset_index(drop=True)
+        times = pd.Series(times, dtype=object).reset_index(drop=True)
+        zones = pd.Series(timezones, dtype=object).reset_index(drop=True)
+
+        dated = dates.notna() & (dates != "")
+        local = pd.to_datetime(dates.where(dated) + " " + times, format="ISO8601")
+        result = pd.Series(pd.NaT, index=dates.index, dtype=f"datetime64[us, {timezone}]")
+        for zone in zones[dated].unique():  # usually one timezone for all games
+            mask = dated & (zones == zone)
+            result[mask] = local[mask].dt.tz_localize(zone).dt.tz_convert(timezone)
+        return result
+
+
+class PolarsBackend(PandasBackend):
+    """Parsing of the game timestamps with polars: Arrow-native and multi-threaded over all cores
+
+    Needs polars (pip install polars). Worth it for competition-scale frames, e.g., the
+    games of whole grades (see PlayHQ.get_games with by_grade=True).
+    """
+
+    name = "polars"
+
+    def __init__(self) -> None:
+        try:
+            import polars as pl
+        except ImportError as e:
+            raise ImportError("The polars backend needs polars: pip install polars") from e
+        self.pl = pl
+
+    def timestamps(self, dates, times, timezones, timezone) -> pd.Series:
+        pl = self.pl
+        df = pl.DataFrame(
+            {"date": list(dates), "time": list(times), "zone": list(timezones)},
+            schema={"date": pl.Utf8, "time": pl.Utf8, "zone": pl.Utf8},
+        ).with_row_index("row")
+        # as tolerant as ISO8601 in pandas: "HH:MM" times and fractions of seconds; anything
+        # else raises rather than becoming null (i.e., a game silently dropped)
+        date = pl.when(pl.col("date") != "").then(pl.col("date"))
+        time = pl.col("time").str.strip_chars().str.replace(r"^(\d{1,2}:\d{2})$", "${1}:00")
+        try:
+            df = df.with_columns(
+                pl.concat_str([date, time], separator=" ")
+                .str.to_datetime("%Y-%m-%d %H:%M:%S%.f", time_unit="us", strict=True)
+                .alias("local")
+            )
+        except pl.exceptions.PolarsError as e:
+            raise ValueError(f"Game dates and times not in ISO8601 format: {e}") from e
+
+        # polars needs a literal timezone to localize, so one pass per timezone
+        epochs = np.full(len(df), np.iinfo(np.int64).min, dtype=np.int64)  # NaT
+        for zone in df.filter(pl.col("local").is_not_null())["zone"].unique():
+            zone_df = df.filter(pl.col("zone") == zone).select(
+                "row", pl.col("local").dt.replace_time_zone(zone).dt.epoch("us").alias("epoch")
+            ).drop_nulls()
+            epochs[zone_df["row"].to_numpy()] = zone_df["epoch"].to_numpy()
+
+        return pd.Series(
+            pd.to_datetime(epochs, unit="us", utc=True).tz_convert(timezone)
+        ).astype(f"datetime64[us, {timezone}]")
+
+
+def get_backend(backend="pandas"):
+    """The backend object for a backend name in BACKENDS (backend objects are returned as they are)"""
+    if not isinstance(backend, str):
+        return backend
+    if backend == "pandas":
+        return PandasBackend()
+    if backend == "polars":
+        return PolarsBackend()
+    raise ValueError(f"Unknown dataframe backend {backend}; use one of {BACKENDS}")
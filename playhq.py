@@ -7,19 +7,29 @@ __email__ = "ssardina@gmail.com"
 # __status__ = "Production"
 
 
+import contextlib
 import json
-from tqdm.notebook import tqdm
+import os
+import queue
+import urllib.error
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from tqdm.auto import tqdm
 
 # from sqlite3 import Timestamp
 import pandas as pd
-import re
-import urllib  # https://docs.python.org/3/library/urllib.request.html
+import urllib.request  # https://docs.python.org/3/library/urllib.request.html
 import datetime
 
 import logging
 import coloredlogs
 
+import cache
+import deadlines
+import frames
 import utils
+import venues
 
 LOGGING_LEVEL = "INFO"
 # LOGGING_LEVEL = "DEBUG"
@@ -28,8 +38,26 @@ LOGGING_FMT = "%(asctime)s %(levelname)s %(message)s"
 coloredlogs.install(level=LOGGING_LEVEL, fmt=LOGGING_FMT)
 
 API_URL = f"https://api.playhq.com/v1"
+REQUEST_TIMEOUT = 30  # seconds to wait for each PlayHQ request
 GAMES_COLS = ["team_name", "status", "schedule_timestamp", "venue_name"]
 
+# game summaries (to resolve undated and pending games) are kept this long and fetched with these threads
+SUMMARY_TTL = datetime.timedelta(minutes=10)
+SUMMARY_WORKERS = 8
+# columns of a games frame updated from the game summaries
+SUMMARY_COLS = [
+    "status",
+    "updatedAt",
+    "competitors",
+    "schedule_date",
+    "schedule_time",
+    "schedule_timezone",
+    "venue_id",
+    "venue_name",
+    "venue_surfaceName",
+    "venue_surfaceAbbreviation",
+]
+
 ########################################################################
 # TEAMS APP TRANSLATIONS
 ########################################################################
@@ -68,33 +96,144 @@ Check the round in PlayHQ: {url_grade}
 
 
 class ResponsePHQ:
-    def __init__(self, key, x_api_key, x_tenant):
+    """Iterator over the pages of a PlayHQ endpoint
+
+    Pages are fetched in a background thread up to read_ahead pages ahead of the consumer:
+    the request for page N+1 starts as soon as the cursor of page N is known, while page N
+    is still being processed (e.g., normalized into a dataframe). Use read_ahead=0 to fetch
+    each page only when asked for.
+
+    With flights (a cache.SingleFlight), identical page requests (endpoint, cursor and tenant)
+    made at the same time by other iterators share one request to PlayHQ.
+
+    Each request waits at most timeout seconds, and no longer than the deadline of the run
+    (a deadlines.Deadline), if any. With latencies (a deadlines.LatencyTracker), requests
+    slower than the usual get a duplicate request and the first answer is used.
+    """
+
+    def __init__(
+        self,
+        key,
+        x_api_key,
+        x_tenant,
+        cursor=None,
+        read_ahead=2,
+        flights=None,
+        timeout=REQUEST_TIMEOUT,
+        latencies=None,
+        deadline=None,
+    ):
         self.url = f"{API_URL}/{key}"
         self.has_more = True
-        self.cursor = None
+        self.cursor = cursor
         self.key = key
         self.x_api_key = x_api_key
         self.x_tenant = x_tenant
+        self.read_ahead = read_ahead
+        self.flights = flights
+        self.timeout = timeout
+        self.latencies = latencies
+        self.deadline = deadline
+
+    def fetch_page(self, cursor):
+        if self.flights is not None:
+            return self.flights.do(
+                (self.key, cursor, self.x_tenant), lambda: self.request_page(cursor)
+            )
+        return self.request_page(cursor)
+
+    def request_page(self, cursor):
+        url_req = self.url
+        if cursor is not None:
+            params = urllib.parse.urlencode({"cursor": cursor})
+            url_req = url_req + f"?{params}"
+
+        req = urllib.request.Request(url_req)
+        req.add_header("x-api-key", self.x_api_key)
+        req.add_header("x-phq-tenant", self.x_tenant)
+
+        def request_timeout():
+            if self.deadline is None:
+                return self.timeout
+            return self.deadline.timeout(self.timeout)
+
+        def fetch():
+            timeout = request_timeout()  # again for a hedged duplicate: the deadline is closer now
+            start = time.monotonic()
+            try:
+                content = urllib.request.urlopen(req, timeout=timeout).read()
+            except urllib.error.HTTPError:
+                raise
+            except (TimeoutError, urllib.error.URLError) as e:
+                if self.deadline is not None and self.deadline.expired():  # cut short by the deadline
+                    raise deadlines.DeadlineExceeded(
+                        f"Run deadline of {self.deadline.seconds}s passed requesting {self.key}"
+                    ) from e
+                raise
+            if self.latencies is not None:
+                self.latencies.add(time.monotonic() - start)
+            return content
+
+        timeout = request_timeout()
+        hedge_after = self.latencies.hedge_after() if self.latencies is not None else None
+        if hedge_after is not None and (timeout is None or hedge_after < timeout):
+            content = deadlines.hedged(fetch, hedge_after, self.latencies)
+        else:
+            content = fetch()
+        return json.loads(content)
 
     def __iter__(self):
-        while self.has_more:
-            url_req = self.url
-            if self.cursor is not None:
-                params = urllib.parse.urlencode({"cursor": self.cursor})
-                url_req = url_req + f"?{params}"
+        pages = self._pages_read_ahead() if self.read_ahead > 0 else self._pages()
+        for data_json in pages:
+            metadata = data_json.get("metadata") or {}  # single-object endpoints have no metadata
+            self.has_more = metadata.get("hasMore", False)
+            if self.has_more:
+                self.cursor = metadata["nextCursor"]
+            yield data_json
 
-            req = urllib.request.Request(url_req)
-            req.add_header("x-api-key", self.x_api_key)
-            req.add_header("x-phq-tenant", self.x_tenant)
+    def _pages(self):
+        cursor, has_more = self.cursor, self.has_more
+        while has_more:
+            data_json = self.fetch_page(cursor)
+            metadata = data_json.get("metadata") or {}
+            has_more = metadata.get("hasMore", False)
+            cursor = metadata["nextCursor"] if has_more else cursor
+            yield data_json
 
-            content = urllib.request.urlopen(req).read()
-            data_json = json.loads(content)
+    def _pages_read_ahead(self):
+        pages = queue.Queue(maxsize=self.read_ahead)
+        stop = threading.Event()
 
-            self.has_more = data_json["metadata"]["hasMore"]
-            if self.has_more:
-                self.cursor = data_json["metadata"]["nextCursor"]
+        def put(item):
+            while not stop.is_set():  # wait for room in the buffer, unless the consumer is gone
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
 
-            yield data_json
+        def fetcher():
+            try:
+                for data_json in self._pages():
+                    if not put((data_json, None)):
+                        return
+                put((None, None))  # no more pages
+            except Exception as e:
+                put((None, e))
+
+        thread = threading.Thread(target=fetcher, name=f"fetch-{self.key}", daemon=True)
+        thread.start()
+        try:
+            while True:
+                data_json, error = pages.get()
+                if error is not None:
+                    raise error
+                if data_json is None:
+                    return
+                yield data_json
+        finally:
+            stop.set()  # consumer stopped early (or failed): let the fetcher finish
 
 
 class PlayHQ(object):
@@ -107,6 +246,11 @@ class PlayHQ(object):
         timezone,
         tapp_team_name,
         tapp_game_name,
+        venue_table=None,
+        store=None,
+        backend="pandas",
+        timeout=REQUEST_TIMEOUT,
+        hedge_percentile=deadlines.HEDGE_PERCENTILE,
     ) -> None:
         self.org_name = org_name
         self.org_id = org_id
@@ -115,9 +259,79 @@ class PlayHQ(object):
         self.timezone = timezone
         self.tapp_team_name = tapp_team_name
         self.tapp_game_name = tapp_game_name
+        # venues of all games seen, so games only keep the venue id (see venues.VenueTable)
+        self.venues = venue_table if venue_table is not None else venues.VenueTable()
+        # local store of responses and short URLs warmed by prefetch.py (see cache.ResponseStore)
+        self.store = store
+        # engine to parse the game timestamps, "pandas" or "polars" (see frames.BACKENDS)
+        self.backend = frames.get_backend(backend)
+        # identical requests at the same time share one fetch; with a store, also across processes
+        self.flights = cache.SingleFlight(
+            os.path.join(store.path, "flights") if store is not None else None
+        )
+        # game summaries change as associations fill in finals, so only keep them for a while
+        self.summaries = cache.TTLCache(SUMMARY_TTL)
+        # pages fetched from PlayHQ so far (not counting those served from the store)
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+        # whether PlayHQ serves grades/<id>/games (set to False the first time it refuses)
+        self.grade_games = True
+        # requests of the last fetch plan, see iter_team_fixtures()
+        self.fetch_stats = {}
+        # seconds per request, recent latencies (to hedge slow requests) and deadline of the run
+        self.timeout = timeout
+        self.latencies = deadlines.LatencyTracker(hedge_percentile)
+        self.deadline = None
+
+    def get_json(self, key, cursor=None, max_age=None):
+        def fetch(cursor):
+            return self.count_requests(self.fetch_json(key, cursor))
+
+        if self.store is not None and cursor is None:
+            return self.store.iter_pages(key, fetch, max_age)
+        return fetch(cursor)
+
+    def count_requests(self, pages):
+        """Pass through the pages of an endpoint, counting them in self.requests"""
+        for data_json in pages:
+            with self.requests_lock:
+                self.requests += 1
+            yield data_json
+
+    def fetch_json(self, key, cursor=None):
+        """Iterator of the pages of endpoint key from PlayHQ, starting at cursor"""
+        return iter(
+            ResponsePHQ(
+                key,
+                self.x_api_key,
+                self.x_tenant,
+                cursor,
+                flights=self.flights,
+                timeout=self.timeout,
+                latencies=self.latencies,
+                deadline=self.deadline,
+            )
+        )
+
+    @contextlib.contextmanager
+    def run_deadline(self, deadline):
+        """Within the block, requests give up once deadline passes (seconds or a deadlines.Deadline)
 
-    def get_json(self, key, cursor=None):
-        return iter(ResponsePHQ(key, self.x_api_key, self.x_tenant))
+        Requests then raise deadlines.DeadlineExceeded. With deadline None, any deadline
+        already running is kept.
+        """
+        previous = self.deadline
+        if deadline is not None:
+            self.deadline = deadlines.Deadline.coerce(deadline)
+        try:
+            yield self.deadline
+        finally:
+            self.deadline = previous
+
+    def shorten_url(self, url):
+        if self.store is not None:
+            return self.store.shorten_url(url)
+        return utils.shorten_url(url)
 
     def get_season_competition(self, season_id: str):
         """Given the season id, search for the competition name"""
@@ -171,17 +385,14 @@ class PlayHQ(object):
         club_teams_df = teams_df.loc[teams_df["club.id"] == self.org_id]
 
         columns = ["id", "name", "grade.id", "grade.name", "grade.url"]
-        club_teams_df = club_teams_df[columns]
-        club_teams_df.dropna(inplace=True)
-        club_teams_df["age"] = club_teams_df["name"].apply(
-            lambda x: re.search("U(\d*)", x).group(1)
-        )
+        club_teams_df = club_teams_df[columns].dropna()
+        club_teams_df["age"] = club_teams_df["name"].str.extract(r"U(\d*)", expand=False)
         # club_teams_df = club_teams_df.sort_values('age', ascending=False)
         # club_teams_df.reset_index(inplace=True, drop=True)
 
         return club_teams_df
 
-    def get_team_fixture(self, team_id) -> pd.DataFrame:
+    def get_team_fixture(self, team_id, keep_undated=False) -> pd.DataFrame:
         """Extract a df that encodes the whole fixture of a team from the JSON data.
         Note: Games can only be obtained per team in the public API.
         It is not possible to list all games of organisation
@@ -203,16 +414,39 @@ class PlayHQ(object):
             1. createdAt and updatedAt as Timestamp with self.timezone
             2. new field schedule.timezone combining schedule.date and schedule.time and self.timezone
             3. replace full stops in column names for _ (full stops are problematic in .query())
+            4. venue address fields moved to self.venues; games keep venue_id, venue_name and
+                the court (venue_surfaceName). Use self.venues.join() to get them back.
+
+        Games with no date yet are dropped, unless keep_undated is set: then they are kept
+        with a NaT schedule_timestamp, to be resolved later with enrich_games().
 
         Args:
             team_id (str): the PlayHQ id of the team to scrape all its games
+            keep_undated (bool, optional): keep games with no date yet (default: False)
 
         Returns:
             pd.DataFrame: a dataframe representing the fixture of the team
         """
         # https://docs.playhq.com/tech#tag/Teams/paths/~1v1~1teams~1:id~1fixture/get
+        return self.get_games_frame(f"teams/{team_id}/fixture", keep_undated)
+
+    def get_grade_games(self, grade_id, keep_undated=False) -> pd.DataFrame:
+        """Extract a df with all the games of a grade, in the same shape as get_team_fixture
+
+        Args:
+            grade_id (str): the PlayHQ id of the grade
+            keep_undated (bool, optional): keep games with no date yet (default: False)
+
+        Returns:
+            pd.DataFrame: a dataframe with all the games of the grade
+        """
+        # https://docs.playhq.com/tech#tag/Grades/paths/~1v1~1grades~1:id~1games/get
+        return self.get_games_frame(f"grades/{grade_id}/games", keep_undated)
+
+    def get_games_frame(self, key, keep_undated=False) -> pd.DataFrame:
+        """Build the games frame of endpoint key (a team fixture or the games of a grade)"""
         fixture_dfs = []
-        for data_json in self.get_json(f"teams/{team_id}/fixture"):
+        for data_json in self.get_json(key):
             fixture_dfs.append(pd.json_normalize(data_json["data"]))
         fixture_df = pd.concat(fixture_dfs)
 
@@ -220,9 +454,9 @@ class PlayHQ(object):
             return fixture_df
 
         # Drop games that have no date (some games are not yet scheduled fully)
-        #   maybe we can check using the id and GET games: https://docs.playhq.com/tech#tag/Games/paths/~1partner~1v1~1games~1:id~1summary/get
+        #   they can be resolved via their summaries instead, see enrich_games()
         ids_empty_date = fixture_df[fixture_df["schedule.date"] == ""]["id"].to_list()
-        if ids_empty_date:
+        if ids_empty_date and not keep_undated:
             logging.warning(
                 f"Games with ids {ids_empty_date} have no date. They will be dropped"
             )
@@ -238,81 +472,380 @@ class PlayHQ(object):
             self.timezone
         )
 
-        # add column with full game timestamp from date + time + timezone
-        fixture_df.loc[fixture_df["schedule_time"] == "", "schedule_time"] = (
+        fixture_df = self.add_schedule_timestamp(fixture_df)
+
+        return self.venues.add(fixture_df)
+
+    def add_schedule_timestamp(self, games_df: pd.DataFrame) -> pd.DataFrame:
+        """Add column schedule_timestamp with the full game timestamp from date + time + timezone
+
+        Empty times become "00:00:00" and empty timezones self.timezone. Games with no date
+        yet get NaT.
+        """
+        games_df.loc[games_df["schedule_time"] == "", "schedule_time"] = (
             "00:00:00"  # handle empty times
         )
-        fixture_df.loc[fixture_df["schedule_timezone"] == "", "schedule_timezone"] = (
+        games_df.loc[games_df["schedule_timezone"] == "", "schedule_timezone"] = (
             self.timezone
         )
-        fixture_df["schedule_timestamp"] = fixture_df.apply(
-            lambda x: pd.to_datetime(f"{x['schedule_date']} {x['schedule_time']}")
-            .tz_localize(x["schedule_timezone"])
-            .tz_convert(self.timezone),
-            axis=1,
+        timestamps = self.backend.timestamps(
+            games_df["schedule_date"],
+            games_df["schedule_time"],
+            games_df["schedule_timezone"],
+            self.timezone,
         )
+        games_df["schedule_timestamp"] = timestamps.to_numpy()
+        return games_df
 
-        return fixture_df
+    def get_game_summary(self, game_id) -> dict:
+        """The summary of a game (same fields as a fixture game), kept for SUMMARY_TTL
 
-    def get_games(
+        With a store, summaries are also served from it (e.g., as warmed by prefetch.py), but
+        only while younger than SUMMARY_TTL too, whatever the max_age of the store.
+        """
+        # https://docs.playhq.com/tech#tag/Games/paths/~1v1~1games~1:id~1summary/get
+        summary = self.summaries.get(game_id)
+        if summary is None:
+            pages = list(self.get_json(f"games/{game_id}/summary", max_age=SUMMARY_TTL))  # a single page
+            summary = pages[0]["data"]
+            self.summaries.put(game_id, summary)
+        return summary
+
+    def get_game_summaries(self, game_ids, max_workers=SUMMARY_WORKERS) -> dict:
+        """Summaries of many games, fetched concurrently (games that fail are logged and left out)
+
+        Args:
+            game_ids (list): PlayHQ ids of the games (repeated ids are fetched once)
+            max_workers (int, optional): number of concurrent requests
+
+        Returns:
+            dict: game id -> summary
+        """
+        game_ids = list(dict.fromkeys(game_ids))
+
+        def fetch(game_id):
+            try:
+                return game_id, self.get_game_summary(game_id)
+            except Exception as e:
+                logging.error(f"Could not get the summary of game {game_id}: {e}")
+                return game_id, None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(tqdm(executor.map(fetch, game_ids), total=len(game_ids)))
+        return {game_id: summary for game_id, summary in results if summary is not None}
+
+    @staticmethod
+    def incomplete_games(games_df: pd.DataFrame) -> pd.Series:
+        """Mask of the games with no date yet or with a pending competitor (e.g., finals)"""
+        no_competitors = games_df["competitors"].map(
+            lambda x: len(x) if isinstance(x, list) else 0
+        )
+        return games_df["schedule_timestamp"].isna() | (no_competitors < 2)
+
+    def enrich_games(self, games_df: pd.DataFrame, max_workers=SUMMARY_WORKERS) -> pd.DataFrame:
+        """Fill in undated and pending games of a games frame from their game summaries
+
+        The ids of all such games (across teams) are collected and each summary is fetched
+        once, concurrently. Their schedule, venue, status and competitors are then merged back,
+        so a fixture completed later by the association needs no full re-scrape. Games whose
+        summary is not (yet) complete are left as they were.
+
+        Args:
+            games_df (pd.DataFrame): games as per get_team_fixture or get_games
+            max_workers (int, optional): number of concurrent requests
+
+        Returns:
+            pd.DataFrame: a copy of games_df with the games resolved from their summaries
+        """
+        mask = self.incomplete_games(games_df)
+        if not mask.any():
+            return games_df
+
+        summaries = self.get_game_summaries(games_df.loc[mask, "id"], max_workers)
+        if not summaries:
+            return games_df
+
+        summary_df = pd.json_normalize(list(summaries.values()))
+        summary_df.columns = summary_df.columns.str.replace(".", "_", regex=False)
+        if "updatedAt" in summary_df.columns:
+            summary_df["updatedAt"] = pd.to_datetime(summary_df["updatedAt"]).dt.tz_convert(
+                self.timezone
+            )
+        summary_df = self.venues.add(summary_df).drop_duplicates("id").set_index("id")
+
+        games_df = games_df.copy()
+        rows = mask & games_df["id"].isin(summary_df.index)
+        for col in [c for c in SUMMARY_COLS if c in summary_df.columns and c in games_df.columns]:
+            values = games_df.loc[rows, "id"].map(summary_df[col])
+            games_df.loc[rows, col] = values.where(values.notna(), games_df.loc[rows, col])
+        games_df.loc[rows, "schedule_timestamp"] = self.add_schedule_timestamp(
+            games_df.loc[rows].copy()
+        )["schedule_timestamp"]
+
+        logging.info(
+            f"Games resolved from their summaries: {(mask & ~self.incomplete_games(games_df)).sum()}"
+            f" of {mask.sum()} undated or pending games"
+        )
+        return games_df
+
+    def plan_fetches(self, teams_df: pd.DataFrame, min_teams=2) -> pd.DataFrame:
+        """Plan the requests to get the fixtures of some teams, grouping the teams by grade
+
+        Grades with at least min_teams of the teams are fetched once with the games of the
+        grade; the other teams with their own fixture. Teams with no grade.id column (or with
+        PlayHQ not serving grade games) are always fetched per team.
+
+        Args:
+            teams_df (pd.DataFrame): teams, as per get_season_teams
+            min_teams (int, optional): teams of a grade needed to fetch the whole grade
+
+        Returns:
+            pd.DataFrame: one row per fetch, with columns source ("grade" or "team"), id (of the
+                grade or the team) and team_ids (the teams it serves, in teams_df order)
+        """
+        if "grade.id" not in teams_df.columns or not self.grade_games:
+            grade_ids = pd.Series(None, index=teams_df.index, dtype=object)
+        else:
+            grade_ids = teams_df["grade.id"]
+        grade_sizes = grade_ids.map(grade_ids.value_counts())
+        by_grade = grade_ids.notna() & (grade_sizes >= min_teams)
+
+        plan, grade_fetches = [], {}
+        for team_id, grade_id, whole_grade in zip(teams_df["id"], grade_ids, by_grade):
+            if not whole_grade:
+                plan.append({"source": "team", "id": team_id, "team_ids": [team_id]})
+                continue
+            if grade_id not in grade_fetches:  # first team of the grade: fetch the grade here
+                grade_fetches[grade_id] = {"source": "grade", "id": grade_id, "team_ids": []}
+                plan.append(grade_fetches[grade_id])
+            grade_fetches[grade_id]["team_ids"].append(team_id)
+        return pd.DataFrame(plan, columns=["source", "id", "team_ids"])
+
+    def iter_team_fixtures(
+        self,
+        teams_df: pd.DataFrame,
+        by_grade=False,
+        keep_undated=False,
+        team_errors=None,
+        deadline=None,
+    ):
+        """Yield the fixture of each team as (team id, team name, fixture df), following plan_fetches()
+
+        Grades that cannot be fetched fall back to the fixtures of their teams. Once done, the
+        requests of the plan are logged and saved in self.fetch_stats: teams (one request
+        each if fetched per team), planned (fetches in the plan, one request each at least),
+        requests (pages actually fetched from PlayHQ) and skipped (teams not fetched because
+        the deadline passed).
+
+        Args:
+            teams_df (pd.DataFrame): teams to extract games
+            by_grade (bool, optional): group the teams by grade (default: one fetch per team)
+            keep_undated (bool, optional): keep games with no date yet (default: False)
+            team_errors (list, optional): list where to collect the names of teams that failed
+            deadline (float, optional): seconds (or a deadlines.Deadline) for the whole run
+        """
+        team_names = dict(zip(teams_df["id"], teams_df["name"]))
+        plan_df = self.plan_fetches(teams_df, min_teams=2 if by_grade else float("inf"))
+        requests_start = self.requests
+
+        skipped = []
+        with self.run_deadline(deadline):
+            for no, (source, fetch_id, team_ids) in enumerate(
+                tqdm(plan_df.itertuples(index=False), total=len(plan_df))
+            ):
+                if self.deadline is not None and self.deadline.expired():
+                    # out of time: return what we have and report the teams left
+                    skipped += [team_names[t] for ids in plan_df["team_ids"].iloc[no:] for t in ids]
+                    break
+                if source == "grade" and self.grade_games:
+                    grade_df = None
+                    try:
+                        grade_df = self.get_grade_games(fetch_id, keep_undated)
+                    except deadlines.DeadlineExceeded:
+                        skipped += [team_names[t] for t in team_ids]
+                        continue
+                    except Exception as e:
+                        if isinstance(e, urllib.error.HTTPError) and e.code in (403, 404):
+                            self.grade_games = False  # not served for this API key: stop trying
+                        logging.warning(f"Cannot get games of grade {fetch_id} ({e}); fetching its teams")
+
+                    if grade_df is not None:
+                        # fan the games of the grade out to each of its teams
+                        competitor_ids = grade_df["competitors"].map(
+                            lambda x: {c.get("id") for c in x} if isinstance(x, list) else set()
+                        )
+                        for team_id in team_ids:
+                            fixture_df = grade_df[competitor_ids.map(lambda ids: team_id in ids)]
+                            yield team_id, team_names[team_id], fixture_df.copy()
+                        continue
+
+                for team_id in team_ids:
+                    logging.debug(f"Extracting games for team: {team_names[team_id]}")
+                    try:
+                        fixture_df = self.get_team_fixture(team_id, keep_undated)
+                    except deadlines.DeadlineExceeded:
+                        skipped.append(team_names[team_id])
+                        continue
+                    except Exception as e:
+                        print("Error with team: ", team_names[team_id])
+                        if team_errors is not None:
+                            team_errors.append(team_names[team_id])
+                        logging.error(e)
+                        continue
+                    yield team_id, team_names[team_id], fixture_df
+
+        self.fetch_stats = {
+            "teams": len(teams_df),
+            "planned": len(plan_df),
+            "requests": self.requests - requests_start,
+            "skipped": skipped,
+        }
+        logging.info(
+            f"Fetched {len(teams_df)} teams with {len(plan_df)} planned fetches and "
+            f"{self.fetch_stats['requests']} requests (vs. at least {len(teams_df)} fetching per team)"
+        )
+        if skipped:
+            logging.warning(
+                f"Run deadline passed: games are partial, {len(skipped)} teams not fetched: {skipped}"
+            )
+
+    def iter_games(
         self,
         teams_df: pd.DataFrame,
         from_date: pd.Timestamp,
         to_date: pd.Timestamp = None,
         status=None,
-    ) -> pd.DataFrame:
-        """Build df with all teams's games with status (default is UPCOMING games) and within interval dates
+        team_errors: list = None,
+        resolve_undated=False,
+        by_grade=False,
+        deadline=None,
+    ):
+        """Yield the games of each team with status (if any) and within interval dates, one team at a time
+
+        Each team fixture is fetched only when the next frame is asked for, so a pipeline
+        consuming this generator (e.g., iter_teamsapp_schedule and utils.write_frames_csv)
+        holds one team's fixture at a time. Teams with no games are skipped.
 
         Args:
             teams_df (pd.DataFrame): teams to extract games
             from_date (pd.Timestamp): games from this date (inclusive)
             to_date (pd.Timestamp): games until this date (inclusive)
             status: (String): the status of games to scrape (default "UPCOMING")
-
-        Returns:
-            pd.DataFrame: a df with games of all the teams within the dates and with status (if any)
+            team_errors (list, optional): list where to collect the names of teams that failed
+            resolve_undated (bool, optional): also yield games with no date yet (NaT
+                schedule_timestamp), to be resolved with enrich_games()
+            by_grade (bool, optional): fetch the games of whole grades for grades with several
+                of the teams, rather than each team fixture (see plan_fetches)
+            deadline (float, optional): seconds (or a deadlines.Deadline) for the whole run;
+                once passed, no more teams are fetched (see fetch_stats["skipped"])
+
+        Yields:
+            pd.DataFrame: the games of one team, with columns team_name and team_id added
         """
         if to_date is None:  # assume 1 day interval
             to_date = from_date + pd.Timedelta(days=1)
+        statuses = [status] if isinstance(status, str) else status
 
-        club_upcoming_games = []
-        team_errors = []
-        for team in tqdm(teams_df[["id", "name"]].to_records(index=False)):
-            logging.debug(f"Extracting games for team: {team}")
-            team_name = team[1]
-            team_id = team[0]
-
+        fixtures = self.iter_team_fixtures(
+            teams_df, by_grade, resolve_undated, team_errors, deadline
+        )
+        for team_id, team_name, fixture_df in fixtures:
             try:
-                fixture_df = self.get_team_fixture(team[0])
-
                 if fixture_df.empty:
                     continue
                 # filter wrt date interval
-                fixture_df = fixture_df.query(
-                    "schedule_timestamp >= @from_date and schedule_timestamp <= @to_date"
-                )
+                in_dates = fixture_df["schedule_timestamp"].between(from_date, to_date)
+                if resolve_undated:
+                    in_dates |= fixture_df["schedule_timestamp"].isna()
+                fixture_df = fixture_df[in_dates]
 
                 if status is not None:  # need to filter by status
-                    # fixture_df = fixture_df.loc[fixture_df['status'] == status]
-                    fixture_df = fixture_df.query("status in @status")
-                if fixture_df.empty:
-                    logging.info(f"No games for team: {team_name}")
-                else:
-                    logging.info(f"Games extracted for team: {team_name}")
-                    # fixture_df.insert(1, 'team_name', self.tapp_team_name(team_name)) # translate the team name
-                    fixture_df.insert(1, "team_name", team_name)
-                    fixture_df.insert(2, "team_id", team_id)
-                    club_upcoming_games.append(fixture_df)
+                    fixture_df = fixture_df[fixture_df["status"].isin(statuses)]
             except Exception as e:
                 print("Error with team: ", team_name)
-                team_errors.append(team_name)
+                if team_errors is not None:
+                    team_errors.append(team_name)
                 logging.error(e)
+                continue
+
+            if fixture_df.empty:
+                logging.info(f"No games for team: {team_name}")
+                continue
+
+            logging.info(f"Games extracted for team: {team_name}")
+            # fixture_df.insert(1, 'team_name', self.tapp_team_name(team_name)) # translate the team name
+            fixture_df.insert(1, "team_name", team_name)
+            fixture_df.insert(2, "team_id", team_id)
+            fixture_df.reset_index(drop=True, inplace=True)
+            yield fixture_df
+
+    def get_games(
+        self,
+        teams_df: pd.DataFrame,
+        from_date: pd.Timestamp,
+        to_date: pd.Timestamp = None,
+        status=None,
+        enrich=False,
+        by_grade=False,
+        deadline=None,
+    ) -> pd.DataFrame:
+        """Build df with all teams's games with status (default is UPCOMING games) and within interval dates
+
+        Args:
+            teams_df (pd.DataFrame): teams to extract games
+            from_date (pd.Timestamp): games from this date (inclusive)
+            to_date (pd.Timestamp): games until this date (inclusive)
+            status: (String): the status of games to scrape (default "UPCOMING")
+            enrich (bool, optional): resolve undated and pending games from their summaries
+                (see enrich_games); games still with no date are then dropped
+            by_grade (bool, optional): fetch whole grades with several of the teams at once
+                (see plan_fetches); the requests made are left in self.fetch_stats
+            deadline (float, optional): seconds for the whole run; once passed, the games
+                fetched so far are returned and the teams left out are in fetch_stats["skipped"]
+
+        Returns:
+            pd.DataFrame: a df with games of all the teams within the dates and with status (if any)
+        """
+        team_errors = []
+        deadline = deadlines.Deadline.coerce(deadline)
+        club_upcoming_games = list(
+            self.iter_games(
+                teams_df,
+                from_date,
+                to_date,
+                status,
+                team_errors,
+                resolve_undated=enrich,
+                by_grade=by_grade,
+                deadline=deadline,
+            )
+        )
 
         club_games_df = None
         if club_upcoming_games:  # list is not empty
             club_games_df = pd.concat(club_upcoming_games)
             club_games_df.reset_index(drop=True, inplace=True)
 
+        if enrich and club_games_df is not None:
+            if deadline is not None and deadline.expired():
+                logging.warning("Run deadline passed: undated and pending games not resolved")
+            else:
+                with self.run_deadline(deadline):
+                    club_games_df = self.enrich_games(club_games_df)
+            timestamps = club_games_df["schedule_timestamp"]
+            if timestamps.isna().any():
+                logging.warning(
+                    f"Games with ids {club_games_df.loc[timestamps.isna(), 'id'].unique().tolist()}"
+                    " still have no date. They will be dropped"
+                )
+            club_games_df = club_games_df[timestamps.between(from_date, to_date)]
+            if status is not None:  # resolved games may have a new status
+                statuses = [status] if isinstance(status, str) else status
+                club_games_df = club_games_df[club_games_df["status"].isin(statuses)]
+            club_games_df = club_games_df.reset_index(drop=True)
+            if club_games_df.empty:
+                club_games_df = None
+
         # club_upcoming_games_df.columns
         # (['id', 'status', 'url', 'createdAt', 'updatedAt', 'pool', 'competitors',
         #        'grade.id', 'grade.name', 'grade.url', 'round.id', 'round.name',
@@ -355,21 +888,22 @@ class PlayHQ(object):
             :, ["team_name", "team_id", "round_name", "round_abbreviatedName"]
         ]
 
-        games_tapps_df["team_name"] = games_tapps_df.apply(
-            lambda x: self.tapp_team_name(x["team_name"]), axis=1
-        )  # translate the team name
-        games_tapps_df["opponent"] = games_df.apply(
-            lambda x: extract_opponent(x["team_id"], x["competitors"]), axis=1
-        )
+        # translate each team name once
+        tapp_names = {name: self.tapp_team_name(name) for name in games_tapps_df["team_name"].unique()}
+        games_tapps_df["team_name"] = games_tapps_df["team_name"].map(tapp_names)
+        games_tapps_df["opponent"] = [
+            extract_opponent(team_id, competitors)
+            for team_id, competitors in zip(games_df["team_id"], games_df["competitors"])
+        ]
 
         # Set the name of the game event, e.g., "Game 12.1 Round 1"
         # games_tapps_df['event_name'] = games_tapps_df['team_name'] + " - " + games_tapps_df['round_name']
-        games_tapps_df["event_name"] = games_tapps_df.apply(
-            lambda x: self.tapp_game_name(
-                x["team_name"], x["opponent"], x["round_name"]
-            ),
-            axis=1,
-        )
+        games_tapps_df["event_name"] = [
+            self.tapp_game_name(team_name, opponent, round_name)
+            for team_name, opponent, round_name in zip(
+                games_tapps_df["team_name"], games_tapps_df["opponent"], games_tapps_df["round_name"]
+            )
+        ]
 
         games_tapps_df["schedule_timestamp"] = games_df["schedule_timestamp"]
         games_tapps_df["start_date"] = games_df["schedule_timestamp"].dt.date
@@ -380,10 +914,11 @@ class PlayHQ(object):
             games_df["schedule_timestamp"] + datetime.timedelta(minutes=game_duration)
         ).dt.time
 
-        games_tapps_df["location"] = (
-            games_df["venue_address_line1"] + ", " + games_df["venue_address_suburb"]
-        )
-        # team_apps_df['location'] = club_upcoming_games_df[['venue.address.line1', 'venue.address.suburb']].agg(','.join, axis=1)
+        # venue fields are worked out once per venue in the venue table and looked up by id
+        games_df = self.venues.add(games_df)
+        venues_df = self.venues.venues_df.reindex(games_df["venue_id"])
+
+        games_tapps_df["location"] = venues_df["location"].to_numpy()
         games_tapps_df["access_groups"] = games_tapps_df["team_name"]
         games_tapps_df["rsvp"] = 1
         games_tapps_df["comments"] = 1
@@ -392,36 +927,54 @@ class PlayHQ(object):
         games_tapps_df["ticketing"] = 0
         games_tapps_df["reference_id"] = ""
 
-        games_tapps_df["venue"] = games_df["venue_name"]
+        games_tapps_df["venue"] = venues_df["venue_name"].to_numpy()
         games_tapps_df["court"] = games_df["venue_surfaceName"]
-        games_tapps_df["lat"] = games_df["venue_address_latitude"]
-        games_tapps_df["lon"] = games_df["venue_address_longitude"]
-        games_tapps_df["game_url"] = games_df.apply(
-            lambda x: utils.shorten_url(x["url"]), axis=1
-        )
-        games_tapps_df["grade_url"] = games_df.apply(
-            lambda x: utils.shorten_url(x["grade_url"]), axis=1
-        )
-
-        games_tapps_df["description"] = games_tapps_df.apply(
-            lambda x: desc_template.format(
-                opponent=x["opponent"],
-                venue=x["venue"],
-                court=x["court"],
-                address=x["location"],
+        games_tapps_df["lat"] = venues_df["venue_address_latitude"].to_numpy()
+        games_tapps_df["lon"] = venues_df["venue_address_longitude"].to_numpy()
+        games_tapps_df["map_url"] = venues_df["map_url"].to_numpy()
+        games_tapps_df["waze_url"] = venues_df["waze_url"].to_numpy()
+        # shorten each URL once (many games share the grade URL)
+        urls = pd.concat([games_df["url"], games_df["grade_url"]]).unique()
+        short_urls = {url: self.shorten_url(url) for url in urls}
+        games_tapps_df["game_url"] = games_df["url"].map(short_urls)
+        games_tapps_df["grade_url"] = games_df["grade_url"].map(short_urls)
+
+        desc_cols = ["opponent", "venue", "court", "location", "lat", "lon", "map_url", "waze_url", "game_url", "grade_url"]
+        games_tapps_df["description"] = [
+            desc_template.format(
+                opponent=opponent,
+                venue=venue,
+                court=court,
+                address=location,
                 address_tips="",  # we have no address tips
-                lat=x["lat"],
-                lon=x["lon"],
-                url_game=x["game_url"],
-                url_grade=x["grade_url"],
-            ),
-            axis=1,
-        )
+                lat=lat,
+                lon=lon,
+                coord=(lat, lon),
+                map_url=map_url,
+                waze_url=waze_url,
+                url_game=game_url,
+                url_grade=grade_url,
+            )
+            for opponent, venue, court, location, lat, lon, map_url, waze_url, game_url, grade_url in zip(
+                *(games_tapps_df[c].tolist() for c in desc_cols)
+            )
+        ]
 
         # return the dataframe with just the columns that TeamApp uses for CSV import
         games_tapps_df = games_tapps_df.loc[:, TAPP_COLS_CSV + ["opponent", "court"]]
         return games_tapps_df
 
+    def iter_teamsapp_schedule(
+        self, games_frames, desc_template=DESC_TAPP_DEFAULT, game_duration=45
+    ):
+        """Translate each frame of games (e.g., from iter_games) to TeamApp, as they come
+
+        Yields:
+            pd.DataFrame: the TeamApp schedule of each frame of games, as per to_teamsapp_schedule
+        """
+        for games_df in games_frames:
+            yield self.to_teamsapp_schedule(games_df, desc_template, game_duration)
+
     def build_teamsapp_bye_schedule(
         self, teams: list, date: datetime, desc_bye=DESC_BYE_TAPP_DEFAULT
     ) -> pd.DataFrame:
@@ -429,11 +982,12 @@ class PlayHQ(object):
 
         The teams is a list of team names as they appear in TeamApps
 
+        The date can also be a list with one date per team, to build BYEs for many days at once.
         """
         if teams is None or len(teams) == 0:  # there are BYE games
             return None
 
-        bye_teams_df = pd.DataFrame(teams, columns=["team_name"])
+        bye_teams_df = pd.DataFrame(list(teams), columns=["team_name"])
 
         bye_teams_df["access_groups"] = bye_teams_df["team_name"]
         bye_teams_df["event_name"] = bye_teams_df["team_name"] + " - BYE"
@@ -454,3 +1008,63 @@ class PlayHQ(object):
 
         bye_teams_df = bye_teams_df[TAPP_COLS_CSV]
         return bye_teams_df
+
+    def build_teamsapp_bye_rounds(
+        self,
+        teams_df: pd.DataFrame,
+        games_df: pd.DataFrame,
+        by="round",
+        desc_bye=DESC_BYE_TAPP_DEFAULT,
+    ) -> pd.DataFrame:
+        """Builds the BYE entries of all the teams for every round in the games, in one pass
+
+        Unlike build_teamsapp_bye_schedule, the games can span many days or weeks. Games are
+        grouped into rounds and a team has a BYE in a round if it has no game in it:
+
+            - by="round": rounds by name (e.g., "Round 5"), as all grades play round N on the same weekend
+            - by="round_id": the rounds of each grade, only for the teams in that grade (needs grade.id in teams_df)
+            - by="day": each game day is a round
+
+        The BYE of a round is set on the first day of the games in that round. Rounds are only
+        known from the games given, so a round in which every team has a BYE will not show up.
+
+        Args:
+            teams_df (pd.DataFrame): teams as per get_season_teams (columns id, name and grade.id)
+            games_df (pd.DataFrame): games of the teams as per get_games (columns team_id, round_id, round_name, schedule_timestamp)
+            by (str, optional): how to group games into rounds: "round", "round_id" or "day"
+            desc_bye (str, optional): Text to use in the TeamApp description field of each BYE
+
+        Returns:
+            pd.DataFrame: the BYE entries for import into TeamApp Schedule (None if there are no BYEs)
+        """
+        if games_df is None or games_df.empty:
+            return None
+
+        games_df = games_df.assign(game_day=games_df["schedule_timestamp"].dt.date)
+        round_key = {"round": "round_name", "round_id": "round_id", "day": "game_day"}[by]
+
+        # every round (and its grade, when rounds are per grade) and its first day
+        group_cols = ["grade_id", round_key] if by == "round_id" else [round_key]
+        rounds_df = games_df.groupby(group_cols, as_index=False)["game_day"].min()
+
+        # all (team, round) pairs that should have a game...
+        teams_df = teams_df.rename(columns={"id": "team_id", "grade.id": "grade_id"})
+        if by == "round_id":
+            expected_df = teams_df[["team_id", "name", "grade_id"]].merge(rounds_df, on="grade_id")
+        else:
+            expected_df = teams_df[["team_id", "name"]].merge(rounds_df, how="cross")
+
+        # ... minus the pairs that have one
+        expected = pd.MultiIndex.from_frame(expected_df[["team_id", round_key]])
+        played = pd.MultiIndex.from_frame(games_df[["team_id", round_key]])
+        bye_df = expected_df.loc[~expected.isin(played)].sort_values(["game_day", "name"])
+        if bye_df.empty:
+            return None
+
+        # translate each team name once
+        tapp_names = {name: self.tapp_team_name(name) for name in bye_df["name"].unique()}
+        bye_teams_df = self.build_teamsapp_bye_schedule(
+            bye_df["name"].map(tapp_names).tolist(), bye_df["game_day"].tolist(), desc_bye
+        )
+        bye_teams_df.reset_index(drop=True, inplace=True)
+        return bye_teams_df
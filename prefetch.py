@@ -0,0 +1,174 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import argparse
+import datetime
+import importlib
+import logging
+import time
+
+import coloredlogs
+import pandas as pd
+from tqdm.auto import tqdm
+
+import cache
+import playhq as phq
+
+LOGGING_LEVEL = "INFO"
+LOGGING_FMT = "%(asctime)s %(levelname)s %(message)s"
+
+STORE_PATH = ".playhq-store"
+
+###########################################################
+# PREFETCH OF UPCOMING ROUNDS INTO THE LOCAL STORE
+###########################################################
+
+
+def prefetch(phq_club: phq.PlayHQ, season_id, from_date, to_date, by_grade=True):
+    """Fetch the club teams, their games, game summaries and short URLs between two dates
+
+    Everything is saved in the store of phq_club, so a later run using the same store
+    (e.g., the scrape notebook on game-day eve) is mostly local work. The games are fetched
+    as the notebook does (get_games with enrich=True), so the same endpoints are stored:
+    the grade or team listings, as per by_grade, and the summaries of the undated and
+    pending games.
+
+    Args:
+        phq_club (phq.PlayHQ): the PlayHQ object of the club, with a store
+        season_id (str): PlayHQ id of the season
+        from_date (pd.Timestamp): games from this date (inclusive)
+        to_date (pd.Timestamp): games until this date (inclusive)
+        by_grade (bool, optional): fetch whole grades with several club teams (see
+            PlayHQ.plan_fetches); must match the publish run. Defaults to True.
+
+    Returns:
+        dict: number of teams, games, game summaries and short URLs prefetched, and the teams that failed
+    """
+    teams_df = phq_club.get_season_teams(season_id)
+    summaries = len(phq_club.summaries)
+    games_df, team_errors = phq_club.get_games(
+        teams_df, from_date, to_date, enrich=True, by_grade=by_grade
+    )
+
+    urls = []
+    if games_df is not None:
+        urls = pd.concat([games_df["url"], games_df["grade_url"]]).dropna().unique()
+        for url in tqdm(urls):
+            phq_club.shorten_url(url)
+
+    return {
+        "teams": len(teams_df),
+        "games": 0 if games_df is None else len(games_df),
+        "summaries": len(phq_club.summaries) - summaries,
+        "short_urls": len(urls),
+        "team_errors": team_errors,
+    }
+
+
+def next_run(now: datetime.datetime, window, last_run: datetime.datetime = None):
+    """When to run next: now if inside the window and not yet run today, otherwise the next window start"""
+    window_start, window_end = window
+    day = now.date()
+    if (last_run is not None and last_run.date() == day) or now.time() >= window_end:
+        day += datetime.timedelta(days=1)
+    return max(now, datetime.datetime.combine(day, window_start))
+
+
+def parse_window(text):
+    """Parse an off-peak window like "01:00-05:00" into two times"""
+    start, end = [datetime.time.fromisoformat(x.strip()) for x in text.split("-")]
+    if not start < end:
+        raise argparse.ArgumentTypeError(f"Window start must be before its end: {text}")
+    return start, end
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="""
+        Prefetch the fixtures, teams and short URLs of the upcoming rounds into a local store,
+        during an off-peak window every day, so the game-day publish run is mostly local work.
+
+        E.g.,:
+
+        $ python prefetch.py config_bmc_w24 --weeks 2 --window 01:00-05:00
+        """
+    )
+    parser.add_argument(
+        dest="CONFIG",
+        type=str,
+        help="Club configuration module (e.g., config_bmc_w24).",
+    )
+    parser.add_argument(
+        "--store",
+        default=STORE_PATH,
+        help="Folder of the local store (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--weeks",
+        type=int,
+        default=2,
+        help="Weeks of upcoming games to prefetch (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--window",
+        type=parse_window,
+        default="01:00-05:00",
+        help="Daily off-peak window to prefetch in, as HH:MM-HH:MM (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--no-by-grade",
+        dest="by_grade",
+        action="store_false",
+        help="Fetch each team fixture rather than whole grades (use if the publish run does so).",
+    )
+    parser.add_argument(
+        "--now",
+        action="store_true",
+        help="Prefetch once right now and exit (e.g., when run from cron).",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        default=False,
+        help="Show debugging info (default: %(default)s).",
+    )
+    args = parser.parse_args()
+
+    coloredlogs.install(level="DEBUG" if args.debug else LOGGING_LEVEL, fmt=LOGGING_FMT)
+    config = importlib.import_module(args.CONFIG)
+
+    # the prefetcher always fetches fresh pages; the publish run serves them from the store
+    store = cache.ResponseStore(args.store, max_age=datetime.timedelta(0))
+    phq_club = phq.PlayHQ(
+        config.CLUB_NAME,
+        config.ORG_ID,
+        config.X_API_KEY,
+        config.X_TENANT,
+        config.TIMEZONE,
+        config.tapp_team_name,
+        config.tapp_game_name,
+        store=store,
+    )
+
+    last_run = None
+    while True:
+        if not args.now:
+            run_at = next_run(datetime.datetime.now(), args.window, last_run)
+            logging.info(f"Next prefetch at {run_at}")
+            time.sleep(max(0, (run_at - datetime.datetime.now()).total_seconds()))
+
+        from_date = pd.Timestamp.now(tz=config.TIMEZONE).normalize()
+        to_date = from_date + pd.Timedelta(weeks=args.weeks)
+        logging.info(f"Prefetching games between {from_date.date()} and {to_date.date()} into {args.store}")
+        try:
+            stats = prefetch(phq_club, config.SEASON_ID, from_date, to_date, args.by_grade)
+            logging.info(f"Prefetch finished: {stats}")
+        except Exception as e:
+            logging.error(f"Prefetch failed (will retry in the next window): {e}")
+        last_run = datetime.datetime.now()
+
+        if args.now:
+            break
@@ -0,0 +1,241 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import numpy as np
+import pandas as pd
+
+SIDES = ["home", "away"]
+
+# competitor fields in PlayHQ -> suffix of the flattened columns (e.g., home_score)
+COMPETITOR_FIELDS = {
+    "id": "id",
+    "name": "name",
+    "isHomeTeam": "is_home",
+    "scoreTotal": "score",
+    "outcome": "outcome",
+}
+
+# string columns with at most this ratio of distinct values are stored as categories
+CATEGORY_RATIO = 0.5
+
+# fields of a GameRecord, taken from a compact games frame
+GAME_FIELDS = (
+    "id",
+    "status",
+    "team_id",
+    "team_name",
+    "grade_id",
+    "grade_name",
+    "round_name",
+    "schedule_timestamp",
+    "venue_id",
+    "venue_name",
+    "venue_surfaceName",
+    "home_id",
+    "home_name",
+    "home_score",
+    "away_id",
+    "away_name",
+    "away_score",
+)
+
+###########################################################
+# COMPACT GAME RECORDS
+###########################################################
+
+
+class GameRecord:
+    """One game as a light slotted object (no per-instance dict), see iter_records()"""
+
+    __slots__ = GAME_FIELDS
+
+    def __init__(self, *values) -> None:
+        for field, value in zip(GAME_FIELDS, values):
+            setattr(self, field, value)
+
+    @property
+    def opponent_name(self):
+        """Name of the opponent of team_id, or "PENDING" if there is no opponent yet"""
+        if pd.isna(self.home_id) or pd.isna(self.away_id):
+            return "PENDING"
+        return self.away_name if self.team_id == self.home_id else self.home_name
+
+    def __repr__(self) -> str:
+        return f"GameRecord({', '.join(f'{f}={getattr(self, f)!r}' for f in GAME_FIELDS)})"
+
+
+def flatten_competitors(competitors: pd.Series) -> pd.DataFrame:
+    """Flatten a column of competitor lists into home_* and away_* columns (one row per game)
+
+    The home team is the competitor with isHomeTeam, or the first one if none is flagged.
+    Column home_first records whether the home team came first in the list, and
+    n_competitors how many competitors there were (1 when the opponent is still pending).
+    Games have at most two competitors.
+    """
+    rows = competitors.explode()
+    position = rows.groupby(level=0).cumcount()
+    rows, position = rows[rows.notna()], position[rows.notna()]
+    comp_df = pd.DataFrame(rows.tolist(), index=rows.index)
+
+    flagged = (
+        comp_df["isHomeTeam"].eq(True)
+        if "isHomeTeam" in comp_df
+        else pd.Series(False, index=comp_df.index)
+    )
+    any_flagged = flagged.groupby(level=0).transform("any")
+    is_home = flagged | (~any_flagged & (position == 0))
+    is_home &= is_home.astype(int).groupby(level=0).cumsum() == 1  # only one home team
+    is_away = ~is_home & ((~is_home).astype(int).groupby(level=0).cumsum() == 1)
+
+    flat_df = pd.DataFrame(index=competitors.index)
+    for side, mask in zip(SIDES, [is_home, is_away]):
+        side_df = comp_df.loc[mask]
+        for field, suffix in COMPETITOR_FIELDS.items():
+            values = side_df[field] if field in side_df else pd.Series(np.nan, index=side_df.index)
+            if suffix == "score":
+                values = pd.to_numeric(values, errors="coerce").astype("Int32")
+            elif suffix == "is_home":
+                values = values.astype("boolean")
+            flat_df[f"{side}_{suffix}"] = values.reindex(competitors.index)
+    flat_df["home_first"] = (position[is_home] == 0).reindex(competitors.index, fill_value=True)
+    flat_df["n_competitors"] = (
+        rows.groupby(level=0).size().reindex(competitors.index, fill_value=0).astype("int8")
+    )
+    return flat_df
+
+
+def compact_games(games_df: pd.DataFrame, category_ratio=CATEGORY_RATIO) -> pd.DataFrame:
+    """Compact typed version of a games frame (as per PlayHQ.get_games or get_team_fixture)
+
+    Column competitors (lists of dicts) is flattened into home_* and away_* columns with
+    nullable integer scores, and repetitive string columns (status, grade, round, venue,
+    team names and ids, ...) become categories.
+
+    Returns:
+        pd.DataFrame: the compact games frame, with the same index
+    """
+    games_df = games_df.reset_index(drop=True)
+    compact_df = games_df.drop(columns=["competitors"], errors="ignore")
+    if "competitors" in games_df:
+        compact_df = compact_df.join(flatten_competitors(games_df["competitors"]))
+
+    for col in compact_df.columns:
+        series = compact_df[col]
+        if not pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        try:
+            distinct = series.nunique(dropna=True)
+        except TypeError:  # unhashable values (e.g., dicts): leave as they are
+            continue
+        if distinct <= category_ratio * len(series):
+            compact_df[col] = series.astype("category")
+    return compact_df
+
+
+def expand_games(compact_df: pd.DataFrame) -> pd.DataFrame:
+    """Back from a compact games frame to the PlayHQ games frame shape (with column competitors)
+
+    Competitor fields with no value (e.g., the score of an upcoming game) are left out of
+    the competitor dicts.
+    """
+    games_df = compact_df.copy()
+    for col in games_df.columns:
+        if isinstance(games_df[col].dtype, pd.CategoricalDtype):
+            values = games_df[col].astype(games_df[col].dtype.categories.dtype)
+            if values.dtype == object:
+                values = values.where(values.notna(), None)
+            games_df[col] = values
+
+    if "home_id" not in games_df:
+        return games_df
+
+    def competitor(values):
+        comp = {}
+        for (field, suffix), value in zip(COMPETITOR_FIELDS.items(), values):
+            if pd.isna(value):
+                continue
+            if field == "scoreTotal":
+                value = int(value)
+            elif field == "isHomeTeam":
+                value = bool(value)
+            comp[field] = value
+        return comp
+
+    side_cols = [[f"{side}_{suffix}" for suffix in COMPETITOR_FIELDS.values()] for side in SIDES]
+    homes = zip(*(games_df[c].tolist() for c in side_cols[0]))
+    aways = zip(*(games_df[c].tolist() for c in side_cols[1]))
+    competitors = []
+    for home, away, home_first, n in zip(
+        homes, aways, games_df["home_first"].tolist(), games_df["n_competitors"].tolist()
+    ):
+        comps = [competitor(home), competitor(away)][:n]
+        competitors.append(comps if home_first else comps[::-1])
+
+    games_df = games_df.drop(columns=sum(side_cols, []) + ["home_first", "n_competitors"])
+    position = games_df.columns.get_loc("pool") + 1 if "pool" in games_df else len(games_df.columns)
+    games_df.insert(position, "competitors", competitors)
+    return games_df
+
+
+def iter_records(compact_df: pd.DataFrame):
+    """Yield a GameRecord for each game of a compact games frame"""
+    columns = [
+        compact_df[f].tolist() if f in compact_df else [None] * len(compact_df)
+        for f in GAME_FIELDS
+    ]
+    for values in zip(*columns):
+        yield GameRecord(*values)
+
+
+def diff_games(old_df: pd.DataFrame, new_df: pd.DataFrame, cols=None) -> dict:
+    """Games added, removed and changed between two (compact) games frames, matched by game id
+
+    Games repeated in a frame (e.g., once per team) are compared once.
+
+    Args:
+        old_df (pd.DataFrame): the games before
+        new_df (pd.DataFrame): the games after
+        cols (list, optional): columns to compare (default: all common columns but team_name and team_id)
+
+    Returns:
+        dict: "added" and "removed" game ids, and "changed", a frame with the id and the
+            columns that changed (old and new values) of each changed game
+    """
+    old_df = old_df.drop_duplicates("id").set_index("id")
+    new_df = new_df.drop_duplicates("id").set_index("id")
+    if cols is None:
+        cols = [
+            c for c in old_df.columns.intersection(new_df.columns) if c not in ["team_name", "team_id"]
+        ]
+
+    common = old_df.index.intersection(new_df.index)
+    changes = []
+    for col in cols:
+        old_values = old_df.loc[common, col].astype(object)
+        new_values = new_df.loc[common, col].astype(object)
+        both_na = old_values.isna() & new_values.isna()
+        changed = ~both_na & (old_values != new_values)
+        if changed.any():
+            changes.append(
+                pd.DataFrame(
+                    {
+                        "column": col,
+                        "old": old_values[changed],
+                        "new": new_values[changed],
+                    }
+                )
+            )
+
+    changed_df = (
+        pd.concat(changes).rename_axis("id").reset_index()
+        if changes
+        else pd.DataFrame(columns=["id", "column", "old", "new"])
+    )
+    return {
+        "added": new_df.index.difference(old_df.index).tolist(),
+        "removed": old_df.index.difference(new_df.index).tolist(),
+        "changed": changed_df,
+    }
@@ -0,0 +1,423 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import argparse
+import collections
+import logging
+import os
+
+import coloredlogs
+import numpy as np
+import pandas as pd
+
+LOGGING_LEVEL = "INFO"
+LOGGING_FMT = "%(asctime)s %(levelname)s %(message)s"
+
+DUTIES = ["Scorer"]
+
+# columns of a volunteer pool (only name is required); lists are ";"-separated in CSV files
+POOL_COLS = ["name", "teams", "max_duties", "dates", "available_from", "available_to", "venues"]
+
+ROSTER_COLS = [
+    "start_date",
+    "start_time",
+    "end_time",
+    "venue",
+    "court",
+    "team_name",
+    "event_name",
+    "duty",
+    "volunteer",
+]
+
+###########################################################
+# DUTY ROSTER: GAME-DAY DUTIES (SCORERS) FOR VOLUNTEERS
+###########################################################
+
+
+def split_list(value) -> list:
+    """List from a ";"-separated string (or a list already); empty for None/NaN/"" """
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        return [str(x).strip() for x in value if str(x).strip() != ""]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [x.strip() for x in str(value).split(";") if x.strip() != ""]
+
+
+def to_minutes(times) -> np.ndarray:
+    """Minutes since midnight of times like "09:15" or "09:15:00" (or datetime.time)"""
+    parts = pd.Series(times, dtype=object).map(str).str.extract(r"^\s*(\d{1,2}):(\d{2})").astype(int)
+    return (parts[0] * 60 + parts[1]).to_numpy("int64")
+
+
+def team_pool(games_tapps_df: pd.DataFrame) -> pd.DataFrame:
+    """Pool with one volunteer per team of a TeamApp schedule (the team provides the volunteer)"""
+    teams = games_tapps_df.loc[games_tapps_df["venue"] != "BYE", "team_name"].drop_duplicates()
+    return pd.DataFrame({"name": teams.to_numpy(), "teams": teams.to_numpy()})
+
+
+def read_pool(file) -> pd.DataFrame:
+    """Volunteer pool from a CSV file with columns POOL_COLS (only name is required)"""
+    return pd.read_csv(file, dtype=str, keep_default_na=False)
+
+
+def roster_file(schedule_file):
+    """File for the roster of a TeamApp schedule CSV, e.g., schedule-teamsapp-x-duties.csv"""
+    return f"{os.path.splitext(schedule_file)[0]}-duties.csv"
+
+
+def write_roster_csv(roster_df: pd.DataFrame, schedule_file):
+    """Save a roster next to the TeamApp schedule CSV it was built from (see roster_file)
+
+    Returns:
+        str: the file saved
+    """
+    file = roster_file(schedule_file)
+    roster_df.to_csv(file, index=False)
+    return file
+
+
+def match_duties(candidates, blocks, capacity, start, end):
+    """Assign duties to volunteers, heuristically: as many as it can, with a balanced load
+
+    A volunteer takes at most one duty per block (duties starting at the same time), no
+    two duties that overlap, and at most its capacity. Without the overlaps across blocks
+    this is a min-cost flow where the k-th duty of any volunteer costs k, so it is solved
+    greedily: in rounds, every volunteer with k duties so far tries to take one more
+    through an augmenting path (BFS), which may move duties between volunteers. Volunteers
+    that cannot take one more are done for good, so no volunteer gets a k+1-th duty while
+    another one could still take its k-th.
+
+    When duties of different blocks never overlap (e.g., all games start on a common time
+    grid and last no longer than a slot), this assigns as many duties as possible. With
+    staggered starts (e.g., games at 9:00 and 9:30 that last 45 minutes) it is only a
+    heuristic: moves onto a duty overlapping another one the volunteer keeps (counting the
+    duties it takes and leaves earlier in the same path) are not taken, so the result never
+    has overlaps but may leave unassigned some duties an optimal assignment would cover.
+
+    Args:
+        candidates (list): per volunteer, the duties (indexes) it can take, preferred first
+        blocks (list): block of each duty
+        capacity (list): max number of duties of each volunteer
+        start (list): start of each duty (minutes)
+        end (list): end of each duty (minutes), plus any turnaround needed after it
+
+    Returns:
+        list: volunteer (index) of each duty, -1 for duties left unassigned
+    """
+    owner = [-1] * len(blocks)
+    busy = [{} for _ in candidates]  # volunteer -> {block: duty}
+    by_block = []
+    for duties in candidates:
+        groups = collections.defaultdict(list)
+        for d in duties:
+            groups[blocks[d]].append(d)
+        by_block.append(groups)
+
+    def fits(u, d, left, parent):
+        # no duty u keeps, after the moves earlier in the path and leaving "left", overlaps d
+        duties = set(busy[u].values())
+        c = left
+        while c != -1:  # back to the start of the path
+            w, c_left = parent[c]
+            if w == u:
+                duties.add(c)
+                duties.discard(c_left)
+            c = c_left
+        duties.discard(left)
+        return all(end[c] <= start[d] or end[d] <= start[c] for c in duties)
+
+    def augment(v, dead):
+        parent = {}  # duty -> (volunteer taking it, duty it leaves or -1)
+        seen = {("vol", v)}
+        queue = collections.deque([(v, None, -1)])
+        while queue:
+            u, block, left = queue.popleft()
+            if block is None:  # volunteer node: any duty in a block where it is free
+                moves = (d for d in candidates[u] if blocks[d] not in busy[u])
+            else:  # leaving duty "left": another duty of the same block
+                moves = (d for d in by_block[u][block] if d != left)
+            for d in moves:
+                if d in parent or not fits(u, d, left, parent):
+                    continue
+                parent[d] = (u, left)
+                w = owner[d]
+                if w == -1:
+                    return d, parent
+                node = ("vb", w, blocks[d])
+                if node not in seen and node not in dead:
+                    seen.add(node)
+                    queue.append((w, blocks[d], d))
+            if block is not None and ("vol", u) not in seen and ("vol", u) not in dead:
+                seen.add(("vol", u))
+                queue.append((u, None, left))
+        dead |= seen
+        return -1, parent
+
+    free = len(blocks)
+    active = [v for v in range(len(candidates)) if candidates[v] and capacity[v] > 0]
+    level = 0
+    while free and active:
+        dead = set()  # nodes with no augmenting path, until the matching changes
+        still = []
+        for v in active:
+            if ("vol", v) in dead:
+                continue
+            d, parent = augment(v, dead)
+            if d == -1:
+                continue
+            dead = set()
+            path = []
+            while d != -1:
+                u, left = parent[d]
+                path.append((u, d, left))
+                d = left
+            for u, d, left in path:
+                if left != -1 and busy[u].get(blocks[left]) == left:
+                    del busy[u][blocks[left]]
+            for u, d, left in path:
+                owner[d] = u
+                busy[u][blocks[d]] = d
+            free -= 1
+            if len(busy[v]) < capacity[v]:
+                still.append(v)
+            if not free:
+                break
+        active = still
+        level += 1
+    logging.debug(f"Duties matched in {level} rounds, {free} left unassigned")
+    return owner
+
+
+class DutyRoster:
+    """Roster of game-day duties (e.g., scorers) of the games of a TeamApp schedule
+
+    The schedule is as returned by PlayHQ.to_teamsapp_schedule (or read back from its
+    CSV), with columns start_date, start_time, end_time, venue, court and team_name.
+    Each game with duty_roster set (so no BYE entries) needs one volunteer per duty.
+
+    Volunteers come in a pool frame with columns POOL_COLS: the teams they belong to,
+    how many duties they take at most, and when and where they are available (dates,
+    times of day and venues; empty means any). With own_teams, volunteers take duties
+    in the games of their teams (e.g., parents scoring for their kid's team); otherwise
+    they take duties in other games and are busy while their teams play (e.g., a team
+    scoring the game before theirs, see team_pool).
+
+    A volunteer never takes two duties that overlap, counting turnaround minutes after
+    each duty (e.g., to get to another venue). The assignment (see match_duties) is a
+    heuristic with a balanced load, e.g., an association round of ~800 duties in well under
+    a second. It covers as many duties as possible when games start on a common time grid;
+    with staggered starts (e.g., 9:00 and 9:30 with 45-minute games) it may leave some
+    duties unassigned that another assignment would cover.
+
+    Args:
+        games_tapps_df (pd.DataFrame): the TeamApp schedule
+        pool_df (pd.DataFrame): the volunteers
+        duties (list, optional): duties of each game
+        own_teams (bool, optional): volunteers take duties in their teams' games only
+        same_venue (bool, optional): volunteers take duties only where and when their teams play
+        turnaround (int, optional): minutes needed between two duties (or a duty and a game)
+    """
+
+    def __init__(
+        self,
+        games_tapps_df: pd.DataFrame,
+        pool_df: pd.DataFrame,
+        duties=DUTIES,
+        own_teams=True,
+        same_venue=False,
+        turnaround=0,
+    ) -> None:
+        games_df = games_tapps_df.reset_index(drop=True)
+        if "duty_roster" in games_df:
+            games_df = games_df.loc[pd.to_numeric(games_df["duty_roster"], errors="coerce") == 1]
+        games_df = games_df.loc[games_df["venue"] != "BYE"].reset_index(drop=True)
+        if "court" not in games_df:
+            games_df["court"] = ""
+
+        duties_df = games_df.loc[games_df.index.repeat(len(duties))].reset_index(drop=True)
+        duties_df["duty"] = list(duties) * len(games_df)
+        self.duties_df = duties_df
+        self.pool_df = pool_df.reset_index(drop=True)
+
+        days = pd.to_datetime(duties_df["start_date"].astype(str)).to_numpy("datetime64[D]")
+        self.days = days
+        self.time_of_day = to_minutes(duties_df["start_time"])
+        self.start = days.astype("int64") * 1440 + self.time_of_day
+        self.end = days.astype("int64") * 1440 + to_minutes(duties_df["end_time"])
+        self.turnaround = turnaround
+        self.blocks = pd.factorize(self.start)[0]
+        self.venues = duties_df["venue"].astype(str).to_numpy()
+        self.venue_days = pd.factorize(pd.Series(days.astype(str)) + "@" + self.venues)[0]
+        self.team_duties = duties_df.groupby("team_name").indices
+
+        self.candidates = [
+            self.volunteer_duties(volunteer, own_teams, same_venue)
+            for volunteer in self.pool_df.to_dict("records")
+        ]
+        max_duties = pd.to_numeric(
+            self.pool_df.get("max_duties", pd.Series(np.nan, index=self.pool_df.index)), errors="coerce"
+        )
+        self.capacity = max_duties.fillna(len(duties_df)).astype(int).tolist()
+        self.roster_df = None
+
+    def volunteer_duties(self, volunteer, own_teams, same_venue) -> list:
+        """Duties a volunteer can take, those at the venue and time of its teams' games first"""
+        start, end, turnaround = self.start, self.end, self.turnaround
+        ok = np.ones(len(start), dtype=bool)
+
+        dates = split_list(volunteer.get("dates"))
+        if dates:
+            ok &= np.isin(self.days, pd.to_datetime(dates).to_numpy("datetime64[D]"))
+        venues = split_list(volunteer.get("venues"))
+        if venues:
+            ok &= np.isin(self.venues, venues)
+        if split_list(volunteer.get("available_from")):
+            ok &= self.time_of_day >= to_minutes([volunteer["available_from"]])[0]
+        if split_list(volunteer.get("available_to")):
+            ok &= self.time_of_day + (end - start) <= to_minutes([volunteer["available_to"]])[0]
+
+        teams = split_list(volunteer.get("teams"))
+        own = np.zeros(len(start), dtype=bool)
+        for team in teams:
+            own[self.team_duties.get(team, [])] = True
+        if teams and own_teams:
+            ok &= own
+        elif teams:
+            for s, e in set(zip(start[own].tolist(), end[own].tolist())):  # busy while their teams play
+                ok &= (start >= e + turnaround) | (end + turnaround <= s)
+            if same_venue:
+                ok &= np.isin(self.venue_days, self.venue_days[own])
+
+        duties = np.flatnonzero(ok)
+        if teams and not own_teams and own.any():
+            # prefer duties at the venue of a team game that day, and the closest in time
+            own_games = np.flatnonzero(own)
+            gap = np.abs(start[duties][:, None] - start[own_games][None, :])
+            gap += np.where(self.venues[duties][:, None] == self.venues[own_games][None, :], 0, 10**7)
+            duties = duties[np.argsort(gap.min(axis=1), kind="stable")]
+        return duties.tolist()
+
+    def assign(self) -> pd.DataFrame:
+        """Assign the duties to the volunteers
+
+        Returns:
+            pd.DataFrame: one row per duty (columns ROSTER_COLS), with the volunteer
+                assigned ("" if nobody could take it)
+        """
+        owner = match_duties(
+            self.candidates,
+            self.blocks.tolist(),
+            self.capacity,
+            self.start.tolist(),
+            (self.end + self.turnaround).tolist(),
+        )
+        owner = np.array(owner)
+
+        # match_duties never assigns overlapping duties; should it ever do, drop the clashes
+        order = np.lexsort((self.start, owner))
+        ends = self.end[order] + self.turnaround
+        clash = (owner[order][1:] == owner[order][:-1]) & (owner[order][1:] != -1)
+        clash &= self.start[order][1:] < ends[:-1]
+        if clash.any():
+            logging.warning(f"{clash.sum()} duties overlapping another one of their volunteer left unassigned")
+            owner[order[1:][clash]] = -1
+
+        names = self.pool_df["name"].astype(str).tolist()
+
+        roster_df = self.duties_df.assign(volunteer=[names[v] if v != -1 else "" for v in owner])
+        self.roster_df = roster_df[ROSTER_COLS]
+        missing = (self.roster_df["volunteer"] == "").sum()
+        if missing:
+            logging.warning(f"{missing} of {len(roster_df)} duties could not be assigned")
+        return self.roster_df
+
+    def load(self) -> pd.DataFrame:
+        """Number of duties assigned to each volunteer of the pool (after assign)"""
+        counts = self.roster_df.loc[self.roster_df["volunteer"] != "", "volunteer"].value_counts()
+        return pd.DataFrame(
+            {
+                "name": self.pool_df["name"],
+                "duties": self.pool_df["name"].astype(str).map(counts).fillna(0).astype(int),
+            }
+        ).sort_values(["duties", "name"], ascending=[False, True], ignore_index=True)
+
+    def unassigned(self) -> pd.DataFrame:
+        """Duties nobody could take (after assign)"""
+        return self.roster_df.loc[self.roster_df["volunteer"] == ""].reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="""
+        Roster the game-day duties (e.g., scorers) of a TeamApp schedule CSV among a pool of
+        volunteers (or the teams themselves), and save it next to the schedule as *-duties.csv.
+
+        E.g.,:
+
+        $ python roster.py schedule-teamsapp-2023_07_22.csv volunteers.csv
+        $ python roster.py schedule-teamsapp-2023_07_22.csv --turnaround 10 --same-venue
+        """
+    )
+    parser.add_argument(
+        dest="SCHEDULE",
+        type=str,
+        help="TeamApp schedule CSV file, as saved by the scrape notebook.",
+    )
+    parser.add_argument(
+        dest="POOL",
+        type=str,
+        nargs="?",
+        help="CSV file of volunteers with columns name, teams, max_duties, dates, available_from, "
+        "available_to, venues (default: each team does duties in other teams' games).",
+    )
+    parser.add_argument(
+        "--duties",
+        nargs="+",
+        default=DUTIES,
+        help="Duties of each game (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--other-teams",
+        action="store_true",
+        default=False,
+        help="Volunteers do duties in other teams' games, not their teams' ones (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--same-venue",
+        action="store_true",
+        default=False,
+        help="Only duties where and when the volunteer's teams play, with --other-teams (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--turnaround",
+        type=int,
+        default=0,
+        help="Minutes needed between two duties or a duty and a game (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        default=False,
+        help="Show debugging info (default: %(default)s).",
+    )
+    args = parser.parse_args()
+
+    coloredlogs.install(level="DEBUG" if args.debug else LOGGING_LEVEL, fmt=LOGGING_FMT)
+
+    games_tapps_df = pd.read_csv(args.SCHEDULE, dtype=str, keep_default_na=False)
+    pool_df = read_pool(args.POOL) if args.POOL else team_pool(games_tapps_df)
+    duty_roster = DutyRoster(
+        games_tapps_df,
+        pool_df,
+        duties=args.duties,
+        own_teams=args.POOL is not None and not args.other_teams,
+        same_venue=args.same_venue,
+        turnaround=args.turnaround,
+    )
+    roster_df = duty_roster.assign()
+    logging.info(f"Duties per volunteer:\n{duty_roster.load().to_string(index=False)}")
+    logging.info(f"Roster saved in {write_roster_csv(roster_df, args.SCHEDULE)}")
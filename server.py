@@ -0,0 +1,411 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import argparse
+import datetime
+import glob
+import gzip
+import hashlib
+import http.server
+import json
+import logging
+import os
+import re
+import threading
+import time
+import urllib.parse
+
+import coloredlogs
+import numpy as np
+import pandas as pd
+
+LOGGING_LEVEL = "INFO"
+LOGGING_FMT = "%(asctime)s %(levelname)s %(message)s"
+
+TIMEZONE = "Australia/Melbourne"
+
+# columns of the served fixtures (as per PlayHQ.to_teamsapp_schedule)
+FIXTURE_COLS = [
+    "event_name",
+    "team_name",
+    "opponent",
+    "start_date",
+    "start_time",
+    "end_date",
+    "end_time",
+    "venue",
+    "court",
+    "location",
+    "description",
+]
+
+CONTENT_TYPES = {
+    "json": "application/json; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "ics": "text/calendar; charset=utf-8",
+}
+ICS_UTC_FMT = "%Y%m%dT%H%M%SZ"
+MAX_AGE = 60  # seconds clients may reuse a response before checking its ETag again
+
+###########################################################
+# PRECOMPUTED FIXTURE RESPONSES
+###########################################################
+
+
+def slug(name):
+    """URL-friendly version of a team or venue name, e.g., "U12 Boys Gold" -> "u12-boys-gold" """
+    return re.sub(r"[^a-z0-9]+", "-", str(name).lower()).strip("-")
+
+
+def unique_slugs(names) -> dict:
+    """Slug of each name, made unique with a short hash of the name when slugs collide
+
+    E.g., "U12 Boys-Gold" and "U12 Boys Gold" -> "u12-boys-gold-<hash>" each. Blank names are left out.
+    """
+    by_slug = {}
+    for name in names:
+        if str(name).strip():
+            by_slug.setdefault(slug(name), []).append(name)
+
+    slugs = {}
+    for name_slug, same in by_slug.items():
+        for name in same:
+            if len(same) > 1 or not name_slug:
+                suffix = hashlib.sha1(str(name).encode("utf-8")).hexdigest()[:6]
+                slugs[name] = f"{name_slug}-{suffix}" if name_slug else suffix
+            else:
+                slugs[name] = name_slug
+    return slugs
+
+
+def ics_text(text):
+    """Escape text for an iCalendar property value"""
+    return (
+        str(text)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def ics_fold(line):
+    """Fold an iCalendar content line into lines of at most 75 octets"""
+    data = line.encode("utf-8")
+    parts = []
+    while len(data) > 75:
+        cut = 75 if not parts else 74  # continuation lines start with a space
+        while cut > 0 and (data[cut] & 0xC0) == 0x80:  # do not split a UTF-8 character
+            cut -= 1
+        parts.append(data[:cut])
+        data = data[cut:]
+    parts.append(data)
+    return b"\r\n ".join(parts).decode("utf-8")
+
+
+class Response:
+    """A precomputed response: the body, its gzip version and their strong ETags"""
+
+    __slots__ = ["body", "gzip_body", "etag", "gzip_etag", "content_type"]
+
+    def __init__(self, body: bytes, content_type) -> None:
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.body = body
+        self.gzip_body = gzip.compress(body, mtime=0)
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+        self.content_type = content_type
+
+
+class FixtureSite:
+    """Responses for the fixture of each team and each venue, as JSON, CSV and iCalendar
+
+    All responses are built when the schedule is updated, so serving them is a dictionary
+    lookup. On each update only the teams and venues whose games changed are built again;
+    the others keep their responses (and ETags, so clients keep their cached copies).
+
+    Paths are /index.json, /teams/<team>.<json|csv|ics> and /venues/<venue>.<json|csv|ics>,
+    with the slug of the name (see unique_slugs()); index.json maps each name to its path.
+
+    Args:
+        timezone (str, optional): timezone of the game dates and times (for the calendars)
+    """
+
+    def __init__(self, timezone=TIMEZONE) -> None:
+        self.timezone = timezone
+        self.responses = {}  # path -> Response
+        self.digests = {}  # (kind, name) -> digest of its games
+        self.updated = None
+        self.lock = threading.Lock()
+
+    def get(self, path):
+        return self.responses.get(path)
+
+    def update(self, games_tapps_df: pd.DataFrame) -> list:
+        """Refresh the responses from a TeamApp schedule (as per PlayHQ.to_teamsapp_schedule)
+
+        Args:
+            games_tapps_df (pd.DataFrame): the schedule of the club games
+
+        Returns:
+            list: the teams and venues, as (kind, name), whose responses were rebuilt or removed
+        """
+        games_df = games_tapps_df.reindex(columns=FIXTURE_COLS).fillna("").astype(str)
+        games_df = games_df.sort_values(["start_date", "start_time", "team_name"])
+
+        with self.lock:
+            responses, digests, changed = {}, {}, []
+            index = {"teams": {}, "venues": {}}
+            for kind, col in [("teams", "team_name"), ("venues", "venue")]:
+                slugs = unique_slugs(games_df[col].unique())
+                for name, group_df in games_df.groupby(col, sort=True):
+                    if name not in slugs:  # e.g., games without a venue yet
+                        continue
+                    base = f"/{kind}/{slugs[name]}"
+                    csv = group_df.to_csv(index=False, lineterminator="\r\n").encode("utf-8")
+                    digest = hashlib.sha256(base.encode("utf-8") + csv).hexdigest()  # path may change too
+                    index[kind][name] = base
+                    digests[(kind, name)] = digest
+
+                    if self.digests.get((kind, name)) == digest:  # same games: keep responses
+                        for ext in CONTENT_TYPES:
+                            responses[f"{base}.{ext}"] = self.responses[f"{base}.{ext}"]
+                        continue
+
+                    changed.append((kind, name))
+                    responses[f"{base}.csv"] = Response(csv, CONTENT_TYPES["csv"])
+                    responses[f"{base}.json"] = Response(
+                        group_df.to_json(orient="records", indent=1).encode("utf-8"),
+                        CONTENT_TYPES["json"],
+                    )
+                    responses[f"{base}.ics"] = Response(
+                        self.to_ics(group_df, name), CONTENT_TYPES["ics"]
+                    )
+
+            changed += [key for key in self.digests if key not in digests]  # gone
+            responses["/index.json"] = Response(
+                json.dumps(index, indent=1, sort_keys=True).encode("utf-8"), CONTENT_TYPES["json"]
+            )
+
+            # swap all at once, so requests see either the old or the new schedule
+            self.responses, self.digests = responses, digests
+            self.updated = datetime.datetime.now(datetime.timezone.utc)
+
+        logging.info(
+            f"Fixtures updated: {len(digests)} teams and venues, {len(changed)} changed"
+        )
+        return changed
+
+    def utc_times(self, dates: pd.Series, times: pd.Series) -> pd.Series:
+        """UTC timestamps of local dates and times in self.timezone (NaT when missing or invalid)"""
+        local = pd.to_datetime(dates + " " + times, format="ISO8601", errors="coerce")
+        local = local.dt.tz_localize(
+            self.timezone,
+            ambiguous=np.zeros(len(local), dtype=bool),  # repeated hour when DST ends: standard time
+            nonexistent="shift_forward",
+        )
+        return local.dt.tz_convert("UTC")
+
+    def to_ics(self, games_df: pd.DataFrame, name) -> bytes:
+        """iCalendar with one event per game, with UTC times (so no VTIMEZONE is needed)"""
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime(ICS_UTC_FMT)
+        starts = self.utc_times(games_df["start_date"], games_df["start_time"])
+        ends = self.utc_times(games_df["end_date"], games_df["end_time"])
+        lines = [
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//playhq-teamapp//fixture//EN",
+            f"X-WR-CALNAME:{ics_text(name)}",
+            f"X-WR-TIMEZONE:{self.timezone}",
+        ]
+        for game, start, end in zip(games_df.itertuples(index=False), starts, ends):
+            if pd.isna(start) or pd.isna(end):
+                logging.warning(f"Game {game.event_name} of {name} has no valid time; left out of its calendar")
+                continue
+            uid = hashlib.sha1(f"{game.team_name}|{game.start_date}|{game.event_name}".encode()).hexdigest()
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{uid}@playhq-teamapp",
+                f"DTSTAMP:{stamp}",
+                f"DTSTART:{start.strftime(ICS_UTC_FMT)}",
+                f"DTEND:{end.strftime(ICS_UTC_FMT)}",
+                f"SUMMARY:{ics_text(game.event_name)}",
+                f"LOCATION:{ics_text(f'{game.venue} {game.court}, {game.location}')}",
+                f"DESCRIPTION:{ics_text(game.description.strip())}",
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        return ("\r\n".join(ics_fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+###########################################################
+# HTTP SERVICE
+###########################################################
+
+
+def accepts_gzip(accept_encoding) -> bool:
+    """Whether an Accept-Encoding header allows gzip, e.g., not for "gzip;q=0" or "*;q=0"
+
+    The explicit gzip (or x-gzip) entry wins over "*"; no entry for either means no gzip.
+    """
+    qvalues = {}
+    for entry in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.lower()] = q
+
+    for coding in ["gzip", "x-gzip", "*"]:
+        if coding in qvalues:
+            return qvalues[coding] > 0
+    return False
+
+
+class FixtureHandler(http.server.BaseHTTPRequestHandler):
+    """Serve the responses of the FixtureSite in self.server.site (never calls PlayHQ)"""
+
+    protocol_version = "HTTP/1.1"  # keep connections alive between requests
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        path = urllib.parse.urlsplit(self.path).path.rstrip("/") or "/index.json"
+        response = self.server.site.get(path)
+        if response is None:
+            self.send_error(404, "No such team or venue")
+            return
+
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        etag = response.gzip_etag if use_gzip else response.etag
+        body = response.gzip_body if use_gzip else response.body
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        not_modified = if_none_match.strip() == "*" or any(
+            tag.strip().removeprefix("W/") in (response.etag, response.gzip_etag)
+            for tag in if_none_match.split(",")
+        )
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", f"public, max-age={MAX_AGE}")
+        self.send_header("Vary", "Accept-Encoding")
+        if not_modified:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Content-Type", response.content_type)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+def serve(site: FixtureSite, host="127.0.0.1", port=8080):
+    """Start serving site in a background thread and return the server (call shutdown() to stop)"""
+    server = http.server.ThreadingHTTPServer((host, port), FixtureHandler)
+    server.daemon_threads = True
+    server.site = site
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    logging.info(f"Serving fixtures at http://{host}:{server.server_address[1]}/index.json")
+    return server
+
+
+def latest_schedule(path):
+    """The schedule file to serve: path itself, or the newest TeamApp schedule saved in folder path"""
+    if not os.path.isdir(path):
+        return path
+    files = glob.glob(os.path.join(path, "games_tapps_df-*.pkl")) + glob.glob(
+        os.path.join(path, "schedule-teamsapp-*.csv")
+    )
+    if not files:
+        raise FileNotFoundError(f"No TeamApp schedule (games_tapps_df-*.pkl or schedule-teamsapp-*.csv) in {path}")
+    return max(files, key=os.path.getmtime)
+
+
+def read_schedule(file_name) -> pd.DataFrame:
+    """Read a TeamApp schedule saved by the scrape notebook (pickle or CSV)"""
+    if file_name.endswith(".pkl"):
+        return pd.read_pickle(file_name)
+    return pd.read_csv(file_name, dtype=str, keep_default_na=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="""
+        Serve the fixture of each team and venue (JSON, CSV and iCalendar) from the latest
+        TeamApp schedule saved by the scrape notebook, e.g., for the club website.
+
+        E.g.,:
+
+        $ python server.py Brunswick_Magics/2022.02.Summer_22/fixture --port 8080 --watch 60
+        """
+    )
+    parser.add_argument(
+        dest="SCHEDULE",
+        type=str,
+        help="TeamApp schedule file (games_tapps_df-*.pkl or schedule-teamsapp-*.csv) or folder with them (newest is used).",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host to bind (default: %(default)s).")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen (default: %(default)s).")
+    parser.add_argument(
+        "--timezone",
+        default=TIMEZONE,
+        help="Timezone of the games, for the calendars (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--watch",
+        type=int,
+        default=0,
+        help="Seconds between checks for a newer schedule (default: %(default)s, no checks).",
+    )
+    parser.add_argument(
+        "--debug",
+        action="store_true",
+        default=False,
+        help="Show debugging info, e.g., each request (default: %(default)s).",
+    )
+    args = parser.parse_args()
+
+    coloredlogs.install(level="DEBUG" if args.debug else LOGGING_LEVEL, fmt=LOGGING_FMT)
+
+    site = FixtureSite(args.timezone)
+    file_name = latest_schedule(args.SCHEDULE)
+    mtime = os.path.getmtime(file_name)
+    logging.info(f"Loading schedule {file_name}")
+    site.update(read_schedule(file_name))
+    server = serve(site, args.host, args.port)
+
+    try:
+        while True:
+            time.sleep(args.watch or 3600)
+            if not args.watch:
+                continue
+            newest = latest_schedule(args.SCHEDULE)
+            if newest != file_name or os.path.getmtime(newest) != mtime:
+                file_name, mtime = newest, os.path.getmtime(newest)
+                logging.info(f"Loading schedule {file_name}")
+                try:
+                    site.update(read_schedule(file_name))
+                except Exception as e:
+                    logging.error(f"Could not load {file_name} (still serving the previous one): {e}")
+    except KeyboardInterrupt:
+        server.shutdown()
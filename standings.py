@@ -0,0 +1,243 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import numpy as np
+import pandas as pd
+
+# game status that carry a result to count in the ladder
+RESULT_STATUSES = ["COMPLETED", "FINAL"]
+
+# ladder points per game outcome
+POINTS = {"WIN": 2, "DRAW": 1, "LOSS": 0}
+
+STAT_COLS = [
+    "played",
+    "won",
+    "drawn",
+    "lost",
+    "points_for",
+    "points_against",
+    "points",
+]
+LADDER_COLS = ["grade_id", "grade_name", "team_id", "team_name"] + STAT_COLS + ["percentage"]
+
+###########################################################
+# LADDER & STANDINGS
+###########################################################
+
+
+def outcome_of(score, score_against):
+    if pd.isna(score) or pd.isna(score_against):
+        return None
+    if score > score_against:
+        return "WIN"
+    if score < score_against:
+        return "LOSS"
+    return "DRAW"
+
+
+def known_competitors(competitors) -> list:
+    """Competitors of a game with a team already (e.g., not "Winner Game 6" in finals)
+
+    Args:
+        competitors: competitors of the game, a list of dicts (or NaN/None if there are none yet)
+    """
+    if not isinstance(competitors, (list, tuple, np.ndarray)):
+        return []
+    return [c for c in competitors if isinstance(c, dict) and not pd.isna(c.get("id"))]
+
+
+class Standings:
+    """Per-grade ladders (win/loss/points tables) kept up to date game by game.
+
+    The initial tables are built from a games frame (as per PlayHQ.get_team_fixture or
+    PlayHQ.get_games) with one vectorized aggregation over all competitors. After that,
+    each new or corrected game result is applied with update(): the previous
+    contribution of that game (if any) is taken off and the new one added, touching
+    only the two teams involved. Games repeated in the frame (e.g., once per team
+    fixture) are counted once.
+
+    The outcome of each competitor is taken from its `outcome` field when available,
+    or otherwise worked out from the `scoreTotal` of both competitors. Competitors still
+    pending (with no team yet) are left out, as are games with no competitors at all.
+
+    Args:
+        points (dict, optional): ladder points per outcome (WIN, DRAW, LOSS)
+        statuses (list, optional): game status that carry a result
+    """
+
+    def __init__(self, points=POINTS, statuses=RESULT_STATUSES) -> None:
+        self.points = points
+        self.statuses = set(statuses)
+        self.grades = {}  # grade id -> grade name
+        self.teams = {}  # (grade id, team id) -> team name
+        self.stats = {}  # (grade id, team id) -> np.array with STAT_COLS
+        self.games = {}  # game id -> list of ((grade id, team id), np.array) contributions
+
+    def build(self, games_df: pd.DataFrame):
+        """(Re)build all the ladders from a games frame in one vectorized pass
+
+        Args:
+            games_df (pd.DataFrame): games with columns id, status, grade_id, grade_name and competitors
+
+        Returns:
+            Standings: self, so it can be chained
+        """
+        self.grades, self.teams, self.stats, self.games = {}, {}, {}, {}
+        if games_df is None or games_df.empty:
+            return self
+
+        games_df = games_df.drop_duplicates("id")
+        rows = games_df[["id", "status", "grade_id", "grade_name", "competitors"]]
+        rows = rows.assign(competitors=rows["competitors"].map(known_competitors)).explode(
+            "competitors"
+        )
+        rows = rows[rows["competitors"].notna()].reset_index(drop=True)
+        if rows.empty:
+            return self
+        competitors_df = pd.json_normalize(rows["competitors"].tolist())
+
+        df = pd.DataFrame(
+            {
+                "game_id": rows["id"],
+                "grade_id": rows["grade_id"],
+                "grade_name": rows["grade_name"],
+                "team_id": competitors_df["id"],
+                "team_name": competitors_df["name"],
+            }
+        )
+        if "scoreTotal" in competitors_df:
+            df["score"] = pd.to_numeric(competitors_df["scoreTotal"], errors="coerce")
+        else:
+            df["score"] = np.nan
+        no_competitors = df.groupby("game_id")["team_id"].transform("size")
+        df["score_against"] = (
+            df.groupby("game_id")["score"].transform("sum", min_count=1) - df["score"]
+        ).where(no_competitors == 2)
+
+        # outcome given by PlayHQ, otherwise from the scores
+        outcome = pd.Series(
+            np.select(
+                [df["score"] > df["score_against"], df["score"] < df["score_against"],
+                 df["score"] == df["score_against"]],
+                ["WIN", "LOSS", "DRAW"],
+                default="",
+            ),
+            index=df.index,
+        )
+        if "outcome" in competitors_df:
+            given = competitors_df["outcome"].fillna("").astype(str).str.upper()
+            outcome = given.where(given.isin(self.points.keys()), outcome)
+
+        is_result = rows["status"].isin(self.statuses) & outcome.isin(self.points.keys())
+        df["played"] = is_result.astype(int)
+        df["won"] = (is_result & (outcome == "WIN")).astype(int)
+        df["drawn"] = (is_result & (outcome == "DRAW")).astype(int)
+        df["lost"] = (is_result & (outcome == "LOSS")).astype(int)
+        df["points_for"] = df["score"].where(is_result, 0).fillna(0)
+        df["points_against"] = df["score_against"].where(is_result, 0).fillna(0)
+        df["points"] = outcome.map(self.points).where(is_result, 0).fillna(0)
+
+        totals_df = df.groupby(["grade_id", "team_id"])[STAT_COLS].sum()
+        self.stats = {
+            key: np.array(values, dtype=float)
+            for key, values in zip(totals_df.index, totals_df.to_numpy())
+        }
+        self.grades = dict(zip(df["grade_id"], df["grade_name"]))
+        self.teams = dict(zip(zip(df["grade_id"], df["team_id"]), df["team_name"]))
+
+        # remember the contribution of each game so it can be replaced later
+        keys = list(zip(df["grade_id"], df["team_id"]))
+        values = df[STAT_COLS].to_numpy(dtype=float)
+        for game_id, key, value in zip(df["game_id"], keys, values):
+            self.games.setdefault(game_id, []).append((key, value))
+
+        return self
+
+    def contributions(self, game) -> list:
+        """The ladder contribution of one game: a list of ((grade id, team id), stats)"""
+        competitors = known_competitors(game["competitors"])
+        scores = [pd.to_numeric(c.get("scoreTotal"), errors="coerce") for c in competitors]
+
+        result = []
+        for k, competitor in enumerate(competitors):
+            score_against = scores[1 - k] if len(competitors) == 2 else np.nan
+            outcome = str(competitor.get("outcome") or "").upper()
+            if outcome not in self.points:
+                outcome = outcome_of(scores[k], score_against)
+
+            value = np.zeros(len(STAT_COLS))
+            if game["status"] in self.statuses and outcome in self.points:
+                value[:] = [
+                    1,
+                    outcome == "WIN",
+                    outcome == "DRAW",
+                    outcome == "LOSS",
+                    0 if pd.isna(scores[k]) else scores[k],
+                    0 if pd.isna(score_against) else score_against,
+                    self.points[outcome],
+                ]
+            key = (game["grade_id"], competitor["id"])
+            self.teams[key] = competitor["name"]
+            result.append((key, value))
+        return result
+
+    def update(self, game) -> set:
+        """Apply a new or updated game (a dict or a row of a games frame)
+
+        Returns:
+            set: ids of the grades whose ladder changed
+        """
+        self.grades[game["grade_id"]] = game["grade_name"]
+        new = self.contributions(game)
+        old = self.games.get(game["id"], [])
+
+        for key, value in old:
+            self.stats[key] = self.stats[key] - value
+        for key, value in new:
+            self.stats[key] = self.stats.get(key, 0) + value
+        self.games[game["id"]] = new
+
+        changed = len(old) != len(new) or any(
+            key_old != key_new or np.any(value_old != value_new)
+            for (key_old, value_old), (key_new, value_new) in zip(old, new)
+        )
+        return {key[0] for key, _ in old + new} if changed else set()
+
+    def update_games(self, games_df: pd.DataFrame) -> set:
+        """Apply all the games in a frame (e.g., the games of the last round)"""
+        changed = set()
+        for game in games_df.drop_duplicates("id", keep="last").to_dict("records"):
+            changed |= self.update(game)
+        return changed
+
+    def ladder(self, grade_id) -> pd.DataFrame:
+        """The ladder of one grade, sorted by points and then percentage"""
+        keys = [key for key in self.stats if key[0] == grade_id]
+        return self._ladder_df(keys)
+
+    def table(self) -> pd.DataFrame:
+        """All the ladders, sorted by grade and position"""
+        return self._ladder_df(list(self.stats.keys()))
+
+    def _ladder_df(self, keys) -> pd.DataFrame:
+        ladder_df = pd.DataFrame(
+            [self.stats[key] for key in keys], columns=STAT_COLS
+        ).astype({c: int for c in ["played", "won", "drawn", "lost"]})
+        ladder_df.insert(0, "grade_id", [key[0] for key in keys])
+        ladder_df.insert(1, "grade_name", [self.grades.get(key[0]) for key in keys])
+        ladder_df.insert(2, "team_id", [key[1] for key in keys])
+        ladder_df.insert(3, "team_name", [self.teams.get(key) for key in keys])
+        ladder_df["percentage"] = (
+            100 * ladder_df["points_for"] / ladder_df["points_against"].replace(0, np.nan)
+        ).round(2)
+
+        ladder_df = ladder_df.sort_values(
+            ["grade_name", "points", "percentage"], ascending=[True, False, False]
+        )
+        ladder_df["position"] = ladder_df.groupby("grade_id").cumcount() + 1
+        ladder_df.reset_index(drop=True, inplace=True)
+        return ladder_df[LADDER_COLS + ["position"]]
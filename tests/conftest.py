@@ -0,0 +1,42 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import os
+import sys
+
+import pytest
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [ROOT_PATH, os.path.join(ROOT_PATH, "cba2csv"), os.path.join(ROOT_PATH, "benchmarks")]
+
+from synthetic import SyntheticCompetition  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def competition():
+    """A small synthetic competition: 4 clubs of 6 teams playing 4 rounds"""
+    return SyntheticCompetition(clubs=4, teams_per_club=6, rounds=4, page_size=10)
+
+
+@pytest.fixture(scope="session")
+def teams_df(competition):
+    """All the teams of the competition, with their grade"""
+    import pandas as pd
+
+    return pd.DataFrame(
+        [{"id": t["id"], "name": t["name"], "grade.id": t["grade"]["id"]} for t in competition.teams]
+    )
+
+
+@pytest.fixture(scope="session")
+def games_df(competition, teams_df):
+    """The games of the whole season, as returned by PlayHQ.get_games (one row per team)"""
+    import pandas as pd
+
+    from_date = pd.Timestamp(competition.start_date).tz_localize(competition.timezone)
+    to_date = from_date + pd.Timedelta(weeks=competition.rounds)
+    games_df, _ = competition.playhq().get_games(teams_df, from_date, to_date)
+    return games_df
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from synthetic import SyntheticCompetition
+
+
+@pytest.fixture(scope="module")
+def odd_competition():
+    """Grades of 3 teams, so one team of each grade has a BYE every round"""
+    return SyntheticCompetition(clubs=3, teams_per_club=4, rounds=3)
+
+
+@pytest.fixture(scope="module")
+def phq(odd_competition):
+    return odd_competition.playhq(tapp_team_name=lambda name: name)
+
+
+@pytest.fixture(scope="module")
+def season(odd_competition, phq):
+    # all teams, as rounds of a grade are only known from the games of that grade
+    teams_df = pd.DataFrame(
+        [{"id": t["id"], "name": t["name"], "grade.id": t["grade"]["id"]} for t in odd_competition.teams]
+    )
+    from_date = pd.Timestamp(odd_competition.start_date).tz_localize(odd_competition.timezone)
+    games_df, _ = phq.get_games(teams_df, from_date, from_date + pd.Timedelta(weeks=3))
+    return teams_df, games_df
+
+
+def naive_byes(teams_df, games_df, by):
+    """(team name, date) of every BYE, checking every team in every round"""
+    games_df = games_df.assign(game_day=games_df["schedule_timestamp"].dt.date)
+    key = {"round": "round_name", "round_id": "round_id", "day": "game_day"}[by]
+    byes = set()
+    for team in teams_df.to_dict("records"):
+        rounds_df = games_df if by != "round_id" else games_df.loc[games_df["grade_id"] == team["grade.id"]]
+        played = set(games_df.loc[games_df["team_id"] == team["id"], key])
+        for round_key, round_df in rounds_df.groupby(key):
+            if round_key not in played:
+                byes.add((team["name"], round_df["game_day"].min()))
+    return byes
+
+
+@pytest.mark.parametrize("by", ["round", "round_id", "day"])
+def test_byes_equal_naive(phq, season, by):
+    teams_df, games_df = season
+    bye_df = phq.build_teamsapp_bye_rounds(teams_df, games_df, by=by)
+    byes = set(zip(bye_df["team_name"], bye_df["start_date"]))
+    assert len(byes) == len(bye_df)
+    assert byes == naive_byes(teams_df, games_df, by)
+    assert (bye_df["venue"] == "BYE").all() and (bye_df["duty_roster"] == 0).all()
+
+
+def test_one_bye_per_grade_and_round(phq, season):
+    teams_df, games_df = season
+    bye_df = phq.build_teamsapp_bye_rounds(teams_df, games_df, by="round_id")
+    assert len(bye_df) == teams_df["grade.id"].nunique() * games_df["round_name"].nunique()
+
+
+def test_no_games_no_byes(phq, season):
+    teams_df, games_df = season
+    assert phq.build_teamsapp_bye_rounds(teams_df, games_df.iloc[:0]) is None
@@ -0,0 +1,235 @@
+import datetime
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import cache
+
+
+class Fetcher:
+    """Live fetch of a listing of the synthetic competition, recording the cursor of each call"""
+
+    def __init__(self, competition, key, fail_after=None):
+        self.competition = competition
+        self.key = key
+        self.fail_after = fail_after
+        self.cursors = []
+
+    def __call__(self, cursor):
+        self.cursors.append(cursor)
+        for no, page in enumerate(self.competition.pages(self.key, cursor)):
+            if self.fail_after is not None and no == self.fail_after:
+                raise ConnectionError("connection dropped")
+            yield page
+
+
+###########################################################
+# RESPONSE STORE
+###########################################################
+
+
+@pytest.fixture
+def teams_key(competition):
+    return f"seasons/{competition.season_id}/teams"
+
+
+def test_store_resumes_after_early_stop(tmp_path, competition, teams_key):
+    all_pages = list(competition.pages(teams_key))
+    assert len(all_pages) == 3
+    store = cache.ResponseStore(str(tmp_path))
+
+    fetch = Fetcher(competition, teams_key)
+    pages = store.iter_pages(teams_key, fetch)
+    assert next(pages) == all_pages[0]
+    pages.close()  # consumer stops after one page
+    assert len(store.get_pages(teams_key)) == 1
+
+    fetch = Fetcher(competition, teams_key)
+    assert list(store.iter_pages(teams_key, fetch)) == all_pages
+    assert fetch.cursors == ["c1"]
+    assert store.get_pages(teams_key) == all_pages
+
+    fetch = Fetcher(competition, teams_key)
+    assert list(store.iter_pages(teams_key, fetch)) == all_pages
+    assert fetch.cursors == []
+
+
+def test_store_resumes_after_failed_fetch(tmp_path, competition, teams_key):
+    all_pages = list(competition.pages(teams_key))
+    store = cache.ResponseStore(str(tmp_path))
+
+    with pytest.raises(ConnectionError):
+        list(store.iter_pages(teams_key, Fetcher(competition, teams_key, fail_after=2)))
+    assert store.get_pages(teams_key) == all_pages[:2]
+
+    fetch = Fetcher(competition, teams_key)
+    assert list(store.iter_pages(teams_key, fetch)) == all_pages
+    assert fetch.cursors == ["c2"]
+
+
+def test_store_fetches_old_pages_again(tmp_path, competition, teams_key):
+    store = cache.ResponseStore(str(tmp_path), max_age=datetime.timedelta(hours=1))
+    list(store.iter_pages(teams_key, Fetcher(competition, teams_key)))
+
+    file_name = store.page_file(teams_key)
+    with open(file_name) as f:
+        stored = json.load(f)
+    stored["fetched"] = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=2)).isoformat()
+    with open(file_name, "w") as f:
+        json.dump(stored, f)
+
+    fetch = Fetcher(competition, teams_key)
+    assert len(list(store.iter_pages(teams_key, fetch))) == 3
+    assert fetch.cursors == [None]
+
+
+###########################################################
+# SHORT-LIVED IN-MEMORY CACHE
+###########################################################
+
+
+def test_ttl_cache_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    ttl_cache = cache.TTLCache(ttl=datetime.timedelta(seconds=60))
+
+    ttl_cache.put("game", {"status": "UPCOMING"})
+    assert ttl_cache.get("game") == {"status": "UPCOMING"}
+    assert ttl_cache.get("other", "missing") == "missing"
+
+    now[0] += 59
+    assert ttl_cache.get("game") == {"status": "UPCOMING"}
+    now[0] += 2
+    assert ttl_cache.get("game") is None
+    assert len(ttl_cache) == 0
+
+    ttl_cache.put("game", {"status": "COMPLETED"})
+    assert ttl_cache.get("game") == {"status": "COMPLETED"}
+
+
+###########################################################
+# SINGLE-FLIGHT REQUEST COALESCING
+###########################################################
+
+
+class SlowCall:
+    """A call that blocks until released, counting how many times it ran"""
+
+    def __init__(self, result):
+        self.result = result
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+        self.started.set()
+        assert self.release.wait(5)
+        return self.result
+
+
+def run_in_threads(calls):
+    """Start each call in a thread; returns the threads and a dict thread number -> result"""
+    results = {}
+
+    def run(no, call):
+        results[no] = call()
+
+    threads = [threading.Thread(target=run, args=(no, call)) for no, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_single_flight_in_process():
+    flights = cache.SingleFlight()
+    slow_call = SlowCall({"data": [1, 2]})
+
+    threads, results = run_in_threads([lambda: flights.do("key", slow_call)] * 5)
+    assert slow_call.started.wait(5)
+    time.sleep(0.1)
+    slow_call.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert list(results.values()) == [{"data": [1, 2]}] * 5
+    assert (slow_call.runs, flights.calls, flights.shared) == (1, 1, 4)
+
+    # once done, the same call runs again
+    assert flights.do("key", lambda: "again") == "again"
+    assert flights.calls == 2
+
+
+def test_single_flight_across_processes(tmp_path):
+    # each SingleFlight opens its own lock files, so they coalesce as separate processes would
+    leader, waiter = cache.SingleFlight(str(tmp_path)), cache.SingleFlight(str(tmp_path))
+    slow_call = SlowCall({"data": "page"})
+    waiter_call = SlowCall({"data": "other"})
+
+    threads, results = run_in_threads([lambda: leader.do("key", slow_call)])
+    assert slow_call.started.wait(5)
+    threads += run_in_threads([lambda: waiter.do("key", waiter_call)])[0]
+    time.sleep(0.1)
+    slow_call.release.set()
+    waiter_call.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results[0] == {"data": "page"}
+    assert (leader.calls, waiter.calls, waiter.shared, waiter_call.runs) == (1, 0, 1, 0)
+    assert os.listdir(tmp_path) == []
+
+    # a call made after the result was left runs again
+    assert waiter.do("key", lambda: {"data": "new"}) == {"data": "new"}
+    assert os.listdir(tmp_path) == []
+
+
+def test_single_flight_result_not_shared_after_call(tmp_path):
+    flights = cache.SingleFlight(str(tmp_path))
+    base = tmp_path / hashlib.sha1(json.dumps("key").encode("utf-8")).hexdigest()
+    with open(f"{base}.json", "w") as f:
+        json.dump({"done": time.time() - 1, "result": "old"}, f)
+
+    # another process is still reading the result of a call that ended before ours
+    with open(f"{base}.wait", "a") as wait_file, open(f"{base}.lock", "a") as reader:
+        fcntl.flock(wait_file, fcntl.LOCK_SH)
+        fcntl.flock(reader, fcntl.LOCK_SH)
+        threads, results = run_in_threads([lambda: flights.do("key", lambda: "new")])
+        time.sleep(0.1)
+        assert threads[0].is_alive()
+        fcntl.flock(reader, fcntl.LOCK_UN)
+        threads[0].join(5)
+        assert results[0] == "new"
+        fcntl.flock(wait_file, fcntl.LOCK_UN)
+        cache.SingleFlight.end_flight(wait_file, str(base))
+    assert os.listdir(tmp_path) == []
+
+
+def test_single_flight_error_not_shared(tmp_path):
+    flights = cache.SingleFlight(str(tmp_path))
+
+    def fail():
+        raise ConnectionError("offline")
+
+    with pytest.raises(ConnectionError):
+        flights.do("key", fail)
+    assert flights.do("key", lambda: "ok") == "ok"
+    assert os.listdir(tmp_path) == []
+
+
+def test_single_flight_cleans_left_files(tmp_path):
+    for file_name in ["a.wait", "a.lock", "a.json", "b.lock", "b.json", ".tmp-old.json", ".tmp-new.json"]:
+        (tmp_path / file_name).write_text("{}")
+    old = time.time() - 2 * cache.FLIGHT_TMP_AGE
+    os.utime(tmp_path / ".tmp-old.json", (old, old))
+
+    with open(tmp_path / "c.wait", "a") as in_flight:
+        fcntl.flock(in_flight, fcntl.LOCK_SH)
+        (tmp_path / "c.lock").write_text("")
+        cache.SingleFlight(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == [".tmp-new.json", "c.lock", "c.wait"]
@@ -0,0 +1,276 @@
+import csv
+import datetime
+import os
+
+import openpyxl
+import pytest
+
+import cba2csv
+from synthetic import cba_workbook
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(cba2csv.__file__), "examples")
+CBA_EXAMPLE = os.path.join(EXAMPLES_PATH, "cba_test_fixture-Grading_1.xlsx")
+
+
+@pytest.fixture(scope="module")
+def workbook_file(tmp_path_factory):
+    return cba_workbook(str(tmp_path_factory.mktemp("cba") / "games.xlsx"), sheets=2, time_slots=5, courts=3)
+
+
+def extract_all(file_name, read_only, **kwargs):
+    wb = openpyxl.load_workbook(file_name, read_only=read_only)
+    games = [game for sheet in wb for game in cba2csv.extract_cba_games(sheet, **kwargs)]
+    wb.close()
+    return games
+
+
+def test_streamed_equals_loaded_sheet(workbook_file):
+    streamed = extract_all(workbook_file, read_only=True)
+    assert streamed == extract_all(workbook_file, read_only=False)
+    assert len(streamed) == 2 * 5 * 3
+
+
+def test_games_of_synthetic_sheet(workbook_file):
+    game_date = datetime.date(2021, 11, 6)
+    games = extract_all(workbook_file, read_only=True, game_date=game_date, game_length_min=40)
+    first = games[0]
+    assert first["cell"] == "'Sheet 1'.B3"
+    assert (first["start_date"], first["start_time"], first["end_time"]) == (
+        game_date,
+        datetime.time(8, 30),
+        datetime.time(9, 10),
+    )
+    assert (first["location"], first["court"]) == ("Coburg Basketball Stadium", "Court 1")
+    assert {game["start_time"] for game in games} == {
+        datetime.time(8, 30),
+        datetime.time(9, 20),
+        datetime.time(10, 10),
+        datetime.time(11, 0),
+        datetime.time(11, 50),
+    }
+
+
+def test_date_read_from_sheet():
+    games = extract_all(CBA_EXAMPLE, read_only=True)
+    assert games and {game["start_date"] for game in games} == {datetime.date(2021, 11, 6)}
+    assert all(game["team1"] and game["team2"] and game["league"].startswith("U") for game in games)
+
+
+###########################################################
+# VENUE INDEX
+###########################################################
+
+
+def naive_lookup(venues_info, location):
+    """Key found first in location (the longest if many start there, then in dictionary order)"""
+    matches = [(location.find(key), -len(key), k, key) for k, key in enumerate(venues_info) if key in location]
+    if not matches:
+        return None
+    key = min(matches)[3]
+    while isinstance(venues_info[key], str):
+        key = venues_info[key]
+    return venues_info[key]
+
+
+def test_venue_index_equals_naive_lookup():
+    index = cba2csv.VenueIndex(cba2csv.VENUES_INFO)
+    locations = list(cba2csv.VENUES_INFO) + [
+        "Court 2 at Coburg Basketball Stadium",
+        "Dallas Brooks Community Primary School (Gym)",
+        "Coburg Senior High School",
+        "Unknown Hall",
+        "",
+    ]
+    for location in locations:
+        assert index.lookup(location) == naive_lookup(cba2csv.VENUES_INFO, location), location
+
+
+def test_venue_index_aliases_and_specific_keys():
+    venues_info = {
+        "Hall": ("Hall", "1 Main St", None),
+        "Hall East": ("Hall East", "2 Main St", "Back door"),
+        "HE": "Hall East",
+        "East": "HE",
+    }
+    index = cba2csv.VenueIndex(venues_info)
+    assert index.lookup("Hall East court 1") == venues_info["Hall East"]  # longest key at same start
+    assert index.lookup("Main Hall") == venues_info["Hall"]
+    assert index.lookup("East wing") == venues_info["Hall East"]  # alias of an alias
+    assert index.lookup("Oval") is None
+
+
+def test_venue_index_alias_cycle():
+    with pytest.raises(ValueError):
+        cba2csv.VenueIndex({"A": "B", "B": "A"})
+
+
+###########################################################
+# BATCH MODE
+###########################################################
+
+PLAYHQ_EXAMPLE = os.path.join(EXAMPLES_PATH, "playhq-advanced_fixture_2022050412207.csv")
+
+
+def run_cba2csv(*args):
+    import subprocess
+    import sys
+
+    return subprocess.run(
+        [sys.executable, cba2csv.__file__, *args], capture_output=True, text=True, cwd=EXAMPLES_PATH
+    )
+
+
+def test_schedule_id_rejected_for_many_days(tmp_path):
+    result = run_cba2csv(
+        PLAYHQ_EXAMPLE, "Magic", "--from-date", "2022-05-07", "--to-date", "2022-05-14",
+        "--id", "Round 2", "--output", str(tmp_path), "--jobs", "1",
+    )
+    assert result.returncode == 1
+    assert 'Schedule id "Round 2" given for 2 game days' in result.stderr
+    assert os.listdir(tmp_path) == []
+
+
+def test_schedule_id_for_one_day(tmp_path):
+    result = run_cba2csv(
+        PLAYHQ_EXAMPLE, "Magic", "--date", "2022-05-14", "--id", "Grading 2", "--output", str(tmp_path),
+    )
+    assert "Schedule id" not in result.stderr
+    assert "Building TeamAPP schedule for 2022-05-14" in result.stderr
+
+
+###########################################################
+# PLAYHQ CSV REPORTS
+###########################################################
+
+
+def naive_playhq_games(file_name, club, from_date, to_date, game_length_min=40):
+    """Row by row reading of a PlayHQ report, as cba2csv did before loading it column-wise"""
+    games = []
+    with open(file_name, newline="", encoding="utf-8-sig") as f:
+        for g in csv.DictReader(f):
+            date_game = datetime.datetime.strptime(g["game date"], "%d/%m/%Y").date()
+            if not (from_date <= date_game <= to_date and (club in g["team a"] or club in g["team b"])):
+                continue
+            if not g["time"]:
+                continue
+            start_time = datetime.datetime.strptime(g["time"], "%H:%M:%S").time()
+            end_time = (datetime.datetime.combine(date_game, start_time) + datetime.timedelta(minutes=game_length_min)).time()
+            games.append(
+                {
+                    "team1": g["team a"],
+                    "team2": g["team b"],
+                    "start_date": date_game,
+                    "end_date": date_game,
+                    "start_time": start_time,
+                    "end_time": end_time,
+                    "location": g["venue"],
+                    "court": g["playing surface"],
+                    "league": f"{g['grade'].split()[1]} {g['grade'].split()[2]}",
+                }
+            )
+    return games
+
+
+@pytest.mark.parametrize(
+    "from_date, to_date",
+    [
+        (datetime.date(2022, 1, 1), datetime.date(2022, 12, 31)),
+        (datetime.date(2022, 5, 14), datetime.date(2022, 5, 14)),
+        (datetime.date(2022, 5, 15), datetime.date(2022, 5, 20)),
+    ],
+)
+def test_playhq_games_equal_naive_reading(from_date, to_date):
+    games = cba2csv.read_playhq_games(PLAYHQ_EXAMPLE, "Magic", from_date, to_date, game_length_min=45)
+    assert games == naive_playhq_games(PLAYHQ_EXAMPLE, "Magic", from_date, to_date, game_length_min=45)
+
+
+def test_playhq_games_without_time_skipped(tmp_path, caplog):
+    file_name = tmp_path / "report.csv"
+    file_name.write_text(
+        "\ufeffgame date,grade,round,team a,team b,venue,playing surface,time\n"
+        "14/05/2022,Saturday U10 Boys Division 3,Round 3,Magic U10 Boys Gold,Rebels U10 Boys Blue,Northcote High School,Court 1,09:15:00\n"
+        "14/05/2022,Saturday U12 Girls Division 1,Round 3,Rebels U12 Girls Red,Magic U12 Girls Gold,Northcote High School,Court 2,\n"
+        "14/05/2022,Saturday U12 Boys Division 1,Round 3,Rebels U12 Boys Red,Stars U12 Boys SR,Northcote High School,Court 2,10:00:00\n"
+    )
+    day = datetime.date(2022, 5, 14)
+    games = cba2csv.read_playhq_games(str(file_name), "Magic", day, day)
+
+    assert [(game["team1"], game["league"], game["end_time"]) for game in games] == [
+        ("Magic U10 Boys Gold", "U10 Boys", datetime.time(9, 55))
+    ]
+    assert "Rebels U12 Girls Red vs Magic U12 Girls Gold on 2022-05-14 has no time yet" in caplog.text
+    assert cba2csv.detect_file_format(str(file_name)) == "playhq"
+
+
+###########################################################
+# CLUB SCHEDULES
+###########################################################
+GAME_DAY = datetime.date(2022, 5, 14)
+CLUB_TEAMS = {"U10 Girls Gold", "U10 Girls Purple", "U12 Boys Gold", "U14 Boys Purple"}
+
+
+def club_game(team1, team2, league, start, location="Coburg Basketball Stadium", court="Court 1"):
+    return {
+        "team1": team1,
+        "team2": team2,
+        "start_date": GAME_DAY,
+        "end_date": GAME_DAY,
+        "start_time": start,
+        "end_time": (datetime.datetime.combine(GAME_DAY, start) + datetime.timedelta(minutes=40)).time(),
+        "location": location,
+        "court": court,
+        "league": league,
+    }
+
+
+def test_club_schedule_games_and_byes():
+    games = [
+        club_game("Magic U10 Girls Purple", "Magic U10 Girls Gold", "U10 Girls", datetime.time(9, 15)),
+        club_game("Rebels U12 Boys Red", "Magic U12 Boys Gold", "U12 Boys", datetime.time(10, 0), "Northcote High School"),
+    ]
+    schedule = cba2csv.build_club_schedule(games, "Magic", schedule_id="Round 3", club_teams=CLUB_TEAMS)
+
+    assert schedule["event_name"].tolist() == [
+        "U10 Girls Purple - Round 3",
+        "U12 Boys Gold - Round 3",
+        "U10 Girls Gold - Round 3",
+        "U14 Boys Purple - BYE",
+    ]
+    assert schedule["opponent"].tolist() == ["Magic Girls Gold", "Rebels Boys Red", "Magic Girls Purple", ""]
+    assert schedule["access_groups"].tolist() == schedule["team_name"].tolist()
+    assert (schedule["start_date"] == GAME_DAY).all()
+
+    games_df = schedule.loc[schedule["venue"] != ""]
+    assert games_df["location"].tolist() == [
+        cba2csv.get_venue_info("Coburg Basketball Stadium")[1],
+        cba2csv.get_venue_info("Northcote High School")[1],
+        cba2csv.get_venue_info("Coburg Basketball Stadium")[1],
+    ]
+    assert "Rebels Boys Red" in games_df["description"].iloc[1]
+    bye = schedule.iloc[-1]
+    assert (bye["rsvp"], bye["duty_roster"], bye["start_time"]) == (0, 0, datetime.time(11, 0))
+
+
+def test_club_schedule_without_byes():
+    games = [
+        club_game("Magic U10 Girls Purple", "Magic U10 Girls Gold", "U10 Girls", datetime.time(9, 15)),
+        club_game("Magic U12 Boys Gold", "Rebels U12 Boys Red", "U12 Boys", datetime.time(10, 0)),
+    ]
+    teams = {"U10 Girls Gold", "U10 Girls Purple", "U12 Boys Gold"}
+    schedule = cba2csv.build_club_schedule(games, "Magic", club_teams=teams)
+    assert sorted(schedule["event_name"]) == sorted(teams)
+
+
+def test_club_schedule_unknown_venue():
+    games = [club_game("Magic U12 Boys Gold", "Rebels U12 Boys Red", "U12 Boys", datetime.time(10, 0), "Nowhere Hall")]
+    with pytest.raises(cba2csv.ScheduleError, match="no venue matched"):
+        cba2csv.build_club_schedule(games, "Magic", club_teams=CLUB_TEAMS)
+
+
+def test_club_schedule_unknown_team():
+    games = [
+        club_game("Magic U12 Boys Gold", "Rebels U12 Boys Red", "U12 Boys", datetime.time(10, 0)),
+        club_game("Magic U16 Girls Gold", "Rebels U16 Girls Red", "U16 Girls", datetime.time(11, 0)),
+    ]
+    with pytest.raises(cba2csv.ScheduleError, match="BYE team"):
+        cba2csv.build_club_schedule(games, "Magic", club_teams=CLUB_TEAMS)
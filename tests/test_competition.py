@@ -0,0 +1,84 @@
+import json
+import os
+
+import pytest
+
+from competition import CompetitionExtractor, team_file_name
+
+
+class FakePlayHQ:
+    """Serves team fixtures from a synthetic competition, failing once after fail_after pages"""
+
+    def __init__(self, competition, fail_after=None, drop_next_cursor=False) -> None:
+        self.competition = competition
+        self.fail_after = fail_after
+        self.drop_next_cursor = drop_next_cursor
+        self.calls = []  # (key, cursor) of every page served
+
+    def get_json(self, key, cursor=None):
+        for data_json in self.competition.pages(key, cursor):
+            if self.fail_after is not None and len(self.calls) == self.fail_after:
+                self.fail_after = None
+                raise ConnectionError("connection lost")
+            if self.drop_next_cursor and not data_json["metadata"]["hasMore"]:
+                data_json = {"data": data_json["data"], "metadata": {"hasMore": False}}
+            self.calls.append((key, cursor))
+            cursor = data_json["metadata"].get("nextCursor")
+            yield data_json
+
+
+@pytest.fixture
+def team(competition):
+    # the team with the longest fixture, so it spans several pages of 2 games
+    competition.page_size = 2
+    yield max(competition.teams, key=lambda t: len(competition.fixtures[t["id"]]))
+    competition.page_size = 10
+
+
+def read_games(output_path, team):
+    with open(os.path.join(output_path, team_file_name(team["name"], team["id"]))) as f:
+        return [game["id"] for game in json.load(f)["data"]]
+
+
+def test_resume_after_interrupted_listing(competition, team, tmp_path):
+    expected = [game["id"] for game in competition.fixtures[team["id"]]]
+    assert len(expected) > 2
+
+    phq = FakePlayHQ(competition, fail_after=1)
+    extracted, errors = CompetitionExtractor(phq, tmp_path, workers=1).extract([team])
+    assert (extracted, errors) == ([], [team["name"]])
+    assert not os.path.exists(os.path.join(tmp_path, team_file_name(team["name"], team["id"])))
+
+    phq_again = FakePlayHQ(competition)
+    extracted, errors = CompetitionExtractor(phq_again, tmp_path, workers=1).extract([team])
+    assert (extracted, errors) == ([team["name"]], [])
+    assert read_games(tmp_path, team) == expected
+    # the second run continues from the journaled cursor: the first page is not fetched again
+    assert phq_again.calls[0][1] is not None
+    assert len(phq.calls) + len(phq_again.calls) == -(-len(expected) // 2)
+
+
+def test_last_page_without_next_cursor(competition, team, tmp_path):
+    phq = FakePlayHQ(competition, drop_next_cursor=True)
+    extracted, errors = CompetitionExtractor(phq, tmp_path, workers=1).extract([team])
+    assert errors == []
+    assert read_games(tmp_path, team) == [game["id"] for game in competition.fixtures[team["id"]]]
+
+
+def test_done_teams_are_skipped(competition, team, tmp_path):
+    CompetitionExtractor(FakePlayHQ(competition), tmp_path, workers=1).extract([team])
+    phq = FakePlayHQ(competition)
+    extracted, _ = CompetitionExtractor(phq, tmp_path, workers=1).extract([team])
+    assert extracted == [] and phq.calls == []
+
+
+def test_teams_with_same_file_name(competition, tmp_path):
+    # two teams whose names are the same once sanitised, fetched at the same time
+    first, second = competition.teams[:2]
+    teams = [{"id": first["id"], "name": "U12 Boys-1"}, {"id": second["id"], "name": "U12 Boys 1"}]
+    assert team_file_name(teams[0]["name"], teams[0]["id"]) != team_file_name(teams[1]["name"], teams[1]["id"])
+
+    extracted, errors = CompetitionExtractor(FakePlayHQ(competition), tmp_path, workers=2).extract(teams)
+    assert (sorted(extracted), errors) == (sorted(t["name"] for t in teams), [])
+    for team in teams:
+        assert read_games(tmp_path, team) == [game["id"] for game in competition.fixtures[team["id"]]]
@@ -0,0 +1,40 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from courts import CourtTimeline
+
+
+def naive_clashes(games_df, game_duration):
+    games_df = games_df.drop_duplicates("id").dropna(subset=["schedule_timestamp", "venue_id"])
+    duration = pd.Timedelta(minutes=game_duration)
+    pairs = set()
+    for g1, g2 in itertools.combinations(games_df.to_dict("records"), 2):
+        same_court = (g1["venue_id"], g1["venue_surfaceName"]) == (g2["venue_id"], g2["venue_surfaceName"])
+        if same_court and abs(g1["schedule_timestamp"] - g2["schedule_timestamp"]) < duration:
+            pairs.add(frozenset([g1["id"], g2["id"]]))
+    return pairs
+
+
+def test_clashes_equal_pairwise_count(games_df):
+    for duration in [45, 90]:
+        clashes_df = CourtTimeline(games_df, game_duration=duration).clashes()
+        found = {frozenset(pair) for pair in zip(clashes_df["game_id_1"], clashes_df["game_id_2"])}
+        assert len(found) == len(clashes_df)
+        assert found == naive_clashes(games_df, duration)
+    assert len(clashes_df) > 0
+
+
+def test_pending_and_undated_games(games_df):
+    upcoming_df = games_df.loc[games_df["status"] == "UPCOMING"].drop_duplicates("id").head(3).copy()
+    upcoming_df["id"] = upcoming_df["id"] + "-pending"
+    upcoming_df["competitors"] = [upcoming_df["competitors"].iloc[0][:1], [{"name": None}], np.nan]
+    upcoming_df["schedule_timestamp"] = [upcoming_df["schedule_timestamp"].iloc[0], pd.NaT, pd.NaT]
+
+    timeline = CourtTimeline(pd.concat([games_df, upcoming_df], ignore_index=True))
+    assert len(timeline.bookings_df) == games_df["id"].nunique() + 1
+    assert timeline.bookings_df["start"].notna().all()
+    assert "PENDING" not in set(timeline.bookings_df["teams"])
+    assert len(timeline.clashes()) >= len(CourtTimeline(games_df).clashes())
+    assert timeline.utilisation()["games"].sum() == len(timeline.bookings_df)
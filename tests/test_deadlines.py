@@ -0,0 +1,89 @@
+import threading
+import time
+
+import pytest
+
+import deadlines
+
+
+class Calls:
+    """Calls that answer after the given delays (or raise the given errors), one per call"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.lock = threading.Lock()
+        self.made = 0
+
+    def __call__(self):
+        with self.lock:
+            delay, answer = self.answers[self.made]
+            self.made += 1
+        time.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+def test_hedged_fast_call_not_hedged():
+    latencies = deadlines.LatencyTracker()
+    calls = Calls((0, "first"), (0, "second"))
+    assert deadlines.hedged(calls, 0.5, latencies) == "first"
+    assert (calls.made, latencies.hedged) == (1, 0)
+
+
+def test_hedged_second_call_wins():
+    latencies = deadlines.LatencyTracker()
+    calls = Calls((1, "slow"), (0, "hedge"))
+    start = time.monotonic()
+    assert deadlines.hedged(calls, 0.1, latencies) == "hedge"
+    assert time.monotonic() - start < 0.5
+    assert (calls.made, latencies.hedged) == (2, 1)
+
+
+def test_hedged_errors():
+    # the first call to answer fails: the other one is waited for
+    assert deadlines.hedged(Calls((0.2, ConnectionError("reset")), (0, "hedge")), 0.1) == "hedge"
+    assert deadlines.hedged(Calls((0.1, "slow"), (0, ConnectionError("reset"))), 0.05) == "slow"
+    with pytest.raises(ConnectionError):
+        deadlines.hedged(Calls((0.1, ConnectionError("reset")), (0, ConnectionError("reset"))), 0.05)
+    # not hedged: the error of the only call
+    with pytest.raises(ValueError):
+        deadlines.hedged(Calls((0, ValueError("bad page"))), 0.5)
+
+
+def test_latency_tracker_hedge_after():
+    latencies = deadlines.LatencyTracker(percentile=90)
+    for k in range(deadlines.HEDGE_MIN_SAMPLES - 1):
+        latencies.add(k / 10)
+    assert latencies.hedge_after() is None
+    latencies.add(10.0)
+    assert latencies.hedge_after() == pytest.approx(1.71)  # the slow outlier is above the 90th percentile
+
+    latencies = deadlines.LatencyTracker(percentile=None)
+    for _ in range(deadlines.HEDGE_MIN_SAMPLES):
+        latencies.add(1.0)
+    assert latencies.hedge_after() is None
+
+
+def test_latency_tracker_window():
+    latencies = deadlines.LatencyTracker(percentile=50, window=deadlines.HEDGE_MIN_SAMPLES)
+    for _ in range(deadlines.HEDGE_MIN_SAMPLES):
+        latencies.add(5.0)
+    for _ in range(deadlines.HEDGE_MIN_SAMPLES):
+        latencies.add(1.0)
+    assert latencies.hedge_after() == 1.0
+
+
+def test_deadline_timeout():
+    deadline = deadlines.Deadline(0.2)
+    assert deadlines.Deadline.coerce(deadline) is deadline
+    assert deadlines.Deadline.coerce(None) is None
+    assert deadline.timeout(30) <= 0.2
+    assert deadline.timeout(0.05) == 0.05
+    assert deadline.timeout() <= 0.2
+    assert not deadline.expired()
+
+    time.sleep(0.25)
+    assert deadline.expired()
+    with pytest.raises(deadlines.DeadlineExceeded):
+        deadline.timeout(30)
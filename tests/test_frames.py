@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+import frames
+
+TIMEZONE = "Australia/Melbourne"
+
+
+def rowwise_timestamps(dates, times, timezones, timezone):
+    """One game at a time, as PlayHQ.add_schedule_timestamp did before the backends"""
+    return pd.Series(
+        [
+            pd.NaT
+            if pd.isna(date) or date == ""
+            else pd.to_datetime(f"{date} {time}").tz_localize(zone).tz_convert(timezone)
+            for date, time, zone in zip(dates, times, timezones)
+        ],
+        dtype=f"datetime64[us, {timezone}]",
+    )
+
+
+@pytest.fixture(scope="module")
+def schedule_cols(games_df):
+    """Dates, times and timezones of the season games, with undated games and other timezones"""
+    dates = games_df["schedule_date"].tolist()
+    times = games_df["schedule_time"].tolist()
+    zones = games_df["schedule_timezone"].tolist()
+    dates[0], dates[1] = "", None
+    times[6:8] = ["10:00", "9:15"]  # no seconds, as ISO8601 allows
+    zones[2:6] = ["Australia/Perth", "Australia/Perth", "UTC", "Australia/Adelaide"]
+    return dates, times, zones
+
+
+@pytest.mark.parametrize("backend", frames.BACKENDS)
+def test_timestamps_equal_rowwise(backend, schedule_cols):
+    if backend == "polars":
+        pytest.importorskip("polars")
+    backend = frames.get_backend(backend)
+    expected = rowwise_timestamps(*schedule_cols, TIMEZONE)
+
+    pd.testing.assert_series_equal(backend.timestamps(*schedule_cols, TIMEZONE), expected)
+
+
+@pytest.mark.parametrize("backend", frames.BACKENDS)
+def test_timestamps_invalid_time_raises(backend):
+    if backend == "polars":
+        pytest.importorskip("polars")
+    backend = frames.get_backend(backend)
+    with pytest.raises(ValueError):
+        backend.timestamps(["2022-05-14", "2022-05-14"], ["10:00:00", "10am"], [TIMEZONE] * 2, TIMEZONE)
+
+
+def test_timestamps_no_dated_games():
+    timestamps = frames.get_backend("pandas").timestamps(["", None], ["10:00:00", ""], [TIMEZONE] * 2, TIMEZONE)
+    assert timestamps.isna().all()
+    assert str(timestamps.dtype) == f"datetime64[us, {TIMEZONE}]"
+
+
+def test_get_backend():
+    backend = frames.PandasBackend()
+    assert frames.get_backend(backend) is backend
+    assert frames.get_backend().name == "pandas"
+    with pytest.raises(ValueError):
+        frames.get_backend("spark")
@@ -0,0 +1,338 @@
+import datetime
+import http.server
+import json
+import threading
+import time
+import types
+import urllib.parse
+
+import pandas as pd
+import pytest
+
+import cache
+import playhq
+import utils
+from synthetic import SyntheticCompetition
+
+
+class SyntheticResponse(playhq.ResponsePHQ):
+    """ResponsePHQ that serves the pages of a synthetic competition instead of PlayHQ"""
+
+    def __init__(self, competition, key, fail_at=None, **kwargs):
+        super().__init__(key, "api-key", "tenant", **kwargs)
+        self.competition = competition
+        self.fail_at = fail_at
+        self.cursors = []
+
+    def request_page(self, cursor):
+        self.cursors.append(cursor)
+        if self.fail_at is not None and len(self.cursors) > self.fail_at:
+            raise ConnectionError("connection dropped")
+        return next(self.competition.pages(self.key, cursor))
+
+
+@pytest.fixture(scope="module")
+def small_pages():
+    """A competition whose team listing spans many pages"""
+    competition = SyntheticCompetition(clubs=2, teams_per_club=6, rounds=1, page_size=2)
+    return competition, f"seasons/{competition.season_id}/teams"
+
+
+###########################################################
+# PAGES READ AHEAD
+###########################################################
+
+
+@pytest.mark.parametrize("read_ahead", [0, 1, 3])
+def test_pages_read_ahead_equal_listing(small_pages, read_ahead):
+    competition, key = small_pages
+    response = SyntheticResponse(competition, key, read_ahead=read_ahead)
+
+    assert list(response) == list(competition.pages(key))
+    assert response.cursors == [None] + [f"c{no}" for no in range(1, 6)]
+    assert not response.has_more
+
+
+def test_read_ahead_is_bounded(small_pages):
+    competition, key = small_pages
+    response = SyntheticResponse(competition, key, read_ahead=2)
+
+    pages = iter(response)
+    next(pages)
+    time.sleep(0.3)
+    # one page consumed, two waiting in the buffer and one fetched waiting for room
+    assert len(response.cursors) == 4
+    pages.close()
+
+
+def test_stop_early_ends_fetcher(small_pages):
+    competition, key = small_pages
+    response = SyntheticResponse(competition, key, read_ahead=1)
+
+    pages = iter(response)
+    next(pages)
+    pages.close()
+    time.sleep(0.3)
+    assert not any(thread.name == f"fetch-{key}" for thread in threading.enumerate())
+    assert response.cursor == "c1"  # where to continue from
+
+
+@pytest.mark.parametrize("read_ahead", [0, 2])
+def test_fetch_error_after_pages(small_pages, read_ahead):
+    competition, key = small_pages
+    response = SyntheticResponse(competition, key, fail_at=2, read_ahead=read_ahead)
+
+    pages = []
+    with pytest.raises(ConnectionError):
+        for data_json in response:
+            pages.append(data_json)
+    assert pages == list(competition.pages(key))[:2]
+    assert response.cursor == "c2"
+
+
+###########################################################
+# STREAMING PIPELINE
+###########################################################
+
+
+@pytest.fixture
+def offline(monkeypatch):
+    monkeypatch.setattr(playhq.utils, "shorten_url", lambda url: url)
+
+
+@pytest.fixture
+def season(competition):
+    from_date = pd.Timestamp(competition.start_date).tz_localize(competition.timezone)
+    return from_date, from_date + pd.Timedelta(weeks=competition.rounds)
+
+
+def test_streamed_csv_equals_batch(tmp_path, offline, competition, teams_df, season):
+    phq = competition.playhq(tapp_team_name=lambda name: name)
+    games_df, _ = phq.get_games(teams_df, *season)
+    batch_file = tmp_path / "batch.csv"
+    phq.to_teamsapp_schedule(games_df).to_csv(batch_file, index=False)
+
+    phq = competition.playhq(tapp_team_name=lambda name: name)
+    stream_file = tmp_path / "stream.csv"
+    rows = utils.write_frames_csv(
+        phq.iter_teamsapp_schedule(phq.iter_games(teams_df, *season)), str(stream_file)
+    )
+
+    assert rows == len(games_df)
+    assert stream_file.read_text() == batch_file.read_text()
+
+
+def test_games_fetched_as_consumed(offline, competition, teams_df, season):
+    phq = competition.playhq(tapp_team_name=lambda name: name)
+    keys = []
+    fetch_json = phq.fetch_json
+    phq.fetch_json = lambda key, cursor=None: keys.append(key) or fetch_json(key, cursor)
+
+    frames = phq.iter_teamsapp_schedule(phq.iter_games(teams_df, *season))
+    first_df = next(frames)
+    assert keys == [f"teams/{teams_df['id'].iloc[0]}/fixture"]
+    assert set(first_df["team_name"]) == {teams_df["name"].iloc[0]}
+    frames.close()
+
+
+def test_write_frames_csv_skips_empty_frames(tmp_path):
+    frames = [None, pd.DataFrame(), pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}), pd.DataFrame({"a": [3], "b": ["z"]})]
+    file_name = tmp_path / "frames.csv"
+    assert utils.write_frames_csv(iter(frames), str(file_name)) == 3
+    assert file_name.read_text().splitlines() == ["a,b", "1,x", "2,y", "3,z"]
+
+
+###########################################################
+# GAME SUMMARIES
+###########################################################
+
+
+def break_games(games_df):
+    """Games frame with some games undated and some with a pending competitor, as early in finals"""
+    broken_df = games_df.copy()
+    undated = broken_df.index[:6]
+    broken_df.loc[undated, "schedule_date"] = ""
+    broken_df.loc[undated, "schedule_timestamp"] = pd.NaT
+    pending = broken_df.index[6:10]
+    broken_df.loc[pending, "competitors"] = pd.Series([c[:1] for c in broken_df.loc[pending, "competitors"]], index=pending)
+    return broken_df
+
+
+def test_incomplete_games(games_df):
+    broken_df = break_games(games_df)
+    assert playhq.PlayHQ.incomplete_games(broken_df).tolist() == [True] * 10 + [False] * (len(games_df) - 10)
+    assert not playhq.PlayHQ.incomplete_games(games_df).any()
+
+
+def test_enrich_resolves_incomplete_games(competition, games_df):
+    phq = competition.playhq()
+    keys = []
+    fetch_json = phq.fetch_json
+    phq.fetch_json = lambda key, cursor=None: keys.append(key) or fetch_json(key, cursor)
+
+    broken_df = break_games(games_df)
+    enriched_df = phq.enrich_games(broken_df)
+
+    assert sorted(keys) == sorted(f"games/{game_id}/summary" for game_id in broken_df["id"].iloc[:10].unique())
+    assert not phq.incomplete_games(enriched_df).any()
+    for col in ["schedule_date", "schedule_timestamp", "competitors", "status", "venue_id"]:
+        assert enriched_df[col].tolist() == games_df[col].tolist(), col
+
+    # summaries are kept: enriching again fetches nothing
+    keys.clear()
+    phq.enrich_games(broken_df)
+    assert keys == []
+
+
+def test_enrich_keeps_games_that_fail(competition, games_df):
+    phq = competition.playhq()
+    phq.fetch_json = lambda key, cursor=None: (_ for _ in ()).throw(ConnectionError("offline"))
+
+    broken_df = break_games(games_df)
+    pd.testing.assert_frame_equal(phq.enrich_games(broken_df), broken_df)
+
+
+def test_stored_summary_kept_for_summary_ttl(tmp_path):
+    competition = SyntheticCompetition(clubs=2, teams_per_club=2, rounds=1)
+    game_id = next(iter(competition.games))
+    store = cache.ResponseStore(str(tmp_path))  # pages kept for a day
+
+    def summary():
+        phq = competition.playhq()
+        phq.store = store
+        return phq.get_game_summary(game_id)
+
+    status = summary()["status"]
+    competition.games[game_id]["status"] = "FINAL"  # e.g., the result is entered after the summary was stored
+    assert summary()["status"] == status
+
+    file_name = store.page_file(f"games/{game_id}/summary")
+    with open(file_name) as f:
+        stored = json.load(f)
+    fetched = datetime.datetime.fromisoformat(stored["fetched"]) - playhq.SUMMARY_TTL - datetime.timedelta(minutes=1)
+    stored["fetched"] = fetched.isoformat()
+    with open(file_name, "w") as f:
+        json.dump(stored, f)
+
+    assert summary()["status"] == "FINAL"
+
+
+###########################################################
+# DEADLINES & HEDGED REQUESTS
+###########################################################
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def read(self):
+        return self.content
+
+
+def test_request_hedged_without_timeout(monkeypatch):
+    timeouts = []
+
+    def urlopen(req, timeout):
+        timeouts.append(timeout)
+        return FakeResponse(b'{"data": [], "metadata": {"hasMore": false}}')
+
+    monkeypatch.setattr(playhq.urllib.request, "urlopen", urlopen)
+    latencies = playhq.deadlines.LatencyTracker()
+    for _ in range(playhq.deadlines.HEDGE_MIN_SAMPLES):
+        latencies.add(0.5)
+
+    response = playhq.ResponsePHQ("teams/1/fixture", "api-key", "tenant", timeout=None, latencies=latencies)
+    assert response.request_page(None) == {"data": [], "metadata": {"hasMore": False}}
+    assert timeouts == [None]
+
+
+def test_hedged_request_timeout_left_of_deadline(monkeypatch):
+    timeouts = []
+
+    def urlopen(req, timeout):
+        timeouts.append(timeout)
+        if len(timeouts) == 1:
+            time.sleep(0.5)  # slow first request: hedged
+        return FakeResponse(b'{"data": [], "metadata": {"hasMore": false}}')
+
+    monkeypatch.setattr(playhq.urllib.request, "urlopen", urlopen)
+    latencies = playhq.deadlines.LatencyTracker()
+    for _ in range(playhq.deadlines.HEDGE_MIN_SAMPLES):
+        latencies.add(0.1)
+
+    response = playhq.ResponsePHQ(
+        "teams/1/fixture", "api-key", "tenant", timeout=None, latencies=latencies, deadline=playhq.deadlines.Deadline(10)
+    )
+    response.request_page(None)
+    assert len(timeouts) == 2 and timeouts[1] <= timeouts[0] - 0.1
+
+
+def test_grade_past_deadline_skipped(competition, teams_df):
+    phq = competition.playhq(tapp_team_name=lambda name: name)
+    plan_df = phq.plan_fetches(teams_df)
+    grade_id, grade_team_ids = plan_df.loc[plan_df["source"] == "grade", ["id", "team_ids"]].iloc[0]
+
+    get_grade_games = phq.get_grade_games
+
+    def grade_games(fetch_id, keep_undated=False):
+        if fetch_id == grade_id:
+            raise playhq.deadlines.DeadlineExceeded("Run deadline passed")
+        return get_grade_games(fetch_id, keep_undated)
+
+    fixtures = []
+    get_team_fixture = phq.get_team_fixture
+    phq.get_grade_games = grade_games
+    phq.get_team_fixture = lambda team_id, keep_undated=False: fixtures.append(team_id) or get_team_fixture(
+        team_id, keep_undated
+    )
+
+    fetched = [team_id for team_id, _, _ in phq.iter_team_fixtures(teams_df, by_grade=True, deadline=60)]
+    team_names = dict(zip(teams_df["id"], teams_df["name"]))
+    assert phq.fetch_stats["skipped"] == [team_names[t] for t in grade_team_ids]
+    assert not set(grade_team_ids) & (set(fetched) | set(fixtures))
+    assert len(fetched) == len(teams_df) - len(grade_team_ids)
+
+
+class SlowPlayHQHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the pages of self.server.competition, taking self.server.delays[key] seconds for some endpoints"""
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        key = url.path.removeprefix("/v1/")
+        cursor = urllib.parse.parse_qs(url.query).get("cursor", [None])[0]
+        time.sleep(self.server.delays.get(key, 0))
+        body = json.dumps(next(self.server.competition.pages(key, cursor))).encode("utf-8")
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):  # the client gave up waiting
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_request_cut_by_deadline_skips_team(monkeypatch, competition, teams_df):
+    fast_id, slow_id = teams_df["id"].iloc[:2]
+    http_server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowPlayHQHandler)
+    http_server.daemon_threads = True
+    http_server.competition = competition
+    http_server.delays = {f"teams/{slow_id}/fixture": 3}
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(playhq, "API_URL", f"http://127.0.0.1:{http_server.server_address[1]}/v1")
+
+    phq = competition.playhq()
+    phq.fetch_json = types.MethodType(playhq.PlayHQ.fetch_json, phq)  # from the server, not the competition
+    team_errors = []
+    try:
+        fetched = [team_id for team_id, _, _ in phq.iter_team_fixtures(teams_df.iloc[:2], team_errors=team_errors, deadline=1)]
+    finally:
+        http_server.shutdown()
+
+    assert fetched == [fast_id]
+    assert phq.fetch_stats["skipped"] == [teams_df["name"].iloc[1]]
+    assert team_errors == []
@@ -0,0 +1,56 @@
+import os
+
+import pandas as pd
+import pytest
+
+import cache
+import prefetch
+from synthetic import SyntheticCompetition
+
+
+@pytest.fixture
+def competition():
+    """Two clubs with two teams in some categories, so the club has grades with several teams"""
+    competition = SyntheticCompetition(clubs=2, teams_per_club=24, rounds=2, page_size=10)
+    # a final waiting for the winner of another game
+    game = next(iter(competition.fixtures[competition.teams[0]["id"]]))
+    game["competitors"] = game["competitors"][:1]
+    return competition
+
+
+def prefetched(competition, store_path, **kwargs):
+    phq_club = competition.playhq(tapp_team_name=lambda name: name)
+    phq_club.store = cache.ResponseStore(str(store_path))
+    from_date = pd.Timestamp(competition.start_date).tz_localize(competition.timezone)
+    to_date = from_date + pd.Timedelta(weeks=competition.rounds)
+    stats = prefetch.prefetch(phq_club, competition.season_id, from_date, to_date, **kwargs)
+    return phq_club, stats, set(os.listdir(store_path / "pages"))
+
+
+def test_prefetch_by_grade(competition, tmp_path, monkeypatch):
+    monkeypatch.setattr(prefetch.phq.utils, "shorten_url", lambda url: url)
+    phq_club, stats, stored = prefetched(competition, tmp_path)
+
+    plan_df = phq_club.plan_fetches(phq_club.get_season_teams(competition.season_id))
+    grade_ids = plan_df.loc[plan_df["source"] == "grade", "id"].tolist()
+    team_ids = plan_df.loc[plan_df["source"] == "team", "id"].tolist()
+    assert grade_ids and team_ids
+
+    pending_id = competition.fixtures[competition.teams[0]["id"]][0]["id"]
+    assert stored == (
+        {f"seasons_{competition.season_id}_teams.json", f"games_{pending_id}_summary.json"}
+        | {f"grades_{grade_id}_games.json" for grade_id in grade_ids}
+        | {f"teams_{team_id}_fixture.json" for team_id in team_ids}
+    )
+    assert stats["summaries"] == 1
+    assert stats["short_urls"] > 0 and not stats["team_errors"]
+
+
+def test_prefetch_per_team(competition, tmp_path, monkeypatch):
+    monkeypatch.setattr(prefetch.phq.utils, "shorten_url", lambda url: url)
+    phq_club, stats, stored = prefetched(competition, tmp_path, by_grade=False)
+
+    teams_df = phq_club.get_season_teams(competition.season_id)
+    assert {f"teams_{team_id}_fixture.json" for team_id in teams_df["id"]} <= stored
+    assert not any(name.startswith("grades_") for name in stored)
+    assert stats["teams"] == len(teams_df)
@@ -0,0 +1,48 @@
+import pandas as pd
+
+import records
+
+
+def test_round_trip(games_df):
+    compact_df = records.compact_games(games_df)
+    assert isinstance(compact_df["status"].dtype, pd.CategoricalDtype)
+    assert str(compact_df["home_score"].dtype) == "Int32"
+    assert "competitors" not in compact_df
+
+    pd.testing.assert_frame_equal(records.expand_games(compact_df), games_df)
+
+
+def test_round_trip_pending_and_upcoming(games_df):
+    games_df = games_df.head(4).copy()
+    competitors = games_df["competitors"].tolist()
+    # upcoming: no scores or outcomes yet
+    competitors[0] = [{k: v for k, v in c.items() if k in ["id", "name", "isHomeTeam"]} for c in competitors[0]]
+    # waiting for the winner of another game; away team listed first
+    competitors[1] = [competitors[1][0]]
+    competitors[2] = competitors[2][::-1]
+    competitors[3] = []
+    games_df["competitors"] = competitors
+
+    compact_df = records.compact_games(games_df)
+    assert compact_df["n_competitors"].tolist() == [2, 1, 2, 0]
+    assert compact_df["home_first"].tolist() == [True, True, False, True]
+
+    pd.testing.assert_frame_equal(records.expand_games(compact_df), games_df)
+
+
+def test_frame_without_competitors(games_df):
+    games_df = games_df.drop(columns=["competitors"])
+    compact_df = records.compact_games(games_df)
+    assert not any(c.startswith("home_") for c in compact_df.columns)
+
+    pd.testing.assert_frame_equal(records.expand_games(compact_df), games_df)
+
+
+def test_records_opponent(games_df):
+    game = next(records.iter_records(records.compact_games(games_df)))
+    competitors = games_df["competitors"].iloc[0]
+    assert game.id == games_df["id"].iloc[0]
+    assert game.opponent_name == next(c["name"] for c in competitors if c["id"] != game.team_id)
+
+    pending_df = games_df.head(1).assign(competitors=[competitors[:1]])
+    assert next(records.iter_records(records.compact_games(pending_df))).opponent_name == "PENDING"
@@ -0,0 +1,143 @@
+import logging
+import random
+
+import pandas as pd
+import pytest
+
+import roster
+
+
+def random_instance(rnd, volunteers, duties, starts, duration):
+    """Duties at random starts (minutes) and volunteers with random candidate duties and capacity"""
+    start = [rnd.choice(starts) for _ in range(duties)]
+    end = [s + duration for s in start]
+    blocks = pd.factorize(pd.Series(start))[0].tolist()
+    candidates = [sorted(rnd.sample(range(duties), rnd.randint(1, duties))) for _ in range(volunteers)]
+    capacity = [rnd.randint(1, 3) for _ in range(volunteers)]
+    return candidates, blocks, capacity, start, end
+
+
+def valid(owner, candidates, capacity, start, end):
+    for v, duties in enumerate(candidates):
+        taken = [d for d, u in enumerate(owner) if u == v]
+        if len(taken) > capacity[v] or not set(taken) <= set(duties):
+            return False
+        for a in taken:
+            for b in taken:
+                if a < b and start[a] < end[b] and start[b] < end[a]:
+                    return False
+    return True
+
+
+def brute_force(candidates, capacity, start, end):
+    """Most duties that can be assigned, trying every assignment (with pruning)"""
+    duties = len(start)
+    options = [[v for v in range(len(candidates)) if d in candidates[v]] for d in range(duties)]
+    taken = [[] for _ in candidates]
+    best = 0
+
+    def search(d, assigned):
+        nonlocal best
+        if assigned + (duties - d) <= best:
+            return
+        if d == duties:
+            best = assigned
+            return
+        for v in options[d]:
+            if len(taken[v]) < capacity[v] and all(end[c] <= start[d] or end[d] <= start[c] for c in taken[v]):
+                taken[v].append(d)
+                search(d + 1, assigned + 1)
+                taken[v].pop()
+        search(d + 1, assigned)
+
+    search(0, 0)
+    return best
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_match_on_time_grid_is_maximum(seed):
+    rnd = random.Random(seed)
+    candidates, blocks, capacity, start, end = random_instance(rnd, 4, 8, [540, 600, 660], duration=60)
+    owner = roster.match_duties(candidates, blocks, capacity, start, end)
+
+    assert valid(owner, candidates, capacity, start, end)
+    assert sum(u != -1 for u in owner) == brute_force(candidates, capacity, start, end)
+
+
+def test_match_with_staggered_starts_is_valid():
+    # games at 9:00, 9:30, 10:00, ... lasting 45 minutes: duties overlap across blocks
+    assigned = optimum = 0
+    for seed in range(40):
+        rnd = random.Random(seed)
+        candidates, blocks, capacity, start, end = random_instance(rnd, 4, 8, [540, 570, 600, 630], duration=45)
+        owner = roster.match_duties(candidates, blocks, capacity, start, end)
+
+        assert valid(owner, candidates, capacity, start, end)
+        best = brute_force(candidates, capacity, start, end)
+        assert sum(u != -1 for u in owner) <= best
+        assigned += sum(u != -1 for u in owner)
+        optimum += best
+    # a heuristic here, but close to the optimum
+    assert assigned >= 0.9 * optimum
+
+
+def test_match_balances_load():
+    start = [540] * 4 + [600] * 4 + [660] * 4
+    end = [s + 45 for s in start]
+    blocks = pd.factorize(pd.Series(start))[0].tolist()
+    candidates = [list(range(12))] * 6
+    owner = roster.match_duties(candidates, blocks, [12] * 6, start, end)
+
+    load = [owner.count(v) for v in range(6)]
+    assert -1 not in owner and max(load) - min(load) <= 1
+
+
+@pytest.fixture
+def schedule_df():
+    games = [
+        ("Magic U10 Boys Gold", "09:00:00", "09:45:00", "Coburg", "Court 1"),
+        ("Magic U12 Boys Gold", "09:00:00", "09:45:00", "Coburg", "Court 2"),
+        ("Magic U14 Girls Gold", "09:30:00", "10:15:00", "Coburg", "Court 3"),
+        ("Magic U10 Girls Gold", "10:00:00", "10:45:00", "Coburg", "Court 1"),
+        ("Magic U16 Boys Gold", "10:30:00", "11:15:00", "Coburg", "Court 2"),
+    ]
+    return pd.DataFrame(
+        [
+            {
+                "start_date": "2023-07-22",
+                "start_time": start,
+                "end_time": end,
+                "venue": venue,
+                "court": court,
+                "team_name": team,
+                "event_name": f"{team} - Round 5",
+                "duty_roster": 1,
+            }
+            for team, start, end, venue, court in games
+        ]
+    )
+
+
+def test_roster_from_team_pool(schedule_df):
+    duty_roster = roster.DutyRoster(schedule_df, roster.team_pool(schedule_df), own_teams=False)
+    roster_df = duty_roster.assign()
+
+    assert list(roster_df.columns) == roster.ROSTER_COLS
+    games = schedule_df.set_index("team_name")
+    for duty in roster_df.loc[roster_df["volunteer"] != ""].itertuples():
+        team_game = games.loc[duty.volunteer]
+        assert duty.team_name != duty.volunteer
+        # teams are not on duty while they play
+        assert duty.end_time <= team_game["start_time"] or team_game["end_time"] <= duty.start_time
+    assert duty_roster.load()["duties"].sum() == (roster_df["volunteer"] != "").sum()
+
+
+def test_clashing_duties_dropped_with_warning(schedule_df, monkeypatch, caplog):
+    pool_df = pd.DataFrame({"name": ["Alex"]})
+    # an assignment with two overlapping duties for the same volunteer
+    monkeypatch.setattr(roster, "match_duties", lambda candidates, *args: [0, 0, -1, -1, -1])
+
+    with caplog.at_level(logging.WARNING):
+        roster_df = roster.DutyRoster(schedule_df, pool_df).assign()
+    assert roster_df["volunteer"].tolist() == ["Alex", "", "", "", ""]
+    assert "1 duties overlapping another one of their volunteer left unassigned" in caplog.text
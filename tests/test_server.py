@@ -0,0 +1,178 @@
+import gzip
+import json
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import playhq
+import server
+
+
+@pytest.fixture(scope="module")
+def schedule_df(competition, teams_df, games_df):
+    phq = competition.playhq(tapp_team_name=lambda name: name)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(playhq.utils, "shorten_url", lambda url: url)
+        return phq.to_teamsapp_schedule(games_df)
+
+
+def all_keys(schedule_df):
+    return {("teams", name) for name in schedule_df["team_name"]} | {
+        ("venues", name) for name in schedule_df["venue"]
+    }
+
+
+def test_update_rebuilds_changed_teams_only(schedule_df):
+    site = server.FixtureSite()
+    assert set(site.update(schedule_df)) == all_keys(schedule_df)
+    responses = dict(site.responses)
+
+    assert site.update(schedule_df.copy()) == []
+    assert all(site.responses[path] is response for path, response in responses.items() if path != "/index.json")
+
+    changed_df = schedule_df.copy()
+    game = changed_df.iloc[0]
+    changed_df.loc[changed_df.index[0], "start_time"] = "07:00:00"
+    assert set(site.update(changed_df)) == {("teams", game["team_name"]), ("venues", game["venue"])}
+
+    team_path = f"/teams/{server.slug(game['team_name'])}.csv"
+    assert site.get(team_path).etag != responses[team_path].etag
+    assert b"07:00:00" in site.get(team_path).body
+    untouched = [
+        path
+        for path in responses
+        if path.startswith("/teams/") and not path.startswith(f"/teams/{server.slug(game['team_name'])}.")
+    ]
+    assert untouched and all(site.get(path) is responses[path] for path in untouched)
+
+
+def test_update_removes_teams_gone(schedule_df):
+    site = server.FixtureSite()
+    site.update(schedule_df)
+    team = schedule_df["team_name"].iloc[0]
+
+    changed = site.update(schedule_df.loc[schedule_df["team_name"] != team])
+    assert ("teams", team) in changed
+    assert site.get(f"/teams/{server.slug(team)}.json") is None
+
+
+def test_colliding_slugs_and_blank_names(schedule_df):
+    clash_df = schedule_df.iloc[:2].copy()
+    clash_df["team_name"] = ["U12 Boys-Gold", "U12 Boys Gold"]
+    clash_df["venue"] = ["", "Coburg Basketball Stadium"]
+
+    site = server.FixtureSite()
+    site.update(clash_df)
+    index = json.loads(site.get("/index.json").body)
+
+    paths = index["teams"]
+    assert len(set(paths.values())) == 2 and all(path.startswith("/teams/u12-boys-gold-") for path in paths.values())
+    for team, path in paths.items():
+        assert json.loads(site.get(f"{path}.json").body)[0]["team_name"] == team
+    assert index["venues"] == {"Coburg Basketball Stadium": "/venues/coburg-basketball-stadium"}
+    assert site.get("/venues/.json") is None
+
+
+def test_calendar_lines_folded():
+    line = "DESCRIPTION:" + "Équipe " * 30
+    folded = server.ics_fold(line)
+    assert all(len(part.encode("utf-8")) <= 75 for part in folded.split("\r\n"))
+    assert folded.replace("\r\n ", "") == line
+
+
+def test_calendar_times_in_utc():
+    games_df = pd.DataFrame(
+        {
+            "event_name": ["Round 1", "Round 2", "Round 3"],
+            "team_name": ["U12 Boys Gold"] * 3,
+            "start_date": ["2022-02-05", "2022-06-04", "2022-06-11"],
+            "start_time": ["09:15:00", "10:00", ""],
+            "end_date": ["2022-02-05", "2022-06-04", "2022-06-11"],
+            "end_time": ["09:55:00", "10:40", ""],
+            "venue": ["Coburg Basketball Stadium"] * 3,
+            "court": ["Court 1"] * 3,
+            "location": ["Coburg"] * 3,
+            "description": [""] * 3,
+        }
+    )
+    ics = server.FixtureSite("Australia/Melbourne").to_ics(games_df, "U12 Boys Gold").decode("utf-8")
+    lines = ics.split("\r\n")
+
+    # daylight saving (UTC+11) in February, standard time (UTC+10) in June; no time, no event
+    assert [line for line in lines if line.startswith(("DTSTART", "DTEND"))] == [
+        "DTSTART:20220204T221500Z",
+        "DTEND:20220204T225500Z",
+        "DTSTART:20220604T000000Z",
+        "DTEND:20220604T004000Z",
+    ]
+    assert "TZID" not in ics
+
+
+@pytest.fixture(scope="module")
+def fixture_server(schedule_df):
+    site = server.FixtureSite()
+    site.update(schedule_df)
+    http_server = server.serve(site, port=0)
+    yield site, f"http://127.0.0.1:{http_server.server_address[1]}"
+    http_server.shutdown()
+
+
+def fetch(url, **headers):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), b""
+
+
+def test_etags_and_not_modified(fixture_server, schedule_df):
+    site, url = fixture_server
+    path = f"/teams/{server.slug(schedule_df['team_name'].iloc[0])}.ics"
+
+    status, headers, body = fetch(url + path)
+    assert status == 200 and body == site.get(path).body
+    assert headers["ETag"] == site.get(path).etag
+    assert headers["Content-Type"].startswith("text/calendar")
+
+    status, _, body = fetch(url + path, **{"If-None-Match": headers["ETag"]})
+    assert (status, body) == (304, b"")
+
+    status, headers, body = fetch(url + path, **{"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip" and headers["ETag"] == site.get(path).gzip_etag
+    assert gzip.decompress(body) == site.get(path).body
+
+    status, headers, body = fetch(url + path, **{"Accept-Encoding": "gzip;q=0, identity"})
+    assert "Content-Encoding" not in headers and body == site.get(path).body
+
+    assert fetch(url + "/teams/nobody.json")[0] == 404
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("", False),
+        ("gzip", True),
+        ("gzip, deflate, br", True),
+        ("deflate;q=1.0, GZIP;q=0.5", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000", False),
+        ("*", True),
+        ("*;q=0", False),
+        ("gzip;q=0, *", False),
+        ("br, *;q=0.1", True),
+        ("x-gzip", True),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding, expected):
+    assert server.accepts_gzip(accept_encoding) == expected
+
+
+def test_index(fixture_server, schedule_df):
+    site, url = fixture_server
+    status, _, body = fetch(url + "/")
+    assert status == 200
+    index = json.loads(body)
+    assert set(index["teams"]) == set(schedule_df["team_name"])
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from standings import Standings
+
+
+def sorted_table(standings):
+    return standings.table().sort_values(["grade_id", "team_id"], ignore_index=True)
+
+
+def pending_games(games_df):
+    """Upcoming games with pending competitors, no competitors and no schedule yet"""
+    upcoming_df = games_df.loc[games_df["status"] == "UPCOMING"].drop_duplicates("id").head(3).copy()
+    upcoming_df["id"] = upcoming_df["id"] + "-pending"
+    competitors = upcoming_df["competitors"].tolist()
+    upcoming_df["competitors"] = [
+        competitors[0][:1],  # opponent to be decided
+        [competitors[1][0], {"name": "Winner Game 6"}],
+        np.nan,
+    ]
+    upcoming_df["schedule_timestamp"] = pd.NaT
+    return upcoming_df
+
+
+def test_incremental_equals_full_build(games_df):
+    rounds = sorted(games_df["round_name"].unique())
+    first_df = games_df.loc[games_df["round_name"] == rounds[0]]
+    rest_df = games_df.loc[games_df["round_name"] != rounds[0]]
+
+    standings = Standings().build(first_df)
+    standings.update_games(rest_df)
+    pd.testing.assert_frame_equal(sorted_table(standings), sorted_table(Standings().build(games_df)))
+
+
+def test_corrected_result_equals_rebuild(games_df):
+    completed = games_df.loc[games_df["status"] == "COMPLETED", "id"].iloc[0]
+    corrected_df = games_df.copy()
+    corrected_df["competitors"] = [
+        [dict(c, scoreTotal=0, outcome="LOSS") for c in competitors] if game_id == completed else competitors
+        for game_id, competitors in zip(games_df["id"], games_df["competitors"])
+    ]
+
+    standings = Standings().build(games_df)
+    changed = standings.update_games(corrected_df.loc[corrected_df["id"] == completed])
+    assert changed == {games_df.loc[games_df["id"] == completed, "grade_id"].iloc[0]}
+    pd.testing.assert_frame_equal(sorted_table(standings), sorted_table(Standings().build(corrected_df)))
+
+
+def test_pending_games(games_df):
+    with_pending_df = pd.concat([games_df, pending_games(games_df)], ignore_index=True)
+    full = Standings().build(with_pending_df)
+    pd.testing.assert_frame_equal(sorted_table(full), sorted_table(Standings().build(games_df)))
+
+    standings = Standings().build(games_df)
+    standings.update_games(pending_games(games_df))
+    pd.testing.assert_frame_equal(sorted_table(standings), sorted_table(full))
@@ -0,0 +1,26 @@
+import collections
+
+from synthetic import SyntheticCompetition
+
+
+def test_each_team_plays_at_most_once_per_round(competition):
+    for team_id, fixture in competition.fixtures.items():
+        rounds = collections.Counter(game["round"]["name"] for game in fixture)
+        assert max(rounds.values()) == 1
+        assert all(team_id in [c["id"] for c in game["competitors"]] for game in fixture)
+
+
+def test_pages_resume_from_cursor(competition):
+    key = f"seasons/{competition.season_id}/teams"
+    pages = list(competition.pages(key))
+    assert sum(len(page["data"]) for page in pages) == len(competition.teams)
+    assert pages[-1]["metadata"]["hasMore"] is False
+
+    cursor = pages[0]["metadata"]["nextCursor"]
+    assert list(competition.pages(key, cursor)) == pages[1:]
+
+
+def test_same_seed_same_competition():
+    first = SyntheticCompetition(clubs=2, teams_per_club=3, rounds=2)
+    second = SyntheticCompetition(clubs=2, teams_per_club=3, rounds=2)
+    assert first.games.keys() == second.games.keys()
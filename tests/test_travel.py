@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import travel
+
+
+@pytest.fixture(scope="module")
+def season_games(competition, teams_df):
+    phq = competition.playhq()
+    from_date = pd.Timestamp(competition.start_date).tz_localize(competition.timezone)
+    games_df, _ = phq.get_games(teams_df, from_date, from_date + pd.Timedelta(weeks=competition.rounds))
+    return games_df, phq.venues
+
+
+@pytest.fixture(scope="module")
+def team_groups(teams_df):
+    """One group by team names and one by team ids, sharing a team"""
+    return {
+        "family A": teams_df["name"].iloc[:4].tolist(),
+        "family B": teams_df["id"].iloc[3:8].tolist(),
+    }
+
+
+def naive_transitions(games_df, team_groups, venue_table, game_duration=45, speed_kmh=40, buffer_min=10):
+    """Moves between consecutive games of each group on the same day, pair by pair"""
+    moves = []
+    for group, teams in team_groups.items():
+        group_df = games_df.loc[games_df["team_name"].isin(teams) | games_df["team_id"].isin(teams)]
+        group_df = group_df.drop_duplicates("id").sort_values("schedule_timestamp", kind="stable")
+        games = group_df.to_dict("records")
+        for g1, g2 in zip(games, games[1:]):
+            if g1["schedule_timestamp"].date() != g2["schedule_timestamp"].date():
+                continue
+            gap = (g2["schedule_timestamp"] - g1["schedule_timestamp"]).total_seconds() / 60 - game_duration
+            travel_min = 0.0
+            if g1["venue_id"] != g2["venue_id"]:
+                coords = [
+                    venue_table.lookup([g["venue_id"]], c).iloc[0]
+                    for g in (g1, g2)
+                    for c in ["venue_address_latitude", "venue_address_longitude"]
+                ]
+                travel_min = round(travel.haversine_km(*coords).item() / speed_kmh * 60 + buffer_min)
+            moves.append((group, g1["id"], g2["id"], gap, gap >= travel_min))
+    return moves
+
+
+def test_haversine():
+    # Melbourne to Sydney
+    assert travel.haversine_km(-37.8136, 144.9631, -33.8688, 151.2093) == pytest.approx(714, abs=1)
+    assert travel.haversine_km([-37.8], [144.9], [-37.8], [144.9]).tolist() == [0.0]
+
+
+def test_transitions_equal_naive(season_games, team_groups):
+    games_df, venue_table = season_games
+    transitions_df = travel.Transitions(games_df, team_groups, venue_table=venue_table).transitions()
+
+    moves = list(
+        zip(
+            transitions_df["group"],
+            transitions_df["game_id_1"],
+            transitions_df["game_id_2"],
+            transitions_df["gap_min"],
+            transitions_df["feasible"],
+        )
+    )
+    assert moves and moves == naive_transitions(games_df, team_groups, venue_table)
+
+
+def test_coordinates_in_frame(season_games, team_groups):
+    games_df, venue_table = season_games
+    from_table = travel.Transitions(games_df, team_groups, venue_table=venue_table)
+    from_frame = travel.Transitions(venue_table.join(games_df), team_groups)
+
+    pd.testing.assert_frame_equal(from_frame.games_df, from_table.games_df)
+    pd.testing.assert_frame_equal(from_frame.transitions(), from_table.transitions())
+
+
+def test_no_coordinates(season_games, team_groups):
+    games_df, _ = season_games
+    with pytest.raises(ValueError):
+        travel.Transitions(games_df, team_groups)
+
+
+def test_infeasible_overlapping_games(season_games, team_groups):
+    games_df, venue_table = season_games
+    # move the second game of a group to start at the same time as the first
+    transitions_df = travel.Transitions(games_df, team_groups, venue_table=venue_table).transitions()
+    move = transitions_df.iloc[0]
+    games_df = games_df.copy()
+    games_df.loc[games_df["id"] == move["game_id_2"], "schedule_timestamp"] = move["start_1"]
+
+    infeasible_df = travel.Transitions(games_df, team_groups, venue_table=venue_table).infeasible()
+    assert move["game_id_2"] in set(infeasible_df["game_id_1"]) | set(infeasible_df["game_id_2"])
+    assert (infeasible_df["gap_min"] < infeasible_df["travel_min"]).all()
+    assert np.isin(infeasible_df["group"], list(team_groups)).all()
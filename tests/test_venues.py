@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+import venues
+
+
+@pytest.fixture
+def raw_games_df(competition):
+    """Games frame with the whole venue record in each game, as before normalization"""
+    rows = []
+    for k in range(12):
+        venue = competition.venues[k % 3]
+        address = venue["address"]
+        rows.append(
+            {
+                "id": f"game{k}",
+                "venue_id": venue["id"],
+                "venue_name": venue["name"],
+                "venue_surfaceName": venue["courts"][0],
+                "venue_address_line1": address["line1"],
+                "venue_address_postcode": address["postcode"],
+                "venue_address_suburb": address["suburb"],
+                "venue_address_state": address["state"],
+                "venue_address_country": address["country"],
+                "venue_address_latitude": address["latitude"],
+                "venue_address_longitude": address["longitude"],
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def test_add_keeps_one_row_per_venue(raw_games_df):
+    table = venues.VenueTable()
+    games_df = table.add(raw_games_df)
+
+    assert len(table) == 3
+    assert list(games_df.columns) == ["id", "venue_id", "venue_name", "venue_surfaceName"]
+    # adding the same venues again leaves the table as it was
+    table.add(raw_games_df)
+    assert len(table) == 3
+
+
+def test_join_restores_venue_fields(raw_games_df):
+    table = venues.VenueTable()
+    joined_df = table.join(table.add(raw_games_df))
+
+    for col in venues.VENUE_COLS:
+        assert joined_df[col].tolist() == raw_games_df[col].tolist()
+    assert joined_df["location"].tolist() == (
+        raw_games_df["venue_address_line1"] + ", " + raw_games_df["venue_address_suburb"]
+    ).tolist()
+    first = raw_games_df.iloc[0]
+    assert joined_df["map_url"].iloc[0] == (
+        f"{venues.MAP_URL}{first['venue_address_latitude']},{first['venue_address_longitude']}"
+    )
+    assert joined_df["coord"].iloc[0] == (first["venue_address_latitude"], first["venue_address_longitude"])
+
+
+def test_overrides_before_and_after_add(raw_games_df):
+    venue_ids = raw_games_df["venue_id"].unique()
+    table = venues.VenueTable({venue_ids[0]: {"venue_address_line1": "25 Outlook Rd"}})
+    games_df = table.add(raw_games_df)
+    table.override(venue_ids[1], location="Behind the school")
+
+    location = table.lookup(venue_ids, "location")
+    assert location.iloc[0].startswith("25 Outlook Rd, ")
+    assert location.iloc[1] == "Behind the school"
+    assert location.iloc[2] == table.lookup([venue_ids[2]], "venue_address_line1").iloc[0] + ", " + \
+        table.lookup([venue_ids[2]], "venue_address_suburb").iloc[0]
+    assert len(table) == 3
+    assert table.join(games_df, cols=["location"])["location"].iloc[1] == "Behind the school"
+
+
+def test_override_unknown_field():
+    with pytest.raises(KeyError):
+        venues.VenueTable().override("venue", colour="red")
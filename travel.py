@@ -0,0 +1,148 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0
+
+TRANSITION_COLS = [
+    "group",
+    "game_id_1",
+    "team_name_1",
+    "venue_name_1",
+    "start_1",
+    "game_id_2",
+    "team_name_2",
+    "venue_name_2",
+    "start_2",
+    "gap_min",
+    "distance_km",
+    "travel_min",
+    "feasible",
+]
+
+###########################################################
+# BACK-TO-BACK GAMES: GAPS & TRAVEL BETWEEN VENUES
+###########################################################
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Great-circle distance in km between arrays of coordinates (in degrees)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(x, dtype=float)) for x in (lat1, lon1, lat2, lon2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class Transitions:
+    """Moves between consecutive games of groups of teams that share people (coaches, families)
+
+    The games frame is as returned by PlayHQ.get_games, with columns team_name, team_id,
+    venue_id, venue_name and schedule_timestamp. Venue coordinates are taken from the
+    frame (venue_address_latitude/longitude) or, if not there, from a venue table (e.g.,
+    phq_club.venues).
+
+    The games of all groups are put in one frame sorted by group and start time, so the
+    gap and distance of every consecutive pair of games of a group is computed at once
+    with array operations over the whole season.
+
+    Args:
+        games_df (pd.DataFrame): games of the teams
+        team_groups (dict): group name -> list of team names (or ids) sharing people
+        venue_table (venues.VenueTable, optional): venues of the games, if the frame has no coordinates
+        game_duration (int, optional): minutes each game lasts
+    """
+
+    def __init__(self, games_df: pd.DataFrame, team_groups, venue_table=None, game_duration=45) -> None:
+        self.game_duration = game_duration
+
+        members_df = pd.DataFrame(
+            [(group, team) for group, teams in team_groups.items() for team in teams],
+            columns=["group", "team"],
+        )
+        by_name = members_df.merge(games_df, left_on="team", right_on="team_name")
+        by_id = members_df.merge(games_df, left_on="team", right_on="team_id")
+        group_games_df = (
+            pd.concat([by_name, by_id]).drop_duplicates(["group", "id"]).reset_index(drop=True)
+        )
+
+        if "venue_address_latitude" in group_games_df.columns:
+            lat = group_games_df["venue_address_latitude"].to_numpy()
+            lon = group_games_df["venue_address_longitude"].to_numpy()
+        elif venue_table is not None:
+            lat = venue_table.lookup(group_games_df["venue_id"], "venue_address_latitude").to_numpy()
+            lon = venue_table.lookup(group_games_df["venue_id"], "venue_address_longitude").to_numpy()
+        else:
+            raise ValueError("No venue coordinates: pass venue_table or join them to the games")
+        group_games_df = group_games_df.assign(
+            lat=pd.to_numeric(pd.Series(lat, index=group_games_df.index), errors="coerce"),
+            lon=pd.to_numeric(pd.Series(lon, index=group_games_df.index), errors="coerce"),
+        )
+
+        self.games_df = group_games_df.sort_values(["group", "schedule_timestamp"]).reset_index(
+            drop=True
+        )[["group", "id", "team_name", "venue_id", "venue_name", "schedule_timestamp", "lat", "lon"]]
+
+    def transitions(self, speed_kmh=40, buffer_min=10) -> pd.DataFrame:
+        """Every move from a game of a group to its next game on the same day
+
+        A move is feasible if the gap between the end of the first game and the start of
+        the next covers the travel time: the distance at speed_kmh plus buffer_min (to
+        park, find the court, ...) when the venues differ, nothing at the same venue.
+
+        Args:
+            speed_kmh (float, optional): average travel speed between venues
+            buffer_min (int, optional): extra minutes needed to change venue
+
+        Returns:
+            pd.DataFrame: one row per move, with the two games, the gap (negative if they
+                overlap), the distance, the travel time and whether it is feasible
+        """
+        df = self.games_df
+        first = np.arange(len(df) - 1)
+        second = first + 1
+        groups = df["group"].to_numpy()
+        starts = df["schedule_timestamp"]
+        days = starts.dt.date.to_numpy()
+        pairs = (groups[first] == groups[second]) & (days[first] == days[second])
+        first, second = first[pairs], second[pairs]
+
+        b1 = df.iloc[first].reset_index(drop=True)
+        b2 = df.iloc[second].reset_index(drop=True)
+        gap_min = (b2["schedule_timestamp"] - b1["schedule_timestamp"]).dt.total_seconds() / 60
+        gap_min -= self.game_duration
+        distance_km = haversine_km(b1["lat"], b1["lon"], b2["lat"], b2["lon"])
+        same_venue = (b1["venue_id"] == b2["venue_id"]).to_numpy()
+        distance_km = np.where(same_venue, 0.0, distance_km)
+        travel_min = np.where(same_venue, 0.0, distance_km / speed_kmh * 60 + buffer_min)
+
+        transitions_df = pd.DataFrame(
+            {
+                "group": b1["group"],
+                "game_id_1": b1["id"],
+                "team_name_1": b1["team_name"],
+                "venue_name_1": b1["venue_name"],
+                "start_1": b1["schedule_timestamp"],
+                "game_id_2": b2["id"],
+                "team_name_2": b2["team_name"],
+                "venue_name_2": b2["venue_name"],
+                "start_2": b2["schedule_timestamp"],
+                "gap_min": gap_min,
+                "distance_km": distance_km.round(1),
+                "travel_min": travel_min.round(),
+            }
+        )
+        # unknown coordinates (NaN distance) cannot be checked, so they are not flagged
+        transitions_df["feasible"] = ~(gap_min.to_numpy() < travel_min)
+        return transitions_df[TRANSITION_COLS]
+
+    def infeasible(self, speed_kmh=40, buffer_min=10) -> pd.DataFrame:
+        """Moves between games that overlap or are too close for the distance between venues"""
+        transitions_df = self.transitions(speed_kmh, buffer_min)
+        return transitions_df.loc[~transitions_df["feasible"]].reset_index(drop=True)
@@ -6,6 +6,9 @@ __email__ = "ssardina@gmail.com"
 # __version__ = "1.0.1"
 # __status__ = "Production"
 
+import logging
+import os
+import tempfile
 import traceback
 import pyshorteners # https://pyshorteners.readthedocs.io/en/latest/
 import json
@@ -34,15 +37,103 @@ def print_json_pretty(data_json):
     print(json.dumps(data_json, sort_keys=True, indent=4))
 
 
+def write_json_atomic(file_name, data_json):
+    """Write JSON data so that file_name is either the old or the complete new content
+
+    The data is written to a temporary file in the same folder and then renamed,
+    so an interrupted run never leaves a partial file behind.
+    """
+    dir_name = os.path.dirname(os.path.abspath(file_name))
+    fd, tmp_file = tempfile.mkstemp(dir=dir_name, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(data_json, sort_keys=True, indent=4))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, file_name)
+    except BaseException:
+        os.remove(tmp_file)
+        raise
+
+
 
 # TinyURL shortener service
-def shorten_url(url):
-    s = pyshorteners.Shortener()
+def shorten_url(url, retries=3, timeout=10):
+    """Short URL of url via TinyURL, or url itself if TinyURL fails after some retries
+
+    Args:
+        url (str): the URL to shorten
+        retries (int, optional): attempts after the first one, waiting 1, 2, 4... seconds in between
+        timeout (int, optional): seconds to wait for TinyURL in each attempt
+    """
+    s = pyshorteners.Shortener(timeout=timeout)
+    for attempt in range(retries + 1):
+        try:
+            return s.tinyurl.short(url)
+        # except:
+        #     return s.dagd.short(url)
+        except Exception as e:  # in case of error, wait and try again
+            if attempt == retries:
+                logging.warning(f"Could not shorten {url} ({e}); using it as it is")
+                return url
+            time.sleep(2**attempt)
+
+
+###########################################################
+# INCREMENTAL SINKS
+###########################################################
+def write_frames_csv(frames, file_name):
+    """Write a stream of frames (e.g., from PlayHQ.iter_teamsapp_schedule) into one CSV file as they come
+
+    The header is written once, with the columns of the first frame.
+
+    Returns:
+        int: number of rows written
+    """
+    rows = 0
+    columns = None
+    with open(file_name, "w", newline="") as f:
+        for df in frames:
+            if df is None or df.empty:
+                continue
+            if columns is None:
+                columns = list(df.columns)
+            df.to_csv(f, columns=columns, index=False, header=(rows == 0))
+            f.flush()
+            rows += len(df)
+    return rows
+
+
+def write_frames_parquet(frames, file_name):
+    """Write a stream of frames into one Parquet file as they come (one row group per frame)
+
+    Needs pyarrow. The schema is that of the first frame.
+
+    Returns:
+        int: number of rows written
+    """
     try:
-        return s.tinyurl.short(url)
-    # except:
-    #     return s.dagd.short(url)
-    except: # in case of error, wait 1 second and try again
-        time.sleep(1)
-        return shorten_url(url)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Writing Parquet files needs pyarrow: pip install pyarrow") from e
 
+    rows = 0
+    writer = None
+    try:
+        for df in frames:
+            if df is None or df.empty:
+                continue
+            if writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                writer = pq.ParquetWriter(file_name, table.schema)
+            else:
+                table = pa.Table.from_pandas(
+                    df[writer.schema.names], schema=writer.schema, preserve_index=False
+                )
+            writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
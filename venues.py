@@ -0,0 +1,136 @@
+__author__ = "Sebastian Sardina"
+__copyright__ = "Copyright 2021-2023"
+__credits__ = []
+__license__ = "Apache-2.0 license"
+__email__ = "ssardina@gmail.com"
+
+import pandas as pd
+
+# venue fields in a games frame (as per PlayHQ.get_team_fixture before normalization)
+VENUE_COLS = [
+    "venue_name",
+    "venue_address_line1",
+    "venue_address_postcode",
+    "venue_address_suburb",
+    "venue_address_state",
+    "venue_address_country",
+    "venue_address_latitude",
+    "venue_address_longitude",
+]
+
+# fields worked out once per venue from the fields above
+DERIVED_COLS = ["location", "coord", "map_url", "waze_url"]
+
+MAP_URL = "https://maps.google.com/?q="
+WAZE_URL = "https://www.waze.com/live-map/directions?to=ll."
+
+###########################################################
+# VENUE DIMENSION TABLE
+###########################################################
+
+
+class VenueTable:
+    """Deduplicated table of venues (one row per venue id) for games frames.
+
+    Games frames then only keep the venue id (plus the venue name, as a label, and the
+    court of each game), rather than repeating the whole venue record in every game. The
+    fields derived from a venue, like the address to show in TeamApp or the map links, are
+    worked out once per venue and joined to the games only when producing output.
+
+    Overrides replace fields of a venue (e.g., a wrong address in PlayHQ) and are kept, so
+    they also apply to venues registered later. Derived fields (e.g., location) can also be
+    overridden directly.
+
+    Args:
+        overrides (dict, optional): venue id -> dict of fields to override (columns of the table)
+    """
+
+    def __init__(self, overrides=None) -> None:
+        self.venues_df = pd.DataFrame(
+            columns=VENUE_COLS + DERIVED_COLS, index=pd.Index([], name="venue_id")
+        )
+        self.overrides = {}  # venue id -> dict of fields
+        for venue_id, fields in (overrides or {}).items():
+            self.override(venue_id, **fields)
+
+    def __len__(self):
+        return len(self.venues_df)
+
+    def add(self, games_df: pd.DataFrame) -> pd.DataFrame:
+        """Register the venues of a games frame and drop their fields from it
+
+        Venues already in the table are kept as they are. Column venue_name is kept in the
+        games as a label, as it is often used to filter or show games.
+
+        Args:
+            games_df (pd.DataFrame): games with column venue_id and (some of) VENUE_COLS
+
+        Returns:
+            pd.DataFrame: the games frame without the venue fields other than venue_name
+        """
+        cols = [c for c in VENUE_COLS if c in games_df.columns]
+        if "venue_id" not in games_df.columns or not cols:
+            return games_df
+
+        new_df = (
+            games_df.loc[games_df["venue_id"].notna(), ["venue_id"] + cols]
+            .drop_duplicates("venue_id")
+            .set_index("venue_id")
+        )
+        new_df = new_df.loc[~new_df.index.isin(self.venues_df.index)]
+        if not new_df.empty:
+            new_df = self._derive(new_df.reindex(columns=VENUE_COLS))
+            if self.venues_df.empty:
+                self.venues_df = new_df
+            else:
+                self.venues_df = pd.concat([self.venues_df, new_df])
+
+        return games_df.drop(columns=[c for c in cols if c != "venue_name"])
+
+    def override(self, venue_id, **fields):
+        """Override fields of a venue, e.g., override(venue_id, location="25 Outlook Rd, Coburg North")"""
+        unknown = set(fields).difference(VENUE_COLS + DERIVED_COLS)
+        if unknown:
+            raise KeyError(f"Unknown venue fields: {unknown}")
+        self.overrides.setdefault(venue_id, {}).update(fields)
+        if venue_id in self.venues_df.index:
+            venue_df = self.venues_df.loc[[venue_id], VENUE_COLS]
+            self.venues_df = pd.concat(
+                [self.venues_df.drop(index=venue_id), self._derive(venue_df)]
+            )
+
+    def _derive(self, venues_df: pd.DataFrame) -> pd.DataFrame:
+        """Apply the overrides to some venues and work out their derived fields"""
+        venues_df = venues_df.astype(object)
+        self._apply_overrides(venues_df, VENUE_COLS)
+
+        lat = venues_df["venue_address_latitude"].astype(str)
+        lon = venues_df["venue_address_longitude"].astype(str)
+        venues_df["location"] = (
+            venues_df["venue_address_line1"] + ", " + venues_df["venue_address_suburb"]
+        )
+        venues_df["coord"] = list(
+            zip(venues_df["venue_address_latitude"], venues_df["venue_address_longitude"])
+        )
+        venues_df["map_url"] = MAP_URL + lat + "," + lon
+        venues_df["waze_url"] = WAZE_URL + lat + "%2C" + lon
+
+        self._apply_overrides(venues_df, DERIVED_COLS)
+        return venues_df
+
+    def _apply_overrides(self, venues_df: pd.DataFrame, cols):
+        for venue_id in venues_df.index.intersection(list(self.overrides)):
+            for col, value in self.overrides[venue_id].items():
+                if col in cols:
+                    venues_df.at[venue_id, col] = value
+
+    def lookup(self, venue_ids, col) -> pd.Series:
+        """Field col of each venue id (e.g., the venue_id column of a games frame)"""
+        return self.venues_df[col].reindex(venue_ids)
+
+    def join(self, games_df: pd.DataFrame, cols=None) -> pd.DataFrame:
+        """Join the venue fields (all by default) to a games frame with a venue_id column"""
+        cols = VENUE_COLS + DERIVED_COLS if cols is None else cols
+        venues_df = self.venues_df[cols].reindex(games_df["venue_id"])
+        games_df = games_df.drop(columns=[c for c in cols if c in games_df.columns])
+        return games_df.assign(**{c: venues_df[c].to_numpy() for c in cols})